@@ -26,6 +26,109 @@ class Settings(BaseSettings):
     DATA_FILE: str = os.path.join(BASE_DIR, "mock_profiles.json")
     GOOGLE_APPLICATION_CREDENTIALS: str = os.path.join(BASE_DIR, "serviceAccountKey.json")
 
+    # ID token verification (project id defaults to the service account's)
+    FIREBASE_PROJECT_ID: str = ""
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_CLOCK_SKEW_SECONDS: float = 0.0
+
+    # "firestore" for the real backend, "memory" for the in-process stand-in
+    DATASTORE: str = "firestore"
+    MEMORY_STORE_LATENCY_MS: float = 0.0
+    # Per-request datastore RPC accounting (see /metrics/datastore). A request making this
+    # many single-document calls of one kind on one collection is flagged as N+1.
+    DATASTORE_TRACING: bool = True
+    DATASTORE_N_PLUS_ONE_THRESHOLD: int = 5
+    # Always send X-Datastore-Stats (otherwise only on "X-Debug-Datastore: 1" requests)
+    DATASTORE_DEBUG_HEADER: bool = False
+
+    # Differential privacy accounting (epsilon spent per recipient across all releases).
+    # Each newly released donor costs 0.5 for its score, plus 1.0 for its age difference in
+    # /match/{id}; repeat views reuse earlier releases for free. 8 covers the detailed view
+    # of a recipient's five best candidates and a few more scores, within the single-digit
+    # totals deployed DP systems publish. Budgets are spent best candidates first.
+    # Load tests raise it explicitly (benchmarks.loadtest --epsilon-budget).
+    DP_RECIPIENT_EPSILON_BUDGET: float = 8.0
+    PRIVACY_LEDGER_FILE: str = os.path.join(BASE_DIR, "privacy_ledger.json")
+    PRIVACY_LEDGER_FLUSH_SECONDS: float = 30.0
+
+    # Incremental matching
+    MATCH_TOP_K: int = 10
+    # Score a recipient's home region first and stop expanding once farther donors can't make the top-k
+    MATCH_RING_SEARCH: bool = True
+    WATCH_REGISTRY: bool = True
+    WATCH_SYNC_TIMEOUT_SECONDS: float = 5.0
+
+    # Kidney paired exchange: cycle/chain lengths, graph pruning and the per-run time budget
+    EXCHANGE_MAX_CYCLE_LENGTH: int = 3
+    EXCHANGE_MAX_CHAIN_LENGTH: int = 3
+    EXCHANGE_MIN_EDGE_SCORE: float = 0.4
+    EXCHANGE_MAX_IN_EDGES: int = 25
+    EXCHANGE_CHAIN_OUT_EDGES: int = 4
+    EXCHANGE_MAX_CYCLES: int = 200000
+    EXCHANGE_TIME_BUDGET_SECONDS: float = 10.0
+    EXCHANGE_MAX_PAIRS: int = 10000
+
+    # Columnar donor pool snapshot for fast cold starts ("" disables); older ones force a full scan
+    DONOR_SNAPSHOT_DIR: str = ""
+    DONOR_SNAPSHOT_MAX_AGE_SECONDS: float = 3600.0
+
+    # Multi-worker hosts: one worker owns the pool and publishes it to DONOR_SNAPSHOT_DIR,
+    # the others map it read-only (and SUCCESS_MODEL_PATH likewise) instead of loading their own.
+    # The privacy ledger then moves to DONOR_SNAPSHOT_DIR/privacy_ledger.sqlite, shared by all workers,
+    # and dashboard events go through DONOR_SNAPSHOT_DIR/events.sqlite, polled every SHARED_POOL_POLL_SECONDS
+    SHARED_POOL: bool = False
+    SHARED_POOL_POLL_SECONDS: float = 1.0
+    SHARED_POOL_PUBLISH_SECONDS: float = 2.0
+    SUCCESS_MODEL_PATH: str = ""
+
+    # Retrain the success model from accepted/rejected matches every N seconds (0 disables);
+    # validated models are published to SUCCESS_MODEL_PATH (a private directory if unset)
+    MODEL_RETRAIN_INTERVAL_SECONDS: float = 0.0
+    MODEL_RETRAIN_CHUNK_SIZE: int = 5000
+    MODEL_RETRAIN_MIN_ROWS: int = 50
+    MODEL_RETRAIN_TOLERANCE: float = 0.01
+    MODEL_RETRAIN_TIMEOUT_SECONDS: float = 600.0
+
+    # Federated matching: per-hospital local top-k, merged globally under one deadline
+    FEDERATED_LOCAL_K: int = 5
+    FEDERATED_SHARD_TIMEOUT_SECONDS: float = 2.0
+    FEDERATED_MAX_WORKERS: int = 8
+
+    # Largest n accepted by GET /match/allocations
+    WAITLIST_MAX_TOP_N: int = 500
+
+    # Coordinator bulk accepts (POST /match/accept/bulk)
+    ACCEPT_BULK_MAX_ITEMS: int = 1000
+
+    # Bulk seed imports (python -m app.services.bulk_import)
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_CONCURRENCY: int = 8
+    IMPORT_MAX_RETRIES: int = 5
+
+    # Organ viability after procurement, by organ (others use the default; 0 = never expires).
+    # Donors leave the matching pool organ by organ as their windows close.
+    VIABILITY_WINDOW_HOURS: dict = {
+        "heart": 4.0, "lung": 6.0, "intestine": 8.0, "liver": 12.0, "pancreas": 12.0, "kidney": 36.0,
+    }
+    VIABILITY_DEFAULT_HOURS: float = 24.0
+    VIABILITY_TICK_SECONDS: float = 1.0
+    # Only procuredAt starts a window. Registration is not procurement (a deceased donor is
+    # often registered well before, or without, retrieval); opt in for registries where it is
+    VIABILITY_REGISTRATION_AS_PROCUREMENT: bool = False
+
+    # Background allocation rounds (debounced after pool changes, else periodic)
+    ALLOCATION_SCHEDULER: bool = True
+    ALLOCATION_INTERVAL_SECONDS: float = 60.0
+    ALLOCATION_DEBOUNCE_SECONDS: float = 2.0
+    ALLOCATION_ROUND_SIZE: int = 5
+
+    # Dashboard push events
+    EVENT_LOG_CAPACITY: int = 1000
+    EVENT_MAX_SUBSCRIBERS: int = 200
+
+    # Fraction of requests whose per-stage spans are kept (send "X-Trace: 1" to force one)
+    TRACE_SAMPLE_RATE: float = 0.01
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,364 @@
+"""
+Datastore RPC accounting.
+
+TracedClient wraps the Firestore (or in-memory) client and records every call it makes:
+reads and writes, documents transferred and their approximate stored size. Inside a
+request the counts go to that request (no locking) and are flushed per route when it
+ends; calls from background threads are counted under route="background".
+
+A request that makes DATASTORE_N_PLUS_ONE_THRESHOLD or more single-document calls of
+the same kind on the same collection (e.g. a get per donor in a loop) is flagged as an
+N+1 pattern: such calls can almost always be one query, one batch or a cache hit.
+"""
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .metrics import metrics
+
+metrics.describe("organ_datastore_rpcs_total", "Datastore round trips by route, collection and operation.")
+metrics.describe("organ_datastore_documents_total", "Documents read or written by route and collection.")
+metrics.describe("organ_datastore_bytes_total", "Approximate stored size of documents read or written, by route and collection.")
+metrics.describe("organ_datastore_n_plus_one_total", "Requests that repeated a single-document operation on a collection.")
+
+READ_OPS = frozenset(("get", "get_all", "stream"))
+
+
+def _str_size(s: str) -> int:
+    return (len(s) if s.isascii() else len(s.encode("utf-8"))) + 1
+
+
+def document_size(data: Any) -> int:
+    """Stored size of a value following Firestore's storage size rules."""
+    kind = type(data)
+    if kind is str:
+        return _str_size(data)
+    if kind is dict:
+        size = 0
+        for k, v in data.items():
+            size += _str_size(k) + (_str_size(v) if type(v) is str else document_size(v))
+        return size
+    if data is None or kind is bool:
+        return 1
+    if kind is list or kind is tuple:
+        return sum(document_size(v) for v in data)
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, str):
+        return _str_size(data)
+    if isinstance(data, dict):
+        return document_size(dict(data))
+    # Numbers, timestamps, references and geo points
+    return 8
+
+
+def _snapshot_size(snapshot) -> int:
+    # Both clients keep the fields on _data; to_dict() would deep-copy them
+    data = getattr(snapshot, "_data", None)
+    if data is None:
+        return 0
+    return 32 + len(snapshot.id) + 1 + document_size(data)
+
+
+# --- Per-request accounting ---
+
+class _DatastoreStats:
+    __slots__ = ("rpcs", "documents", "bytes", "single")
+
+    def __init__(self):
+        # (collection, op) -> count
+        self.rpcs: Dict[Tuple[str, str], int] = {}
+        self.documents: Dict[Tuple[str, str], int] = {}
+        self.bytes: Dict[Tuple[str, str], int] = {}
+        self.single: Dict[Tuple[str, str], int] = {}
+
+    def totals(self) -> Dict[str, int]:
+        out = {"reads": 0, "writes": 0, "docs_read": 0, "docs_written": 0, "bytes_read": 0, "bytes_written": 0}
+        for (collection, op), n in self.rpcs.items():
+            out["reads" if op in READ_OPS else "writes"] += n
+        for (collection, op), n in self.documents.items():
+            out["docs_read" if op in READ_OPS else "docs_written"] += n
+        for (collection, op), n in self.bytes.items():
+            out["bytes_read" if op in READ_OPS else "bytes_written"] += n
+        return out
+
+    def n_plus_one(self, threshold: int) -> List[Tuple[str, str, int]]:
+        return sorted(((c, op, n) for (c, op), n in self.single.items() if n >= threshold), key=lambda x: -x[2])
+
+
+_current: ContextVar[Optional[_DatastoreStats]] = ContextVar("datastore_request", default=None)
+
+# route -> running totals for /metrics/datastore
+_route_totals: Dict[str, Dict[str, Any]] = {}
+_route_lock = threading.Lock()
+
+
+def _record(collection: str, op: str, documents: int = 0, nbytes: int = 0, single: bool = False, rpc: bool = True):
+    req = _current.get()
+    key = (collection, op)
+    if req is None:
+        labels = (("collection", collection), ("op", op), ("route", "background"))
+        if rpc:
+            metrics.inc("organ_datastore_rpcs_total", labels)
+        if documents:
+            metrics.inc("organ_datastore_documents_total", labels, documents)
+            metrics.inc("organ_datastore_bytes_total", labels, nbytes)
+        return
+    if rpc:
+        req.rpcs[key] = req.rpcs.get(key, 0) + 1
+    if documents:
+        req.documents[key] = req.documents.get(key, 0) + documents
+        req.bytes[key] = req.bytes.get(key, 0) + nbytes
+    if single:
+        req.single[key] = req.single.get(key, 0) + 1
+
+
+def _flush(route: str, req: _DatastoreStats):
+    for (collection, op), n in req.rpcs.items():
+        metrics.inc("organ_datastore_rpcs_total", (("collection", collection), ("op", op), ("route", route)), n)
+    for (collection, op), n in req.documents.items():
+        labels = (("collection", collection), ("op", op), ("route", route))
+        metrics.inc("organ_datastore_documents_total", labels, n)
+        metrics.inc("organ_datastore_bytes_total", labels, req.bytes[(collection, op)])
+    flagged = req.n_plus_one(settings.DATASTORE_N_PLUS_ONE_THRESHOLD)
+    for collection, op, _ in flagged:
+        metrics.inc("organ_datastore_n_plus_one_total", (("collection", collection), ("op", op), ("route", route)))
+
+    totals = req.totals()
+    with _route_lock:
+        entry = _route_totals.setdefault(route, {"requests": 0, "reads": 0, "writes": 0, "docs_read": 0,
+                                                 "docs_written": 0, "bytes_read": 0, "bytes_written": 0,
+                                                 "n_plus_one": {}})
+        entry["requests"] += 1
+        for name, value in totals.items():
+            entry[name] += value
+        for collection, op, n in flagged:
+            pattern = f"{collection}.{op}"
+            entry["n_plus_one"][pattern] = max(entry["n_plus_one"].get(pattern, 0), n)
+
+
+def route_summary() -> List[Dict[str, Any]]:
+    """Per-route datastore totals, costliest (most documents read) first."""
+    with _route_lock:
+        rows = [{"route": route, **entry, "n_plus_one": dict(entry["n_plus_one"])}
+                for route, entry in _route_totals.items()]
+    for row in rows:
+        n = row["requests"]
+        row["docs_read_per_request"] = round(row["docs_read"] / n, 2)
+        row["rpcs_per_request"] = round((row["reads"] + row["writes"]) / n, 2)
+    return sorted(rows, key=lambda r: (-r["docs_read"], -r["rpcs_per_request"]))
+
+
+def _header_value(req: _DatastoreStats) -> str:
+    parts = [f"{name}={value}" for name, value in req.totals().items()]
+    flagged = req.n_plus_one(settings.DATASTORE_N_PLUS_ONE_THRESHOLD)
+    if flagged:
+        parts.append("n_plus_one=" + ",".join(f"{c}.{op}x{n}" for c, op, n in flagged))
+    return "; ".join(parts)
+
+
+class DatastoreTraceMiddleware:
+    """ASGI middleware scoping datastore accounting to each request and flushing it by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.DATASTORE_TRACING:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        debug = settings.DATASTORE_DEBUG_HEADER or headers.get(b"x-debug-datastore") == b"1"
+        req = _DatastoreStats()
+        token = _current.set(req)
+
+        async def send_wrapper(message):
+            if debug and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-datastore-stats", _header_value(req).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper if debug else send)
+        finally:
+            _current.reset(token)
+            _flush(getattr(scope.get("route"), "path", None) or "unmatched", req)
+
+
+# --- Client wrappers ---
+
+def _unwrap(reference):
+    return getattr(reference, "_ref", reference)
+
+
+class TracedQuery:
+    __slots__ = ("_query", "_collection")
+
+    def __init__(self, query, collection: str):
+        self._query = query
+        self._collection = collection
+
+    def where(self, *args, **kwargs):
+        return TracedQuery(self._query.where(*args, **kwargs), self._collection)
+
+    def order_by(self, *args, **kwargs):
+        return TracedQuery(self._query.order_by(*args, **kwargs), self._collection)
+
+    def limit(self, *args, **kwargs):
+        return TracedQuery(self._query.limit(*args, **kwargs), self._collection)
+
+    def stream(self, *args, **kwargs):
+        # Documents are counted as they arrive, so a partly consumed stream counts what it read
+        count = size = 0
+        try:
+            for snapshot in self._query.stream(*args, **kwargs):
+                count += 1
+                size += _snapshot_size(snapshot)
+                yield snapshot
+        finally:
+            _record(self._collection, "stream", count, size)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._query, name)
+
+
+class TracedCollection(TracedQuery):
+    __slots__ = ()
+
+    def document(self, document_id: Optional[str] = None):
+        ref = self._query.document(document_id) if document_id is not None else self._query.document()
+        return TracedDocument(ref, self._collection)
+
+    def add(self, data: Dict[str, Any], *args, **kwargs):
+        result = self._query.add(data, *args, **kwargs)
+        _record(self._collection, "add", 1, document_size(data), single=True)
+        return result
+
+
+class TracedDocument:
+    __slots__ = ("_ref", "_collection")
+
+    def __init__(self, ref, collection: str):
+        self._ref = ref
+        self._collection = collection
+
+    def get(self, *args, **kwargs):
+        snapshot = self._ref.get(*args, **kwargs)
+        _record(self._collection, "get", int(snapshot.exists), _snapshot_size(snapshot), single=True)
+        return snapshot
+
+    def _write(self, op: str, data, *args, **kwargs):
+        result = getattr(self._ref, op)(data, *args, **kwargs)
+        _record(self._collection, op, 1, document_size(data), single=True)
+        return result
+
+    def set(self, data, *args, **kwargs):
+        return self._write("set", data, *args, **kwargs)
+
+    def create(self, data, *args, **kwargs):
+        return self._write("create", data, *args, **kwargs)
+
+    def update(self, data, *args, **kwargs):
+        return self._write("update", data, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        result = self._ref.delete(*args, **kwargs)
+        _record(self._collection, "delete", 1, 0, single=True)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._ref, name)
+
+
+class TracedBatch:
+    """Counts a batch as one write round trip, attributed to the collection with the most writes."""
+    __slots__ = ("_batch", "_writes")
+
+    def __init__(self, batch):
+        self._batch = batch
+        self._writes: Dict[str, List[int]] = {}
+
+    def _add(self, reference, data):
+        entry = self._writes.setdefault(getattr(reference, "_collection", "unknown"), [0, 0])
+        entry[0] += 1
+        entry[1] += document_size(data) if data is not None else 0
+
+    def set(self, reference, data, *args, **kwargs):
+        self._batch.set(_unwrap(reference), data, *args, **kwargs)
+        self._add(reference, data)
+        return self
+
+    def create(self, reference, data):
+        self._batch.create(_unwrap(reference), data)
+        self._add(reference, data)
+        return self
+
+    def update(self, reference, data, *args, **kwargs):
+        self._batch.update(_unwrap(reference), data, *args, **kwargs)
+        self._add(reference, data)
+        return self
+
+    def delete(self, reference, *args, **kwargs):
+        self._batch.delete(_unwrap(reference), *args, **kwargs)
+        self._add(reference, None)
+        return self
+
+    def commit(self, *args, **kwargs):
+        result = self._batch.commit(*args, **kwargs)
+        if self._writes:
+            main = max(self._writes, key=lambda c: self._writes[c][0])
+            _record(main, "batch_commit", *self._writes[main])
+            for collection, (count, size) in self._writes.items():
+                if collection != main:
+                    _record(collection, "batch_commit", count, size, rpc=False)
+        return result
+
+    def __len__(self):
+        return sum(count for count, _ in self._writes.values())
+
+    def __getattr__(self, name):
+        return getattr(self._batch, name)
+
+
+class TracedClient:
+    """
+    Drop-in wrapper around the datastore client. Anything not traced (listeners,
+    attributes of the in-memory store such as rpc_count or latency) passes through.
+    """
+
+    def __init__(self, client):
+        object.__setattr__(self, "_client", client)
+
+    def collection(self, name: str) -> TracedCollection:
+        return TracedCollection(self._client.collection(name), name)
+
+    def batch(self) -> TracedBatch:
+        return TracedBatch(self._client.batch())
+
+    def get_all(self, references, *args, **kwargs):
+        """One read round trip, attributed like a batch to the collection with the most documents."""
+        references = list(references)
+        reads: Dict[str, List[int]] = {getattr(ref, "_collection", "unknown"): [0, 0] for ref in references}
+        try:
+            for snapshot in self._client.get_all([_unwrap(ref) for ref in references], *args, **kwargs):
+                # Snapshots may arrive in any order; their path names the collection
+                entry = reads.setdefault(snapshot.reference.path.split("/")[0], [0, 0])
+                entry[0] += int(snapshot.exists)
+                entry[1] += _snapshot_size(snapshot)
+                yield snapshot
+        finally:
+            if reads:
+                main = max(reads, key=lambda c: reads[c][0])
+                for collection, (count, size) in reads.items():
+                    _record(collection, "get_all", count, size, rpc=collection == main)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
@@ -1,9 +1,20 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 from .config import settings
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(settings.GOOGLE_APPLICATION_CREDENTIALS)
-    firebase_admin.initialize_app(cred)
+if settings.DATASTORE == "memory":
+    # Local/test backend with optional simulated round-trip latency
+    from .memory_store import MemoryFirestore
+    db = MemoryFirestore(latency=settings.MEMORY_STORE_LATENCY_MS / 1000.0)
+else:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
 
-db = firestore.client()
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(settings.GOOGLE_APPLICATION_CREDENTIALS)
+        firebase_admin.initialize_app(cred)
+
+    db = firestore.client()
+
+if settings.DATASTORE_TRACING:
+    # Per-request and per-route RPC accounting (/metrics/datastore)
+    from .datastore_trace import TracedClient
+    db = TracedClient(db)
@@ -0,0 +1,313 @@
+import copy
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from google.api_core.exceptions import AlreadyExists, NotFound, ServiceUnavailable
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data: Optional[Dict[str, Any]], update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        # Stored dicts are never mutated in place, but callers may mutate what we return
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str):
+        return (self._data or {}).get(field)
+
+
+class _ChangeType:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class DocumentChange:
+    def __init__(self, change_type: str, document: DocumentSnapshot):
+        self.type = _ChangeType(change_type)
+        self.document = document
+
+
+class Watch:
+    def __init__(self, store, collection: str, callback: Callable):
+        self._store = store
+        self.collection = collection
+        self.callback = callback
+
+    def unsubscribe(self):
+        self._store._unwatch(self)
+
+
+class DocumentReference:
+    def __init__(self, store, collection: str, doc_id: str):
+        self._store = store
+        self.collection_name = collection
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self.collection_name}/{self.id}"
+
+    def get(self, transaction=None) -> DocumentSnapshot:
+        self._store._rpc()
+        with self._store._lock:
+            data, update_time = self._store._read(self.collection_name, self.id)
+        return DocumentSnapshot(self, data, update_time)
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._store._rpc()
+        self._store._commit([("set", self, data, merge)])
+
+    def create(self, data: Dict[str, Any]):
+        self._store._rpc()
+        self._store._commit([("create", self, data, False)])
+
+    def update(self, data: Dict[str, Any]):
+        self._store._rpc()
+        self._store._commit([("update", self, data, True)])
+
+    def delete(self):
+        self._store._rpc()
+        self._store._commit([("delete", self, None, False)])
+
+
+class Query:
+    _OPS = {
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        "<": lambda a, b: a is not None and a < b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        ">=": lambda a, b: a is not None and a >= b,
+        "in": lambda a, b: a in b,
+        "not-in": lambda a, b: a not in b,
+        "array_contains": lambda a, b: isinstance(a, list) and b in a,
+        "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+    }
+
+    def __init__(self, store, collection: str, filters=None, orders=None, limit_to=None):
+        self._store = store
+        self._collection = collection
+        self._filters = filters or []
+        self._orders = orders or []
+        self._limit = limit_to
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return Query(self._store, self._collection, self._filters + [(field_path, self._OPS[op_string], value)],
+                     self._orders, self._limit)
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return Query(self._store, self._collection, self._filters,
+                     self._orders + [(field_path, direction == "DESCENDING")], self._limit)
+
+    def limit(self, count: int):
+        return Query(self._store, self._collection, self._filters, self._orders, count)
+
+    def stream(self, transaction=None):
+        self._store._rpc()
+        with self._store._lock:
+            items = list(self._store._collection(self._collection).items())
+        docs = [
+            (doc_id, data, ts) for doc_id, (data, ts) in items
+            if all(op(data.get(field), value) for field, op, value in self._filters)
+        ]
+        for field, descending in reversed(self._orders):
+            docs.sort(key=lambda d: (d[1].get(field) is None, d[1].get(field)), reverse=descending)
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        for doc_id, data, ts in docs:
+            yield DocumentSnapshot(DocumentReference(self._store, self._collection, doc_id), data, ts)
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, store, name: str):
+        super().__init__(store, name)
+        self.id = name
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._store, self._collection, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, data: Dict[str, Any], document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(data)
+        return datetime.now(timezone.utc), ref
+
+    def on_snapshot(self, callback: Callable) -> Watch:
+        return self._store._watch(self._collection, callback)
+
+
+class WriteBatch:
+    """Buffered writes applied atomically in a single simulated round trip."""
+
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(("set", reference, data, merge))
+        return self
+
+    def create(self, reference, data):
+        self._writes.append(("create", reference, data, False))
+        return self
+
+    def update(self, reference, data):
+        self._writes.append(("update", reference, data, True))
+        return self
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+        return self
+
+    def commit(self):
+        self._store._rpc()
+        self._store._commit(self._writes)
+        return [datetime.now(timezone.utc)] * len(self._writes)
+
+    def __len__(self):
+        return len(self._writes)
+
+
+class MemoryFirestore:
+    """
+    In-process stand-in for the subset of the Firestore client API the backend uses.
+    Selected with DATASTORE=memory for local runs, tests and load testing.
+
+    latency: seconds added to every RPC, or a zero-arg callable returning seconds.
+    error_rate: probability that an RPC fails with ServiceUnavailable.
+    """
+
+    def __init__(self, latency=0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rpc_count = 0
+        self._lock = threading.RLock()
+        self._data: Dict[str, Dict[str, tuple]] = {}
+        self._watches: List[Watch] = []
+
+    # --- Client API ---
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        """Snapshots of several documents in one round trip; missing ones don't exist."""
+        references = list(references)
+        self._rpc()
+        with self._lock:
+            reads = [self._read(ref.collection_name, ref.id) for ref in references]
+        for ref, (data, update_time) in zip(references, reads):
+            yield DocumentSnapshot(ref, data, update_time)
+
+    def load_json(self, collection: str, path: str, id_field: Optional[str] = None) -> int:
+        """Seeds a collection from a JSON array file (no simulated latency)."""
+        with open(path, "r") as f:
+            records = json.load(f)
+        with self._lock:
+            docs = self._collection(collection)
+            for record in records:
+                doc_id = str(record[id_field]) if id_field and record.get(id_field) else uuid.uuid4().hex[:20]
+                docs[doc_id] = (record, datetime.now(timezone.utc))
+        return len(records)
+
+    # --- Internals ---
+
+    def _rpc(self):
+        with self._lock:
+            self.rpc_count += 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            raise ServiceUnavailable("Injected datastore failure")
+
+    def _collection(self, name: str) -> Dict[str, tuple]:
+        return self._data.setdefault(name, {})
+
+    def _read(self, collection: str, doc_id: str):
+        data, update_time = self._collection(collection).get(doc_id, (None, None))
+        return data, update_time
+
+    def _commit(self, writes):
+        changes = []
+        with self._lock:
+            staged: Dict[tuple, Optional[dict]] = {}
+
+            def current(ref):
+                key = (ref.collection_name, ref.id)
+                return staged[key] if key in staged else self._read(ref.collection_name, ref.id)[0]
+
+            # Validate everything first so the batch applies all-or-nothing
+            for kind, ref, data, merge in writes:
+                existing = current(ref)
+                if kind == "create" and existing is not None:
+                    raise AlreadyExists(f"Document already exists: {ref.path}")
+                if kind == "update" and existing is None:
+                    raise NotFound(f"No document to update: {ref.path}")
+                if kind == "delete":
+                    staged[(ref.collection_name, ref.id)] = None
+                elif merge and existing is not None:
+                    staged[(ref.collection_name, ref.id)] = {**existing, **copy.deepcopy(data)}
+                else:
+                    staged[(ref.collection_name, ref.id)] = copy.deepcopy(data)
+
+            now = datetime.now(timezone.utc)
+            for (collection, doc_id), data in staged.items():
+                docs = self._collection(collection)
+                existed = doc_id in docs
+                if data is None:
+                    old = docs.pop(doc_id, (None, None))[0]
+                    if existed:
+                        changes.append((collection, "REMOVED", doc_id, old))
+                else:
+                    docs[doc_id] = (data, now)
+                    changes.append((collection, "MODIFIED" if existed else "ADDED", doc_id, data))
+            watches = list(self._watches)
+
+        self._notify(watches, changes, now)
+
+    def _watch(self, collection: str, callback: Callable) -> Watch:
+        watch = Watch(self, collection, callback)
+        with self._lock:
+            self._watches.append(watch)
+            snapshot = [
+                DocumentSnapshot(DocumentReference(self, collection, doc_id), data, ts)
+                for doc_id, (data, ts) in self._collection(collection).items()
+            ]
+        # Like Firestore, the first callback replays the current contents as ADDED
+        callback(snapshot, [DocumentChange("ADDED", doc) for doc in snapshot], datetime.now(timezone.utc))
+        return watch
+
+    def _unwatch(self, watch: Watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, watches, changes, read_time):
+        for watch in watches:
+            relevant = [
+                DocumentChange(kind, DocumentSnapshot(DocumentReference(self, collection, doc_id), data, read_time))
+                for collection, kind, doc_id, data in changes if collection == watch.collection
+            ]
+            if relevant:
+                watch.callback([change.document for change in relevant], relevant, read_time)
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+
+# Upper bounds in seconds; +Inf is implicit
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process histograms and counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(labels)
+            if hist is None:
+                hist = series[labels] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + amount
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for labels, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(hist.sum)}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return repr(float(value))
+
+
+metrics = MetricsRegistry()
+metrics.describe("organ_http_requests_total", "HTTP requests by route, method and status.")
+metrics.describe("organ_http_request_duration_seconds", "End-to-end request latency by route.")
+metrics.describe("organ_stage_duration_seconds", "Time spent per pipeline stage within one request.")
+
+
+# --- Per-request stage accounting ---
+
+class _RequestStats:
+    __slots__ = ("stages", "spans", "started")
+
+    def __init__(self, sampled: bool):
+        self.stages: Dict[str, float] = {}
+        self.spans: Optional[List[Tuple[str, float, float]]] = [] if sampled else None
+        self.started = perf_counter()
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request", default=None)
+
+# Most recent sampled request traces, newest last. Appended on the event loop and read
+# from threadpool handlers, so both hold _traces_lock.
+traces: deque = deque(maxlen=100)
+_traces_lock = threading.Lock()
+
+
+def recent_traces(limit: int) -> List[Dict]:
+    """Up to `limit` of the most recent traces, newest first."""
+    with _traces_lock:
+        snapshot = list(traces)
+    return snapshot[::-1][:limit]
+
+
+class stage:
+    """
+    Times a block as a named pipeline stage:
+
+        with stage("scoring"):
+            ...
+
+    Inside a request the time is added to that request's per-stage total (no locking),
+    and flushed as one histogram observation per stage when the request ends.
+    """
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        req = _current.get()
+        if req is None:
+            metrics.observe("organ_stage_duration_seconds", elapsed, (("route", "background"), ("stage", self.name)))
+            return False
+        req.stages[self.name] = req.stages.get(self.name, 0.0) + elapsed
+        if req.spans is not None:
+            req.spans.append((self.name, self.start - req.started, elapsed))
+        return False
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, status and per-stage totals by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        sampled = headers.get(b"x-trace") == b"1" or random.random() < settings.TRACE_SAMPLE_RATE
+        req = _RequestStats(sampled)
+        token = _current.set(req)
+        trace_id = uuid.uuid4().hex[:16] if sampled else None
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trace_id:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = perf_counter() - req.started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            metrics.inc("organ_http_requests_total", (("method", method), ("route", route), ("status", str(status["code"]))))
+            metrics.observe("organ_http_request_duration_seconds", elapsed, (("method", method), ("route", route)))
+            for name, total in req.stages.items():
+                metrics.observe("organ_stage_duration_seconds", total, (("route", route), ("stage", name)))
+            if trace_id:
+                trace = {
+                    "trace_id": trace_id,
+                    "route": route,
+                    "method": method,
+                    "status": status["code"],
+                    "timestamp": time.time(),
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "spans": [
+                        {"stage": name, "start_ms": round(start * 1000, 3), "duration_ms": round(dur * 1000, 3)}
+                        for name, start, dur in req.spans
+                    ],
+                }
+                with _traces_lock:
+                    traces.append(trace)
@@ -2,8 +2,10 @@ import firebase_admin
 from firebase_admin import auth, credentials
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import json
 import os
 from .config import settings
+from .tokens import TokenVerifier
 
 # Initialize Firebase Admin
 if not firebase_admin._apps:
@@ -18,9 +20,29 @@ if not firebase_admin._apps:
 
 security = HTTPBearer()
 
+def _project_id():
+    if settings.FIREBASE_PROJECT_ID:
+        return settings.FIREBASE_PROJECT_ID
+    try:
+        with open(settings.GOOGLE_APPLICATION_CREDENTIALS, "r") as f:
+            return json.load(f).get("project_id", "")
+    except (OSError, ValueError):
+        return ""
+
+# Local verification against cached Google certificates; without a project id to check
+# the audience against, requests fall back to the Admin SDK.
+_project = _project_id()
+token_verifier = TokenVerifier(
+    _project,
+    cache_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    clock_skew=settings.AUTH_CLOCK_SKEW_SECONDS,
+) if _project else None
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
+        if token_verifier is not None:
+            return token_verifier.verify(token)
         decoded_token = auth.verify_id_token(token)
         return decoded_token
     except Exception as e:
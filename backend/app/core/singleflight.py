@@ -0,0 +1,59 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .metrics import metrics
+
+metrics.describe("organ_singleflight_calls_total", "Coalesced calls by flight and role (leader computed, shared waited).")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    Callers arriving while a call for their key is in flight wait for it and share its
+    result (or exception). Nothing is cached: once the call returns, the next caller
+    computes afresh. Shared results must be treated as read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc("organ_singleflight_calls_total", (("flight", self.name), ("role", "shared")))
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.inc("organ_singleflight_calls_total", (("flight", self.name), ("role", "leader")))
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
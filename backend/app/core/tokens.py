@@ -0,0 +1,197 @@
+import datetime
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+# Public certificates for Firebase ID token signing keys, keyed by "kid"
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def fetch_google_certs(url: str = FIREBASE_CERTS_URL, timeout: float = 10.0) -> Tuple[Dict[str, str], float]:
+    """Returns ({kid: PEM certificate}, seconds the response may be cached)."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        certs = json.loads(response.read().decode("utf-8"))
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+    return certs, float(match.group(1)) if match else 3600.0
+
+
+class CertificateCache:
+    """
+    Signing keys by key id, refetched only once the previous response's Cache-Control
+    max-age has passed. An unknown key id triggers an early refetch (keys rotate),
+    at most once per `min_refresh` seconds so bogus tokens can't force fetch storms.
+    """
+
+    def __init__(self, fetch: Callable[[], Tuple[Dict[str, str], float]] = fetch_google_certs,
+                 clock: Callable[[], float] = time.time, min_refresh: float = 30.0):
+        self._fetch = fetch
+        self._clock = clock
+        self._min_refresh = min_refresh
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Any] = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self.fetches = 0
+
+    def get(self, kid: str):
+        now = self._clock()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+        with self._lock:
+            now = self._clock()
+            stale = now >= self._expires_at
+            if stale or (kid not in self._keys and now - self._fetched_at >= self._min_refresh):
+                self._refresh(now)
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidToken(f"Unknown signing key: {kid}")
+        return key
+
+    def _refresh(self, now: float):
+        certs, max_age = self._fetch()
+        self._keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+            for kid, pem in certs.items()
+        }
+        self._fetched_at = now
+        self._expires_at = now + max_age
+        self.fetches += 1
+
+
+class TokenVerifier:
+    """
+    Verifies Firebase ID tokens locally (RS256 signature, audience, issuer, expiry)
+    and keeps decoded claims in a bounded LRU keyed by the token's SHA-256 until the
+    token expires, so a repeat request costs one hash and a dictionary lookup.
+    """
+
+    def __init__(self, project_id: str, certs: Optional[CertificateCache] = None, cache_size: int = 10000,
+                 clock: Callable[[], float] = time.time, clock_skew: float = 0.0):
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self.certs = certs or CertificateCache(clock=clock)
+        self.cache_size = cache_size
+        self._clock = clock
+        self._clock_skew = clock_skew
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        now = self._clock()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if now < entry[0] + self._clock_skew:
+                    self._cache.move_to_end(digest)
+                    return entry[1]
+                del self._cache[digest]
+
+        claims = self._decode(token, now)
+        with self._lock:
+            self._cache[digest] = (float(claims["exp"]), claims)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str, now: float) -> Dict[str, Any]:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise InvalidToken(f"Malformed token: {e}")
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise InvalidToken("Token must be RS256-signed with a key id")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key=self.certs.get(header["kid"]),
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=self._clock_skew,
+                options={"require": ["exp", "iat", "aud", "iss", "sub"], "verify_exp": False, "verify_iat": False},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+
+        # Checked against our clock rather than PyJWT's so tests can control time
+        if claims["exp"] + self._clock_skew <= now:
+            raise InvalidToken("Token has expired")
+        if claims["iat"] - self._clock_skew > now:
+            raise InvalidToken("Token issued in the future")
+        if claims.get("auth_time", 0) - self._clock_skew > now:
+            raise InvalidToken("Token auth_time is in the future")
+        if not isinstance(claims["sub"], str) or not claims["sub"] or len(claims["sub"]) > 128:
+            raise InvalidToken("Token has an invalid subject")
+        claims["uid"] = claims["sub"]
+        return claims
+
+    def cached(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+
+class FakeTokenIssuer:
+    """
+    Local stand-in for Firebase Auth in tests: signs ID tokens with its own RSA key
+    and serves the matching certificate through `fetch`, shaped like Google's endpoint.
+    """
+
+    def __init__(self, project_id: str = "demo-project", max_age: float = 3600.0, clock: Callable[[], float] = time.time):
+        self.project_id = project_id
+        self.max_age = max_age
+        self.clock = clock
+        self.kid = uuid.uuid4().hex
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-securetoken")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(self._key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .sign(self._key, hashes.SHA256())
+        )
+        self._pem = cert.public_bytes(serialization.Encoding.PEM).decode("utf-8")
+
+    def fetch(self) -> Tuple[Dict[str, str], float]:
+        return {self.kid: self._pem}, self.max_age
+
+    def issue(self, uid: str, expires_in: float = 3600.0, **claims) -> str:
+        now = int(self.clock())
+        payload = {
+            "iss": f"https://securetoken.google.com/{self.project_id}",
+            "aud": self.project_id,
+            "auth_time": now,
+            "iat": now,
+            "exp": now + int(expires_in),
+            "sub": uid,
+            **claims,
+        }
+        return jwt.encode(payload, self._key, algorithm="RS256", headers={"kid": self.kid})
+
+    def verifier(self, **kwargs) -> TokenVerifier:
+        return TokenVerifier(self.project_id, CertificateCache(fetch=self.fetch, clock=self.clock),
+                             clock=self.clock, **kwargs)
@@ -0,0 +1,51 @@
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Older versions kept around for readers that still have them mapped
+KEEP_VERSIONS = 2
+
+
+def publish_version(directory: str, write: Callable[[str], None], stamp: Optional[datetime] = None) -> str:
+    """
+    Writes a new version directory with `write(path)` and atomically points CURRENT
+    at it, so readers see either the previous version or the complete new one.
+    Returns the new version's path.
+    """
+    stamp = stamp or datetime.now(timezone.utc)
+    os.makedirs(directory, exist_ok=True)
+    name = f"v-{stamp.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(directory, f".{name}.tmp")
+    os.makedirs(staging)
+    try:
+        write(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    os.rename(staging, os.path.join(directory, name))
+
+    pointer = os.path.join(directory, f".CURRENT.{uuid.uuid4().hex[:8]}")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+    _prune(directory, name)
+    return os.path.join(directory, name)
+
+
+def current_version(directory: str) -> Optional[str]:
+    """Path of the version CURRENT points at, or None if nothing was published."""
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(directory, name) if name else None
+
+
+def _prune(directory: str, current: str):
+    # Mapped files stay valid after removal on POSIX; Windows refuses, so removal is best effort
+    versions = sorted(e for e in os.listdir(directory) if e.startswith("v-") and e != current)
+    for entry in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
@@ -1,7 +1,18 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .routers import matches, analytics, registry
+from .core.metrics import MetricsMiddleware
+from .core.datastore_trace import DatastoreTraceMiddleware
+from .routers import matches, analytics, registry, events, metrics
+from .services.incremental import incremental_matcher
+from .services.allocations import allocation_scheduler
+from .services.ml_model import ml_service
+from .services.privacy import privacy_accountant
+from .services.events import event_log
+from .services.retraining import model_retrainer
+from .services.shared_pool import shared_pool
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,11 +27,51 @@ if settings.CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Trace-Id", "X-Datastore-Stats", "X-Allocation-Round", "X-Allocation-Computed-At"],
     )
 
+app.add_middleware(DatastoreTraceMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(matches.router, prefix="/match", tags=["matches"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 app.include_router(registry.router, prefix="/registry", tags=["registry"])
+app.include_router(events.router, prefix="/events", tags=["events"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+
+@app.on_event("startup")
+def start_registry_watch():
+    if settings.SUCCESS_MODEL_PATH:
+        ml_service.attach(settings.SUCCESS_MODEL_PATH, poll=settings.SHARED_POOL_POLL_SECONDS)
+    sharing = settings.SHARED_POOL and settings.DONOR_SNAPSHOT_DIR
+    if sharing:
+        # Every worker spends (and re-serves) the same per-recipient privacy releases
+        os.makedirs(settings.DONOR_SNAPSHOT_DIR, exist_ok=True)
+        privacy_accountant.share(os.path.join(settings.DONOR_SNAPSHOT_DIR, "privacy_ledger.sqlite"))
+        # ...and publishes dashboard events to one log, so SSE clients of any worker see them all
+        event_log.share(os.path.join(settings.DONOR_SNAPSHOT_DIR, "events.sqlite"), poll=settings.SHARED_POOL_POLL_SECONDS)
+    if sharing and not shared_pool.acquire():
+        # Another worker owns the watch and the matcher; map its published pool read-only
+        shared_pool.follow()
+        return
+    # Registrations made through the Next.js routes reach us via the Firestore watch
+    if settings.WATCH_REGISTRY:
+        incremental_matcher.start_watch()
+    incremental_matcher.start_expiry()
+    if settings.ALLOCATION_SCHEDULER:
+        allocation_scheduler.start()
+    model_retrainer.start()
+    if sharing:
+        shared_pool.start_publishing(incremental_matcher, allocation_scheduler)
+
+@app.on_event("shutdown")
+def stop_registry_watch():
+    shared_pool.stop()
+    event_log.stop()
+    model_retrainer.stop()
+    allocation_scheduler.stop()
+    incremental_matcher.stop_expiry()
+    incremental_matcher.stop_watch()
 
 @app.get("/")
 def read_root():
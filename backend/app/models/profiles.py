@@ -0,0 +1,227 @@
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..services.hla import format_typing, pack_codes, parse_hla_typing, unpack_codes
+
+
+class Categories:
+    """Interns a repeated string field (blood group, organ, location) into small integer codes."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(str(value))
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+blood_groups = Categories(["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"])
+organs = Categories()
+locations = Categories()
+
+# Donors mostly offer the same handful of organ combinations; share one tuple per combination
+_organ_sets: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+def _organ_set(names) -> Tuple[int, ...]:
+    codes = tuple(organs.encode(name) for name in (names or []))
+    return _organ_sets.setdefault(codes, codes)
+
+
+def _markers(value, codes) -> Optional[str]:
+    """The raw typing text worth keeping: None when it's exactly the canonical rendering of its codes."""
+    if codes is not None and value == format_typing(codes):
+        return None
+    # Legacy "X/6" strings repeat across thousands of profiles, so intern them
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Typed:
+    """HLA accessors shared by both record types; the typing is stored packed in `hla`."""
+    __slots__ = ()
+
+    @property
+    def hla_codes(self) -> Optional[Tuple[int, ...]]:
+        return unpack_codes(self.hla) if self.hla is not None else None
+
+    @property
+    def hla_markers(self):
+        return self._markers if self._markers is not None else format_typing(self.hla_codes)
+
+    def _set_typing(self, hla_markers, hla_codes):
+        self.hla = pack_codes(hla_codes)
+        self._markers = _markers(hla_markers, hla_codes)
+
+
+class Recipient(_Typed):
+    """Normalized recipient, with categorical fields held as codes. Use to_dict() for API output."""
+    __slots__ = ("id", "name", "age", "urgency_score", "blood", "location_code", "organ", "hla", "_markers",
+                 "registered_at", "allocated")
+    role = "recipient"
+
+    def __init__(self, id, name: str, age: int, urgency_score: int, blood_type: str, location: str,
+                 organ_required: str, hla_markers, hla_codes: Optional[Tuple[int, ...]],
+                 registered_at: Optional[str] = None, allocated: bool = False):
+        self.id = id
+        self.name = name
+        self.age = age
+        self.urgency_score = urgency_score
+        # ISO timestamp; breaks urgency ties on the waitlist
+        self.registered_at = registered_at
+        # An accepted allocation takes the recipient off the waitlist
+        self.allocated = allocated
+        self.blood = blood_groups.encode(blood_type)
+        self.location_code = locations.encode(location)
+        self.organ = organs.encode(organ_required)
+        self._set_typing(hla_markers, hla_codes)
+
+    @property
+    def blood_type(self) -> str:
+        return blood_groups.values[self.blood]
+
+    @property
+    def location(self) -> str:
+        return locations.values[self.location_code]
+
+    @property
+    def organ_required(self) -> str:
+        return organs.values[self.organ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "name": self.name,
+            "blood_type": self.blood_type,
+            "age": self.age,
+            "location": self.location,
+            "urgency_score": self.urgency_score,
+            "hla_markers": self.hla_markers,
+            "hla_codes": self.hla_codes,
+            "organ_required": self.organ_required,
+            "registered_at": self.registered_at,
+            "allocated": self.allocated,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Recipient":
+        """Builds a record from the normalized dict shape (as returned by to_dict)."""
+        markers = data.get("hla_markers", "0/6")
+        return cls(
+            id=data.get("id"),
+            name=data.get("name", "Unknown"),
+            age=data.get("age", 30),
+            urgency_score=data.get("urgency_score", 5),
+            blood_type=data.get("blood_type", "O+"),
+            location=data.get("location", "Unknown"),
+            organ_required=data.get("organ_required", "Kidney"),
+            hla_markers=markers,
+            hla_codes=data["hla_codes"] if "hla_codes" in data else parse_hla_typing(markers),
+            registered_at=data.get("registered_at"),
+            allocated=data.get("allocated", False),
+        )
+
+    @classmethod
+    def coerce(cls, profile) -> "Recipient":
+        return profile if isinstance(profile, cls) else cls.from_dict(profile)
+
+    def __repr__(self):
+        return f"Recipient({self.id!r}, {self.blood_type}, {self.organ_required})"
+
+
+class Donor(_Typed):
+    """Normalized donor, with categorical fields held as codes. Use to_dict() for API output."""
+    __slots__ = ("id", "age", "blood", "location_code", "organs", "hla", "_markers", "procured_at")
+    role = "donor"
+
+    def __init__(self, id, age: int, blood_type: str, location: str, organs_available,
+                 hla_markers, hla_codes: Optional[Tuple[int, ...]], procured_at: Optional[float] = None):
+        self.id = id
+        self.age = age
+        self.blood = blood_groups.encode(blood_type)
+        self.location_code = locations.encode(location)
+        self.organs = _organ_set(organs_available)
+        self._set_typing(hla_markers, hla_codes)
+        # Epoch seconds; organ viability windows run from here (None: no window)
+        self.procured_at = procured_at
+
+    @property
+    def blood_type(self) -> str:
+        return blood_groups.values[self.blood]
+
+    @property
+    def location(self) -> str:
+        return locations.values[self.location_code]
+
+    @property
+    def organs_available(self) -> List[str]:
+        return [organs.values[code] for code in self.organs]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "blood_type": self.blood_type,
+            "age": self.age,
+            "location": self.location,
+            "hla_markers": self.hla_markers,
+            "hla_codes": self.hla_codes,
+            "organs_available": self.organs_available,
+            "procured_at": self.procured_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Donor":
+        """Builds a record from the normalized dict shape (as returned by to_dict)."""
+        markers = data.get("hla_markers", "0/6")
+        return cls(
+            id=data.get("id"),
+            age=data.get("age", 30),
+            blood_type=data.get("blood_type", "O+"),
+            location=data.get("location", "Unknown"),
+            organs_available=data.get("organs_available", []),
+            hla_markers=markers,
+            hla_codes=data["hla_codes"] if "hla_codes" in data else parse_hla_typing(markers),
+            procured_at=data.get("procured_at"),
+        )
+
+    @classmethod
+    def coerce(cls, profile) -> "Donor":
+        return profile if isinstance(profile, cls) else cls.from_dict(profile)
+
+    @classmethod
+    def restore(cls, id, age: int, blood: int, location_code: int, organs: Tuple[int, ...],
+                hla: Optional[int], markers, procured_at: Optional[float] = None) -> "Donor":
+        """Rebuilds a record from fields already encoded against this process's tables (snapshot loading)."""
+        donor = cls.__new__(cls)
+        donor.id = id
+        donor.age = age
+        donor.blood = blood
+        donor.location_code = location_code
+        donor.organs = organs
+        donor.hla = hla
+        donor._markers = markers
+        donor.procured_at = procured_at
+        return donor
+
+    def with_organs(self, names) -> "Donor":
+        """A copy offering only `names` (what is left once other organs' windows close)."""
+        return Donor.restore(self.id, self.age, self.blood, self.location_code, _organ_set(names),
+                             self.hla, self._markers, self.procured_at)
+
+    def __repr__(self):
+        return f"Donor({self.id!r}, {self.blood_type}, {self.organs_available})"
@@ -25,7 +25,8 @@ class MatchScoreBreakdown(BaseModel):
 
 class MatchResult(BaseModel):
     donor_id: Any
-    score: float
+    # None once the recipient's privacy budget is spent
+    score: Optional[float]
     blood_type: str
     donor_organs: List[str] = []
     location: str
@@ -40,17 +41,41 @@ class MatchResult(BaseModel):
 class MatchResponse(BaseModel):
     recipient: Dict[str, Any]
     matches: List[MatchResult]
+    # Candidates whose scores were withheld for lack of privacy budget
+    withheld: int = 0
 
 class GlobalMatchResult(BaseModel):
     donor_id: Any
     exact_score: float
-    noisy_score: float
+    noisy_score: Optional[float]
     prob_success: float
     location: str
     donor_organs: List[str] = []
 
 class GlobalMatchResponse(BaseModel):
     matches: List[GlobalMatchResult]
+    withheld: int = 0
+
+class FederatedMatchRequest(BaseModel):
+    recipient_id: Any
+    k: int = 3
+
+class FederatedMatchResult(BaseModel):
+    donor_id: Any
+    score: Optional[float]
+    location: str
+
+class ShardStatus(BaseModel):
+    location: str
+    status: str
+    returned: int
+    elapsed_ms: float
+
+class FederatedMatchResponse(BaseModel):
+    matches: List[FederatedMatchResult]
+    shards: List[ShardStatus]
+    partial: bool
+    withheld: int = 0
 
 class MatchRequestCreate(BaseModel):
     donor_id: str
@@ -66,3 +91,25 @@ class MatchRequestCreate(BaseModel):
 class MatchAcceptCreate(BaseModel):
     request_id: str
     request_data: Dict[str, Any]
+    # Retries with the same key are no-ops; defaults to one acceptance per request
+    idempotency_key: Optional[str] = None
+
+class MatchAcceptBulkCreate(BaseModel):
+    acceptances: List[MatchAcceptCreate]
+
+class MatchRejectCreate(BaseModel):
+    request_id: str
+    reason: Optional[str] = None
+
+class ExchangePairCreate(BaseModel):
+    # Defaults to "<donor_id>:<recipient_id>"
+    pair_id: Optional[str] = None
+    donor_id: Any
+    recipient_id: Any
+
+class ExchangeRunRequest(BaseModel):
+    pairs: List[ExchangePairCreate]
+    altruistic_donor_ids: List[Any] = []
+    max_cycle_length: Optional[int] = None
+    max_chain_length: Optional[int] = None
+    time_budget_seconds: Optional[float] = None
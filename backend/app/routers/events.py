@@ -0,0 +1,36 @@
+import json
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from ..core.config import settings
+from ..services.events import event_log
+
+router = APIRouter()
+
+@router.get("/stream")
+async def stream_events(request: Request, since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events feed of allocation status changes, new match requests and acceptances.
+    Reconnecting clients resume from the Last-Event-ID header (sent automatically by
+    EventSource) or ?since=<offset>; new clients start at the current head.
+    """
+    if event_log.subscribers >= settings.EVENT_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many event subscribers")
+
+    if since is None:
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else event_log.head
+
+    async def body():
+        async for event in event_log.stream(since):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event.offset}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
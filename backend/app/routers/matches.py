@@ -1,198 +1,236 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from typing import Dict, List, Optional
+from google.api_core.exceptions import AlreadyExists, NotFound
+from ..core.config import settings
 from ..core.security import get_current_user
 from ..core.firebase import db
-from ..models.schemas import MatchResponse, MatchResult, GlobalMatchRequest, GlobalMatchResponse, GlobalMatchResult
+from ..core.metrics import stage
+from ..core.singleflight import SingleFlight
+from ..core.responses import FastJSONResponse
+from ..models.schemas import MatchResponse, GlobalMatchRequest, GlobalMatchResponse, FederatedMatchRequest, FederatedMatchResponse
 from ..services.profile_service import profile_service
-from ..services.matching import get_blood_compatibility, basic_compatibility_score, noisy_score, get_noisy_age_diff, parse_hla, private_compatibility_score
+from ..services.matching import get_blood_compatibility, basic_compatibility_score, noisy_score, get_noisy_age_diff, parse_hla, private_compatibility_score, dp_mech_score, dp_mech_age
 from ..services.ml_model import ml_service
+from ..services.hla import hla_scores
+from ..services.organ_index import organ_key
+from ..services.privacy import privacy_accountant, PrivacyBudgetExceeded
+from ..services.incremental import incremental_matcher
+from ..services.events import event_log
+from ..services.allocations import allocation_scheduler
+from ..services.shared_pool import shared_pool
+from ..services.federated import federated_matcher
 from datetime import datetime
 
 router = APIRouter()
 
+# Concurrent queries for the same recipient and pool version share one exact scoring pass
+_match_flights = SingleFlight("match")
+_global_flights = SingleFlight("global_match")
+
 @router.get("/allocations", response_model=List[dict])
-def get_recent_allocations():
-    """
-    Finds matches for the top 5 most urgent/recent pending patients.
-    Returns a list of allocation requests with patient details and best match found.
-    Persists these matches to Firestore 'matches' collection.
+def get_recent_allocations(n: int = Query(settings.ALLOCATION_ROUND_SIZE, ge=1, le=settings.WAITLIST_MAX_TOP_N),
+                           organ: Optional[str] = None):
     """
-    # 1. Get Recipients (Top 5 by urgency or recency)
-    all_patients = profile_service.get_recipients()
-    # Sort by urgency_score desc
-    pending_patients = sorted(all_patients, key=lambda p: p.get("urgency_score", 0), reverse=True)[:5]
-
-    # Debug Logging
-    with open("debug_log.txt", "a") as f:
-        f.write(f"\n--- API Call {datetime.utcnow()} ---\n")
-        f.write(f"Found {len(all_patients)} total recipients.\n")
-        f.write(f"Processing {len(pending_patients)} pending patients.\n")
-
-    allocations = []
-    donors = profile_service.get_donors()
-    
-    for patient in pending_patients:
-        best_match = None
-        highest_score = 0
-        status = "Pending"
-        
-        # Find best match from donors
-        for donor in donors:
-             # Basic hard constraint: Blood Type
-             # Note: logic should be robust enough to handle strict checks
-             if not get_blood_compatibility(donor["blood_type"], patient["blood_type"]):
-                 continue
-                 
-             score, _, _ = basic_compatibility_score(patient, donor)
-             if score > highest_score:
-                 highest_score = score
-                 best_match = donor
-        
-        # Determine status/color
-        status_color = "bg-slate-100 text-slate-700"
-        if highest_score > 0.8:
-            status = "Match Found"
-            status_color = "bg-green-100 text-green-800"
-        elif highest_score > 0.5:
-            status = "Potential Match"
-            status_color = "bg-blue-100 text-blue-800"
-        else:
-            status = "Waiting"
-            status_color = "bg-amber-100 text-amber-800"
+    Latest allocation round: the most urgent waiting patients (earliest registered
+    first on ties) with the best match found for each. Rounds are computed and
+    persisted to the Firestore 'matches' collection by the background scheduler when
+    the registry changes, not per read.
 
-        allocation_record = {
-            "id": f"REQ-{patient['id'][:4].upper()}",
-            "patient_id": patient['id'],
-            "organ": patient.get("organ_required", "Unknown"),
-            "patient_name": patient['name'],
-            "patient_details": f"{patient['name']} ({patient['blood_type']}/{patient['age']}y)",
-            "urgency_score": patient.get('urgency_score'),
-            "score_display": f"Urgency: {patient.get('urgency_score')}/10",
-            "status": status,
-            "statusColor": status_color,
-            "best_match_donor_id": best_match['id'] if best_match else None,
-            "match_score": highest_score,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        allocations.append({
-            "id": allocation_record["id"],
-            "organ": allocation_record["organ"],
-            "patient": allocation_record["patient_details"],
-            "score": allocation_record["score_display"],
-            "status": allocation_record["status"],
-            "statusColor": allocation_record["statusColor"],
-            "best_match_donor": allocation_record["best_match_donor_id"]
+    Other sizes (`n`) or a single `organ` are read straight off the live waitlist
+    and are not persisted.
+    """
+    custom = n != allocation_scheduler.size or organ is not None
+    if shared_pool.attached():
+        # Follower worker: serve the round the owning worker published
+        published = shared_pool.allocation_round()
+        if published is not None:
+            rows = published["allocations"]
+            if custom:
+                # Followers hold no waitlist; narrow the published round instead
+                rows = [r for r in rows if organ is None or organ_key(r["organ"]) == organ_key(organ)][:n]
+            return FastJSONResponse(rows, headers={
+                "X-Allocation-Round": str(published["round"]),
+                "X-Allocation-Computed-At": published["computed_at"],
+            })
+    if custom:
+        return FastJSONResponse(allocation_scheduler.preview(n, organ), headers={
+            "X-Allocation-Computed-At": datetime.utcnow().isoformat(),
         })
+    current = allocation_scheduler.current()
+    return FastJSONResponse(current.allocations, headers={
+        "X-Allocation-Round": str(current.round),
+        "X-Allocation-Computed-At": current.computed_at,
+    })
 
-        # Save to Firestore
-        try:
-            db.collection('matches').document(allocation_record["id"]).set(allocation_record)
-            with open("debug_log.txt", "a") as f:
-                f.write(f"SUCCESS: Saved match {allocation_record['id']}\n")
-        except Exception as e:
-            error_msg = f"ERROR saving match {allocation_record['id']}: {e}\n"
-            print(error_msg)
-            with open("debug_log.txt", "a") as f:
-                f.write(error_msg)
-        
-    return allocations
+def _pool_version():
+    """Version of the donor pool this worker matches against (the shared snapshot's in follower workers)."""
+    return shared_pool.version if shared_pool.attached() else incremental_matcher.version
+
+def _withheld_headers(withheld: int) -> Dict[str, str]:
+    """Tells clients how many candidates came back without a score because the privacy budget is spent."""
+    return {"X-Privacy-Withheld": str(withheld)} if withheld else {}
+
+def _find_recipient(recipient_id, track=True):
+    """Pooled recipient, else fetched from Firestore (and added to this worker's matcher when `track`)."""
+    following = shared_pool.attached()
+    recipient = None
+    if not following:
+        incremental_matcher.ensure_primed()
+        recipient = incremental_matcher.get_recipient(recipient_id)
+    if recipient:
+        return recipient
 
-@router.get("/{recipient_id}", response_model=MatchResponse) # Removed auth dependency for demo ease, or keep it strict? Keeping strict but might need loose for initial test if token is tricky.
-# STRICT MODE: dependencies=[Depends(get_current_user)]
-def find_matches(recipient_id: int): #, user=Depends(get_current_user)):
-    # 1. Find Recipient
     recipient = profile_service.get_by_id(recipient_id)
     if not recipient:
         raise HTTPException(status_code=404, detail="Recipient not found")
-    
-    if recipient["role"] != "recipient":
+    if recipient.role != "recipient":
         raise HTTPException(status_code=400, detail="ID belongs to a donor, not recipient")
+    if track and not following:
+        incremental_matcher.on_recipient_added(recipient)
+    return recipient
 
-    # 2. Get Donors
-    donors = profile_service.get_donors()
-    
-    matches = []
-    
-    for donor in donors:
-        # Pre-filter
-        is_compat = get_blood_compatibility(donor["blood_type"], recipient["blood_type"])
-        if not is_compat:
-            continue
-            
-        r_age = recipient["age"]
-        d_age = donor["age"]
-        
-        age_diff = abs(d_age - r_age)
-        
+def _exact_matches(recipient):
+    """
+    Exact (pre-noise) score rows for a recipient's precomputed candidates.
+    Shared between coalesced callers, so the rows must not be mutated.
+    """
+    if shared_pool.attached():
+        top = shared_pool.top_candidates(recipient, incremental_matcher.k)
+    else:
+        top = incremental_matcher.top_candidates(recipient.id)
+    scored = []
+    for _, donor in top:
         # Calculate 0-1 Score
-        compat_score, breakdown, distance_km = basic_compatibility_score(recipient, donor)
+        with stage("compatibility_score"):
+            compat_score, breakdown, distance_km = basic_compatibility_score(recipient, donor)
 
         if compat_score > 0.2: # Loose threshold
-            # Privacy Noise
-            noisy_age = get_noisy_age_diff(float(age_diff))
-            noisy_compat_score = noisy_score(compat_score)
-            
-            # Predict Success
-            success_prob = ml_service.predict_probability(donor['age'], recipient.get('urgency_score', 0))
-
-            matches.append(MatchResult(
-                donor_id=donor["id"],
-                score=round(noisy_compat_score * 100, 1),
-                blood_type=donor["blood_type"],
-                donor_organs=donor.get("organs_available", []),
-                location=donor["location"],
-                match_reason=f"Combined Score {compat_score:.2f} (Blood/HLA/Loc)",
-                privacy_note=f"DP Applied: Age ±{abs(noisy_age-age_diff)}, Score ±{abs(round(noisy_compat_score-compat_score, 2))}",
-                raw_score=float(compat_score),
-                distance_km=distance_km,
-                score_breakdown=breakdown,
-                success_probability=round(success_prob * 100, 1)
-            ))
-            
+            scored.append((donor, compat_score, breakdown, distance_km))
+
+    # Predict Success for all kept candidates in one pass over the forest
+    with stage("ml_inference"):
+        probs = ml_service.predict_batch([donor.age for donor, *_ in scored], recipient.urgency_score).tolist()
+    return [
+        (donor, abs(donor.age - recipient.age), compat_score, breakdown, distance_km, success_prob)
+        for (donor, compat_score, breakdown, distance_km), success_prob in zip(scored, probs)
+    ]
+
+@router.get("/{recipient_id}", response_model=MatchResponse) # Removed auth dependency for demo ease, or keep it strict? Keeping strict but might need loose for initial test if token is tricky.
+# STRICT MODE: dependencies=[Depends(get_current_user)]
+def find_matches(recipient_id: int): #, user=Depends(get_current_user)):
+    # 1. Find Recipient
+    recipient = _find_recipient(recipient_id)
+
+    # 2. Exact scores of the precomputed organ- and blood-compatible candidates
+    rows = _match_flights.do((str(recipient.id), _pool_version()), lambda: _exact_matches(recipient))
+
+    matches = []
+    withheld = 0
+    # Best candidates first, so the recipient's privacy budget goes to the ten that are shown
+    for donor, age_diff, compat_score, breakdown, distance_km, success_prob in sorted(rows, key=lambda r: -r[2])[:10]:
+        # Privacy noise is applied per caller on top of the shared exact values
+        # (memoized per pair; repeat queries reuse the same release)
+        try:
+            with stage("dp_noise"):
+                noisy_age = privacy_accountant.release(
+                    recipient.id, donor.id, "age", float(age_diff), get_noisy_age_diff, dp_mech_age.epsilon)
+                noisy_compat_score = privacy_accountant.release(
+                    recipient.id, donor.id, "score", compat_score, noisy_score, dp_mech_score.epsilon)
+            score = round(noisy_compat_score * 100, 1)
+            privacy_note = f"DP Applied: Age ±{abs(noisy_age-age_diff)}, Score ±{abs(round(noisy_compat_score-compat_score, 2))}"
+        except PrivacyBudgetExceeded:
+            # Still listed, without a score, so the candidate isn't silently missing
+            withheld += 1
+            score = None
+            privacy_note = "Privacy budget spent: score withheld"
+
+        # Plain dicts in the MatchResult shape: built from trusted values, so they skip
+        # model construction and response validation and go straight to the encoder
+        matches.append({
+            "donor_id": donor.id,
+            "score": score,
+            "blood_type": donor.blood_type,
+            "donor_organs": donor.organs_available,
+            "location": donor.location,
+            "match_reason": f"Combined Score {compat_score:.2f} (Blood/HLA/Loc)",
+            "privacy_note": privacy_note,
+            "raw_score": float(compat_score),
+            "distance_km": distance_km,
+            "score_breakdown": breakdown,
+            "success_probability": round(success_prob * 100, 1)
+        })
+
     # Sort by score
-    matches.sort(key=lambda x: x.raw_score, reverse=True)
+    with stage("sort"):
+        matches.sort(key=lambda x: x["raw_score"], reverse=True)
     
-    return MatchResponse(
-        recipient={
-            "id": recipient["id"],
-            "blood_type": recipient["blood_type"],
-            "urgency": recipient.get("urgency_score")
-        },
-        matches=matches[:10]
-    )
+    with stage("serialize"):
+        return FastJSONResponse({
+            "recipient": {
+                "id": recipient.id,
+                "blood_type": recipient.blood_type,
+                "urgency": recipient.urgency_score
+            },
+            "matches": matches,
+            "withheld": withheld
+        }, headers=_withheld_headers(withheld))
+
+def _exact_global(recipient_id):
+    """Recipient lookup and exact scores against the whole donor pool; shared between coalesced callers."""
+    recipient = _find_recipient(recipient_id, track=False)
+
+    # Only donors offering the needed organ with a compatible blood group are scored
+    with stage("candidate_filter"):
+        if shared_pool.attached():
+            candidates = shared_pool.candidates(recipient)
+        else:
+            candidates = incremental_matcher.candidates(recipient)
+    with stage("compatibility_score"):
+        hla = hla_scores(recipient, candidates)
+
+    with stage("ml_inference"):
+        probs = ml_service.predict_batch([donor.age for donor in candidates], recipient.urgency_score).tolist()
+
+    rows = []
+    for donor, hla_score, prob in zip(candidates, hla, probs):
+        # Re-using private score logic from old main.py (refactored)
+        # Note: private_compatibility_score wasn't in matching.py, I'll inline it or use basic + noisy
+        with stage("compatibility_score"):
+            compat_score, _, _ = basic_compatibility_score(recipient, donor, hla_score)
+        rows.append((donor, compat_score, prob))
+    return recipient, rows
 
 @router.post("", response_model=GlobalMatchResponse) # Global match map
 def find_matches_global(request: GlobalMatchRequest):
     recipient_id = request.recipient_id
-    recipient = profile_service.get_by_id(recipient_id)
-    if not recipient:
-        raise HTTPException(status_code=404, detail="Recipient not found")
+    recipient, rows = _global_flights.do(
+        (str(recipient_id), _pool_version()), lambda: _exact_global(recipient_id))
 
     matches = []
-    donors = profile_service.get_donors()
-    
-    for donor in donors:
-        if not get_blood_compatibility(donor["blood_type"], recipient["blood_type"]):
-            continue
-
-        # Re-using private score logic from old main.py (refactored)
-        # Note: private_compatibility_score wasn't in matching.py, I'll inline it or use basic + noisy
-        compat_score, _, _ = basic_compatibility_score(recipient, donor)
-        noisy = noisy_score(compat_score)
-        
-        prob = ml_service.predict_probability(donor['age'], recipient.get('urgency_score', 0))
+    withheld = 0
+    # Best candidates first, so a spent budget cuts off the weakest
+    for donor, compat_score, prob in sorted(rows, key=lambda r: -r[1]):
+        # Each caller gets its own privacy release of the shared exact score
+        try:
+            with stage("dp_noise"):
+                noisy = round(privacy_accountant.release(
+                    recipient.id, donor.id, "score", compat_score, noisy_score, dp_mech_score.epsilon), 3)
+        except PrivacyBudgetExceeded:
+            withheld += 1
+            noisy = None
         
-        matches.append(GlobalMatchResult(
-            donor_id=donor["id"],
-            exact_score=round(compat_score, 3),
-            noisy_score=round(noisy, 3),
-            prob_success=round(prob, 3),
-            location=donor["location"],
-            donor_organs=donor.get("organs_available", [])
-        ))
-
-    top_matches = sorted(matches, key=lambda x: x.noisy_score, reverse=True)[:5]
+        matches.append({
+            "donor_id": donor.id,
+            "exact_score": round(compat_score, 3),
+            "noisy_score": noisy,
+            "prob_success": round(prob, 3),
+            "location": donor.location,
+            "donor_organs": donor.organs_available
+        })
+
+    with stage("sort"):
+        # Withheld scores rank after the released ones
+        top_matches = sorted(matches, key=lambda x: (x["noisy_score"] is not None, x["noisy_score"] or 0), reverse=True)[:5]
     
     # Persistence: Save the best match for this recipient to Firestore
     if top_matches:
@@ -207,10 +245,10 @@ def find_matches_global(request: GlobalMatchRequest):
         status = "Pending"
         status_color = "bg-slate-100 text-slate-700"
         
-        if best.exact_score > 0.8:
+        if best["exact_score"] > 0.8:
             status = "Match Found"
             status_color = "bg-green-100 text-green-800"
-        elif best.exact_score > 0.5:
+        elif best["exact_score"] > 0.5:
             status = "Potential Match"
             status_color = "bg-blue-100 text-blue-800"
         else:
@@ -218,30 +256,63 @@ def find_matches_global(request: GlobalMatchRequest):
             status_color = "bg-amber-100 text-amber-800"
             
         # safely handle ID
-        r_id_str = str(recipient["id"])
+        r_id_str = str(recipient.id)
         match_id = f"REQ-{r_id_str[:4].upper()}" if len(r_id_str) >= 4 else f"REQ-{r_id_str}"
         
         allocation_record = {
             "id": match_id,
-            "patient_id": recipient['id'],
-            "organ": recipient.get("organ_required", "Unknown"),
-            "patient_name": recipient['name'],
-            "patient_details": f"{recipient['name']} ({recipient['blood_type']}/{recipient['age']}y)",
-            "urgency_score": recipient.get('urgency_score'),
-            "score_display": f"Urgency: {recipient.get('urgency_score')}/10",
+            "patient_id": recipient.id,
+            "organ": recipient.organ_required,
+            "patient_name": recipient.name,
+            "patient_details": f"{recipient.name} ({recipient.blood_type}/{recipient.age}y)",
+            "urgency_score": recipient.urgency_score,
+            "score_display": f"Urgency: {recipient.urgency_score}/10",
             "status": status,
             "statusColor": status_color,
-            "best_match_donor_id": best.donor_id,
-            "match_score": best.exact_score,
+            "best_match_donor_id": best["donor_id"],
+            "match_score": best["exact_score"],
             "timestamp": datetime.utcnow().isoformat()
         }
 
         try:
-             db.collection('matches').document(allocation_record["id"]).set(allocation_record)
+             allocation_scheduler.save([allocation_record])
         except Exception as e:
              print(f"Error saving global match {match_id}: {e}")
 
-    return GlobalMatchResponse(matches=top_matches)
+    return FastJSONResponse({"matches": top_matches, "withheld": withheld}, headers=_withheld_headers(withheld))
+
+@router.post("/federated", response_model=FederatedMatchResponse)
+def find_matches_federated(request: FederatedMatchRequest):
+    """
+    Federated match: each hospital shard scores its own donors concurrently and
+    shares only its local top-k scores, which are merged into the global top-k.
+    Shards that miss the deadline are reported and the answer is marked partial.
+    """
+    recipient = _find_recipient(request.recipient_id, track=False)
+    top, shards = federated_matcher.match(recipient, max(1, min(request.k, 50)))
+
+    matches = []
+    withheld = 0
+    for score, donor_id, location in top:
+        # Only the privacy-noised score is released, as in the global map
+        try:
+            with stage("dp_noise"):
+                noisy = round(privacy_accountant.release(
+                    recipient.id, donor_id, "score", score, noisy_score, dp_mech_score.epsilon), 3)
+        except PrivacyBudgetExceeded:
+            withheld += 1
+            noisy = None
+        matches.append({"donor_id": donor_id, "score": noisy, "location": location})
+
+    return FastJSONResponse({
+        "matches": matches,
+        "shards": [
+            {"location": s.location, "status": s.status, "returned": len(s.matches), "elapsed_ms": round(s.elapsed_ms, 1)}
+            for s in shards
+        ],
+        "partial": any(s.status != "ok" for s in shards),
+        "withheld": withheld,
+    }, headers=_withheld_headers(withheld))
 
 from ..models.schemas import MatchRequestCreate
 
@@ -257,69 +328,262 @@ def create_match_request(request: MatchRequestCreate):
     # Save to Firestore 'requests' collection (Admin SDK)
     try:
         # Note: db.collection().add returns (update_time, doc_ref)
-        update_time, doc_ref = db.collection('requests').add(data)
+        with stage("persist"):
+            update_time, doc_ref = db.collection('requests').add(data)
+        event_log.publish("match_request", {
+            "id": doc_ref.id,
+            "donor_id": data["donor_id"],
+            "location": data["location"],
+            "requested_by_name": data["requested_by_name"],
+            "requested_at": data["requested_at"],
+            "status": data["status"]
+        })
         return {"success": True, "id": doc_ref.id, "message": "Request submitted successfully"}
     except Exception as e:
         print(f"Error saving request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-from ..models.schemas import MatchAcceptCreate
+from ..models.schemas import MatchAcceptCreate, MatchAcceptBulkCreate
+
+ACCEPTED_COLLECTION = 'requests_accepted'
+# Firestore caps a batch at 500 writes; an acceptance is two, three with its patient's status
+ACCEPT_BATCH_WRITES = 500
+
+def _request_collection(request_id: str) -> str:
+    """System allocations are stored in 'matches' under "REQ-" ids; user requests in 'requests'."""
+    return 'matches' if request_id.startswith("REQ-") else 'requests'
+
+def _allocated_patient(collection: str, acceptance: MatchAcceptCreate) -> Optional[str]:
+    """The patient an accepted system allocation is for, if the request data names one."""
+    if collection != 'matches':
+        return None
+    data = acceptance.request_data
+    patient_id = data.get("patient_id") or (data.get("fullData") or {}).get("patient_id")
+    return str(patient_id) if patient_id is not None else None
+
+def _stage_accept(batch, acceptance: MatchAcceptCreate, idempotency_key: Optional[str] = None) -> Dict:
+    """
+    Adds an acceptance to `batch` without reading anything: the status updates fail with
+    NotFound if the request (or the allocation's patient) does not exist, and the create
+    fails with AlreadyExists if this idempotency key was already accepted, so the batch
+    commits all or nothing. An accepted allocation marks its patient "allocated".
+    """
+    request_id = acceptance.request_id
+    collection = _request_collection(request_id)
+    key = idempotency_key or acceptance.idempotency_key or f"{collection}-{request_id}"
+    accepted_at = datetime.utcnow().isoformat()
+
+    accepted_data = dict(acceptance.request_data)
+    # Remove docId/id to avoid conflicts
+    accepted_data.pop("id", None)
+    accepted_data.pop("docId", None)
+    accepted_data.update({
+        "status": "accepted",
+        "accepted_at": accepted_at,
+        "original_request_id": request_id,
+        "original_collection": collection,
+        "idempotency_key": key,
+    })
+
+    batch.update(db.collection(collection).document(request_id), {"status": "accepted", "accepted_at": accepted_at})
+    batch.create(db.collection(ACCEPTED_COLLECTION).document(key), accepted_data)
+    patient_id = _allocated_patient(collection, acceptance)
+    if patient_id is not None:
+        batch.update(db.collection('recipients').document(patient_id), {"status": "allocated", "allocatedAt": accepted_at})
+    return {"request_id": request_id, "id": key, "collection": collection, "accepted_at": accepted_at,
+            "patient_id": patient_id}
+
+def _accepted(staged: Dict, acceptance: MatchAcceptCreate):
+    if staged["patient_id"] is not None:
+        # Other workers follow the persisted status; this one needn't wait for its watch
+        incremental_matcher.mark_allocated(staged["patient_id"])
+    event_log.publish("match_accepted", {
+        "request_id": staged["request_id"],
+        "accepted_id": staged["id"],
+        "collection": staged["collection"],
+        "accepted_at": staged["accepted_at"]
+    })
+
+def _accept_one(acceptance: MatchAcceptCreate, idempotency_key: Optional[str] = None) -> Dict:
+    """Commits one acceptance in a single round trip; returns its per-item result."""
+    batch = db.batch()
+    staged = _stage_accept(batch, acceptance, idempotency_key)
+    try:
+        with stage("persist"):
+            batch.commit()
+    except AlreadyExists:
+        return {"request_id": staged["request_id"], "id": staged["id"], "status": "already_accepted"}
+    except NotFound:
+        return {"request_id": staged["request_id"], "id": None, "status": "not_found"}
+    _accepted(staged, acceptance)
+    return {"request_id": staged["request_id"], "id": staged["id"], "status": "accepted"}
 
 @router.post("/accept")
-def accept_match_request(acceptance: MatchAcceptCreate):
+def accept_match_request(acceptance: MatchAcceptCreate, idempotency_key: Optional[str] = Header(None)):
     """
     Accept a match request.
-    Updates the request status and adds an entry to requests_accepted.
+    Updates the request status and adds an entry to requests_accepted in one atomic
+    batch. Retrying with the same idempotency key (body field or Idempotency-Key header)
+    returns the original acceptance without writing again.
     """
     try:
-        request_id = acceptance.request_id
-        data = acceptance.request_data
-        
-        # Determine collection based on ID or try both
-        # System allocations (matches) use custom IDs starting with "REQ-" usually, 
-        # while user requests use auto-generated IDs.
-        
-        target_collection = 'requests'
-        doc_ref = db.collection(target_collection).document(request_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            # Try 'matches' collection
-            target_collection = 'matches'
-            doc_ref = db.collection(target_collection).document(request_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                 raise HTTPException(status_code=404, detail=f"Request/Match {request_id} not found")
-
-        # Update status
-        doc_ref.update({
-            "status": "accepted",
-            "accepted_at": datetime.utcnow().isoformat()
-        })
-        
-        # Create a copy in requests_accepted collection
-        accepted_data = data.copy()
-        accepted_data.update({
-            "status": "accepted",
-            "accepted_at": datetime.utcnow().isoformat(),
-            "original_request_id": request_id,
-            "original_collection": target_collection
-        })
-        
-        # Remove docId/id to avoid conflicts
-        accepted_data.pop("id", None) 
-        accepted_data.pop("docId", None) 
-        
-        _, new_doc_ref = db.collection('requests_accepted').add(accepted_data)
-        
-        return {"success": True, "id": new_doc_ref.id, "message": "Accepted successfully"}
-        
-    except HTTPException as he:
-        raise he
+        result = _accept_one(acceptance, idempotency_key)
     except Exception as e:
         print(f"Error accepting request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    if result["status"] == "not_found":
+        raise HTTPException(status_code=404, detail=f"Request/Match {acceptance.request_id} not found")
+    if result["status"] == "already_accepted":
+        return {"success": True, "id": result["id"], "replayed": True, "message": "Already accepted"}
+    return {"success": True, "id": result["id"], "replayed": False, "message": "Accepted successfully"}
+
+@router.post("/accept/bulk")
+def accept_match_requests_bulk(request: MatchAcceptBulkCreate):
+    """
+    Accept many match requests at once, e.g. a coordinator clearing a queue.
+    Acceptances are committed in batches of up to 500 writes; a batch that fails because one item
+    is missing or already accepted is retried item by item, so every item gets its own
+    result (accepted, already_accepted, not_found or error).
+    """
+    if len(request.acceptances) > settings.ACCEPT_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.ACCEPT_BULK_MAX_ITEMS} acceptances per call")
+
+    chunks, chunk, writes = [], [], 0
+    for acceptance in request.acceptances:
+        cost = 2 if _allocated_patient(_request_collection(acceptance.request_id), acceptance) is None else 3
+        if writes + cost > ACCEPT_BATCH_WRITES:
+            chunks.append(chunk)
+            chunk, writes = [], 0
+        chunk.append(acceptance)
+        writes += cost
+    if chunk:
+        chunks.append(chunk)
+
+    results = []
+    for chunk in chunks:
+        batch = db.batch()
+        staged = [_stage_accept(batch, acceptance) for acceptance in chunk]
+        try:
+            with stage("persist"):
+                batch.commit()
+        except (AlreadyExists, NotFound):
+            for acceptance in chunk:
+                try:
+                    results.append(_accept_one(acceptance))
+                except Exception as e:
+                    results.append({"request_id": acceptance.request_id, "id": None, "status": "error", "detail": str(e)})
+            continue
+        except Exception as e:
+            print(f"Error accepting requests: {e}")
+            results.extend({"request_id": s["request_id"], "id": None, "status": "error", "detail": str(e)} for s in staged)
+            continue
+        for s, acceptance in zip(staged, chunk):
+            _accepted(s, acceptance)
+            results.append({"request_id": s["request_id"], "id": s["id"], "status": "accepted"})
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"success": "error" not in counts, "counts": counts, "results": results}
 
+from ..models.schemas import MatchRejectCreate
 
+@router.post("/reject")
+def reject_match_request(rejection: MatchRejectCreate):
+    """
+    Rejects a match request or allocation. Rejections are the negative outcomes the
+    success model is retrained on.
+    """
+    # The id names the collection, and the update fails with NotFound if there's no such request
+    collection = _request_collection(rejection.request_id)
+    rejected_at = datetime.utcnow().isoformat()
+    try:
+        with stage("persist"):
+            db.collection(collection).document(rejection.request_id).update(
+                {"status": "rejected", "rejected_at": rejected_at, "rejection_reason": rejection.reason})
+    except NotFound:
+        raise HTTPException(status_code=404, detail=f"Request/Match {rejection.request_id} not found")
+    event_log.publish("match_rejected", {
+        "request_id": rejection.request_id,
+        "collection": collection,
+        "rejected_at": rejected_at,
+    })
+    return {"success": True, "id": rejection.request_id, "message": "Rejected successfully"}
+
+from ..models.schemas import ExchangeRunRequest
+from ..services.exchange import paired_exchange
+
+def _exchange_profiles(profile_ids, role: str) -> Dict[str, object]:
+    """Donors or recipients by id from this worker's pool, the rest in one batched Firestore read."""
+    pooled = incremental_matcher.get_donor if role == "donor" else incremental_matcher.get_recipient
+    found = {}
+    for profile_id in map(str, profile_ids):
+        profile = pooled(profile_id)
+        if profile is not None:
+            found[profile_id] = profile
+    # Follower workers hold no pool, so everything comes from Firestore there
+    found.update(profile_service.get_many([i for i in map(str, profile_ids) if i not in found], role))
+    return found
+
+def _release_exchange(result: Dict) -> Dict:
+    """
+    Replaces each transplant's exact score with its privacy release (None once the
+    recipient's budget is spent) and drops the weights summed from the exact scores.
+    """
+    for structure in result["cycles"] + result["chains"]:
+        structure.pop("weight", None)
+        for transplant in structure["transplants"]:
+            try:
+                with stage("dp_noise"):
+                    noisy = privacy_accountant.release(
+                        transplant["recipient_id"], transplant["donor_id"], "score", transplant["score"],
+                        noisy_score, dp_mech_score.epsilon)
+                transplant["score"] = round(noisy, 3)
+            except PrivacyBudgetExceeded:
+                transplant["score"] = None
+    result.pop("total_weight", None)
+    return result
+
+@router.post("/exchange")
+def run_paired_exchange(request: ExchangeRunRequest):
+    """
+    Kidney paired exchange run. Each pair is a recipient and the living donor whose
+    kidney they cannot take; altruistic donors start chains. Returns the cycles and
+    chains giving the most (and best-scored) transplants found within the time budget.
+    Transplant scores are privacy-noised, as in the other match views. Pairs that are
+    directly compatible or whose profiles can't be found are listed under `skipped`.
+    Nothing is persisted: coordinators confirm the proposed swaps.
+    """
+    if len(request.pairs) + len(request.altruistic_donor_ids) > settings.EXCHANGE_MAX_PAIRS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.EXCHANGE_MAX_PAIRS} pairs and donors per run")
+    if not shared_pool.attached():
+        incremental_matcher.ensure_primed()
+
+    pairs, altruists, missing = [], [], []
+    donors = _exchange_profiles([p.donor_id for p in request.pairs] + list(request.altruistic_donor_ids), "donor")
+    recipients = _exchange_profiles([p.recipient_id for p in request.pairs], "recipient")
+    for pair in request.pairs:
+        pair_id = pair.pair_id or f"{pair.donor_id}:{pair.recipient_id}"
+        donor, recipient = donors.get(str(pair.donor_id)), recipients.get(str(pair.recipient_id))
+        if donor is None or recipient is None:
+            missing.append({"pair_id": pair_id, "reason": "profile not found"})
+        else:
+            pairs.append((pair_id, donor, recipient))
+    for donor_id in request.altruistic_donor_ids:
+        donor = donors.get(str(donor_id))
+        if donor is None:
+            missing.append({"donor_id": str(donor_id), "reason": "profile not found"})
+        else:
+            altruists.append(donor)
+
+    # Requests may only narrow the configured limits
+    max_cycle, max_chain, budget = request.max_cycle_length, request.max_chain_length, request.time_budget_seconds
+    result = paired_exchange.run(
+        pairs, altruists,
+        max_cycle=None if max_cycle is None else max(2, min(max_cycle, settings.EXCHANGE_MAX_CYCLE_LENGTH)),
+        max_chain=None if max_chain is None else max(0, min(max_chain, settings.EXCHANGE_MAX_CHAIN_LENGTH)),
+        time_budget=None if budget is None else max(0.1, min(budget, settings.EXCHANGE_TIME_BUDGET_SECONDS)),
+    )
+    result["skipped"] = missing + result["skipped"]
+    return FastJSONResponse(_release_exchange(result))
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, List
+from ..core.metrics import metrics, recent_traces
+from ..core.datastore_trace import route_summary
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Request and per-stage latency histograms in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/traces")
+def get_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Most recent sampled request traces with their stage spans, newest first.
+    """
+    return recent_traces(limit)
+
+@router.get("/datastore")
+def get_datastore_costs() -> List[Dict[str, Any]]:
+    """
+    Datastore reads, writes, documents and bytes per route since startup, costliest
+    first, with the N+1 patterns (collection.op: most repeats in one request) seen on each.
+    """
+    return route_summary()
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends
 from typing import List, Dict, Any
 from ..services.profile_service import profile_service
+from ..services.incremental import incremental_matcher
 from ..core.security import get_current_user
+from ..core.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -12,14 +14,14 @@ def get_waitlist():
     """
     # In a real app, strict auth would be required
     # dependencies=[Depends(get_current_user)]
-    return profile_service.get_recipients()
+    return FastJSONResponse([recipient.to_dict() for recipient in profile_service.get_recipients()])
 
 @router.get("/inventory")
 def get_inventory():
     """
     Get all active donors/organs in inventory.
     """
-    return profile_service.get_donors()
+    return FastJSONResponse([donor.to_dict() for donor in profile_service.get_donors()])
 
 @router.post("/recipient")
 def create_recipient(recipient_data: Dict[str, Any]):
@@ -28,4 +30,19 @@ def create_recipient(recipient_data: Dict[str, Any]):
     """
     # Simply forward the data to the service
     result = profile_service.add_recipient(recipient_data)
+    # Score only this recipient against the compatible donor pool
+    incremental_matcher.on_recipient_added(profile_service.normalize_recipient(result["id"], recipient_data))
+    return result
+
+@router.post("/donor")
+def create_donor(donor_data: Dict[str, Any]):
+    """
+    Register a new donor.
+    """
+    result = profile_service.add_donor(donor_data)
+    if not profile_service.is_active_donor(donor_data):
+        incremental_matcher.on_donor_removed(result["id"])
+        return result
+    # Score only this donor against recipients waiting for one of its organs
+    incremental_matcher.on_donor_added(profile_service.normalize_donor(result["id"], donor_data))
     return result
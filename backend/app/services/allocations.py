@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from ..core.config import settings
+from ..core.firebase import db
+from ..core.metrics import stage
+from .events import event_log
+from .incremental import incremental_matcher
+
+logger = logging.getLogger(__name__)
+
+# Statuses the scheduler writes. Any other (accepted, rejected) was set by a coordinator
+# and is never overwritten by a later round.
+SCHEDULER_STATUSES = {"Pending", "Match Found", "Potential Match", "Waiting"}
+
+
+def allocation_row(record: Dict) -> Dict:
+    """Dashboard row for a persisted allocation record."""
+    return {
+        "id": record["id"],
+        "organ": record["organ"],
+        "patient": record["patient_details"],
+        "score": record["score_display"],
+        "status": record["status"],
+        "statusColor": record["statusColor"],
+        "best_match_donor": record["best_match_donor_id"]
+    }
+
+
+class AllocationRound:
+    __slots__ = ("round", "pool_version", "computed_at", "allocations")
+
+    def __init__(self, round: int, pool_version: int, computed_at: str, allocations: List[Dict]):
+        self.round = round
+        self.pool_version = pool_version
+        self.computed_at = computed_at
+        self.allocations = allocations
+
+
+class AllocationScheduler:
+    """
+    Runs allocation rounds in the background instead of on every dashboard read.
+    A round starts when the matcher's pool changes (debounced, so a burst of
+    registrations triggers one round) or when the periodic interval elapses, and is
+    skipped if the pool hasn't changed since the last one. The latest round is held
+    in memory for readers; changed allocations are written in one batch per round.
+    """
+
+    def __init__(self, interval: float = 60.0, debounce: float = 2.0, size: int = 5):
+        self.interval = interval
+        self.debounce = debounce
+        self.size = size
+        self.latest: Optional[AllocationRound] = None
+
+        self._round_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[AllocationRound], None]] = []
+        # Last persisted (status, donor, score) per allocation id. Unchanged allocations are
+        # neither rewritten to Firestore nor re-announced to event subscribers.
+        self._persisted: Dict[str, tuple] = {}
+
+    # --- Lifecycle ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        incremental_matcher.add_listener(self.notify)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="allocation-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        incremental_matcher.remove_listener(self.notify)
+
+    def add_listener(self, callback: Callable[[AllocationRound], None]):
+        """Registers a callback run with each new round."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def notify(self):
+        """Marks the pool as changed; a round follows once changes settle."""
+        self._changed.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._changed.wait(timeout=self.interval)
+            if self._stop.is_set():
+                return
+            if self._changed.is_set():
+                # Debounce: wait for a quiet period, but never longer than one interval
+                deadline = time.monotonic() + self.interval
+                while True:
+                    self._changed.clear()
+                    if self._stop.wait(min(self.debounce, max(0.0, deadline - time.monotonic()))):
+                        return
+                    if not self._changed.is_set() or time.monotonic() >= deadline:
+                        break
+                self._changed.clear()
+            try:
+                self.run_round()
+            except Exception:
+                logger.exception("Allocation round failed")
+
+    # --- Rounds ---
+
+    def current(self) -> AllocationRound:
+        """The latest round; computed inline only when no scheduler is running to keep it fresh."""
+        latest = self.latest
+        if latest is None or (not self.running and latest.pool_version != incremental_matcher.version):
+            return self.run_round()
+        return latest
+
+    def run_round(self, force: bool = False) -> AllocationRound:
+        with self._round_lock:
+            incremental_matcher.ensure_primed()
+            pool_version = incremental_matcher.version
+            if not force and self.latest is not None and self.latest.pool_version == pool_version:
+                return self.latest
+
+            # Top of the live waitlist, each with its best precomputed candidate
+            pending_patients = incremental_matcher.waitlist(self.size)
+
+            logger.debug("Allocation round: %d waiting recipients, processing %d",
+                         sum(incremental_matcher.waitlist_sizes().values()), len(pending_patients))
+
+            records = [self._allocation_for(patient) for patient in pending_patients]
+            try:
+                self.save(records)
+            except Exception:
+                logger.exception("Saving allocation round failed")
+
+            number = self.latest.round + 1 if self.latest else 1
+            self.latest = AllocationRound(
+                number, pool_version, datetime.utcnow().isoformat(), [allocation_row(r) for r in records])
+            for callback in self._listeners:
+                callback(self.latest)
+            return self.latest
+
+    def preview(self, n: int, organ: Optional[str] = None) -> List[Dict]:
+        """Rows for the top n waiting recipients (optionally of one organ), computed now and not persisted."""
+        incremental_matcher.ensure_primed()
+        return [allocation_row(self._allocation_for(patient)) for patient in incremental_matcher.waitlist(n, organ)]
+
+    def _allocation_for(self, patient) -> Dict:
+        highest_score, best_match = 0, None
+        top = incremental_matcher.top_candidates(patient.id, limit=1)
+        if top:
+            highest_score, best_match = top[0]
+
+        # Determine status/color
+        if highest_score > 0.8:
+            status, status_color = "Match Found", "bg-green-100 text-green-800"
+        elif highest_score > 0.5:
+            status, status_color = "Potential Match", "bg-blue-100 text-blue-800"
+        else:
+            status, status_color = "Waiting", "bg-amber-100 text-amber-800"
+
+        return {
+            "id": f"REQ-{patient.id[:4].upper()}",
+            "patient_id": patient.id,
+            "organ": patient.organ_required,
+            "patient_name": patient.name,
+            "patient_details": f"{patient.name} ({patient.blood_type}/{patient.age}y)",
+            "urgency_score": patient.urgency_score,
+            "score_display": f"Urgency: {patient.urgency_score}/10",
+            "status": status,
+            "statusColor": status_color,
+            "best_match_donor_id": best_match.id if best_match else None,
+            "match_score": highest_score,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def save(self, records: List[Dict]) -> int:
+        """
+        Persists allocations whose outcome changed in one batch, then publishes them.
+        Allocations a coordinator has since accepted or rejected are left as they are.
+        """
+        with self._save_lock:
+            changed = []
+            for record in records:
+                state = (record["status"], record["best_match_donor_id"], record["match_score"])
+                if self._persisted.get(record["id"]) != state:
+                    changed.append((record, state))
+            if not changed:
+                return 0
+
+            with stage("persist"):
+                refs = [db.collection('matches').document(record["id"]) for record, _ in changed]
+                decided = set()
+                for snapshot in db.get_all(refs):
+                    if snapshot.exists and (snapshot.to_dict() or {}).get("status") not in SCHEDULER_STATUSES:
+                        decided.add(snapshot.id)
+                batch = db.batch()
+                for ref, (record, _) in zip(refs, changed):
+                    if record["id"] not in decided:
+                        batch.set(ref, record)
+                if len(decided) < len(changed):
+                    batch.commit()
+            for record, state in changed:
+                self._persisted[record["id"]] = state
+            changed = [(record, state) for record, state in changed if record["id"] not in decided]
+        for record, _ in changed:
+            event_log.publish("allocation", allocation_row(record))
+        return len(changed)
+
+
+allocation_scheduler = AllocationScheduler(
+    interval=settings.ALLOCATION_INTERVAL_SECONDS,
+    debounce=settings.ALLOCATION_DEBOUNCE_SECONDS,
+    size=settings.ALLOCATION_ROUND_SIZE,
+)
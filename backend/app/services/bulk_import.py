@@ -0,0 +1,350 @@
+"""
+Bulk import of donor and recipient seed files into the registry.
+
+Records are stream-parsed from a JSON array or JSON Lines file in constant memory,
+validated and normalized, and written in batched commits (up to Firestore's 500
+writes each) that run concurrently and are retried on transient errors. Document
+ids are derived from the record and writes merge into the existing document, so a
+retried or repeated import updates rather than duplicates, and keeps fields the file
+doesn't carry (such as registeredAt or an allocation status). Documents the import
+creates are stamped with registeredAt, as single registrations are. Progress is
+checkpointed after every committed batch; rerunning with the same checkpoint file
+resumes where the last run stopped.
+
+    cd backend
+    python -m app.services.bulk_import donors ../dummy_donors.json --checkpoint ../donors.ckpt
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from google.api_core.exceptions import (
+    Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable,
+)
+
+from .matching import BLOOD_GROUPS
+
+# Firestore rejects batches with more writes than this
+MAX_BATCH_SIZE = 500
+_RETRYABLE = (Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable)
+_MAX_RECORD_CHARS = 16 << 20
+_URGENCY_STATUSES = {"Critical (ICU)", "Urgent (Hospitalized)", "Moderate", "Stable"}
+
+
+# --- Streaming parser ---
+
+def iter_records(path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yields the records of a JSON array or JSON Lines file without loading it whole."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        head = f.read(chunk_size)
+        start = len(head) - len(head.lstrip())
+        if head[start:start + 1] == "[":
+            yield from _iter_array(f, head[start + 1:], chunk_size)
+            return
+        f.seek(0)
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON ({e.msg})") from None
+
+
+def _iter_array(f, buf: str, chunk_size: int) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+    pos, eof = 0, False
+    while True:
+        # Skip whitespace and the commas between elements
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            buf, pos, eof = _refill(f, buf, pos, chunk_size, eof)
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Usually a record split across chunks; only an error once the file is exhausted
+            if eof or len(buf) - pos > _MAX_RECORD_CHARS:
+                raise
+            buf, pos, eof = _refill(f, buf, pos, chunk_size, eof)
+            continue
+        yield record
+        pos = end
+        if pos >= chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def _refill(f, buf: str, pos: int, chunk_size: int, eof: bool):
+    more = "" if eof else f.read(chunk_size)
+    return buf[pos:] + more, 0, eof or not more
+
+
+# --- Validation and normalization ---
+
+def document_id(record: dict) -> str:
+    """Stable id for a record: its own id or ABHA id, else a hash of its contents."""
+    for field in ("id", "abhaId"):
+        if record.get(field) not in (None, ""):
+            return str(record[field])
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:20]
+
+
+def _common(record) -> dict:
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    data = dict(record)
+    blood = str(data.get("bloodGroup") or "").strip().upper().replace(" ", "")
+    if blood not in BLOOD_GROUPS:
+        raise ValueError(f"invalid bloodGroup {record.get('bloodGroup')!r}")
+    data["bloodGroup"] = blood
+    if data.get("dob"):
+        try:
+            dob = date.fromisoformat(str(data["dob"])[:10])
+        except ValueError:
+            raise ValueError(f"invalid dob {data['dob']!r}") from None
+        if dob > date.today():
+            raise ValueError(f"dob {data['dob']!r} is in the future")
+        data["dob"] = dob.isoformat()
+    for field in ("fullName", "hospitalLocation", "hospitalId"):
+        if isinstance(data.get(field), str):
+            data[field] = data[field].strip()
+    return data
+
+
+def normalize_donor_record(record) -> dict:
+    data = _common(record)
+    organs = data.get("organsWillingToDonate")
+    if isinstance(organs, str):
+        organs = organs.split(",")
+    organs = [str(o).strip().lower() for o in organs or [] if str(o).strip()]
+    if not organs:
+        raise ValueError("organsWillingToDonate is empty")
+    data["organsWillingToDonate"] = list(dict.fromkeys(organs))
+    return data
+
+
+def normalize_recipient_record(record) -> dict:
+    data = _common(record)
+    organ = str(data.get("organRequired") or "").strip()
+    if not organ:
+        raise ValueError("organRequired is missing")
+    data["organRequired"] = organ
+    if data.get("urgencyStatus") is not None and data["urgencyStatus"] not in _URGENCY_STATUSES:
+        raise ValueError(f"invalid urgencyStatus {data['urgencyStatus']!r}")
+    return data
+
+
+NORMALIZERS: Dict[str, Callable[[dict], dict]] = {
+    "donors": normalize_donor_record,
+    "recipients": normalize_recipient_record,
+}
+
+
+# --- Import ---
+
+class ImportStats:
+    __slots__ = ("read", "validated", "written", "rejected", "skipped", "retries", "elapsed")
+
+    def __init__(self):
+        self.read = 0
+        self.validated = 0
+        self.written = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.retries = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"ImportStats(read={self.read}, validated={self.validated}, written={self.written}, "
+                f"rejected={self.rejected}, skipped={self.skipped}, retries={self.retries}, "
+                f"rows_per_second={self.rows_per_second:.0f})")
+
+
+class BulkImporter:
+    """
+    Writes normalized records to one collection with up to `concurrency` batch commits
+    in flight. Each batch is retried with jittered exponential backoff on transient
+    errors; a batch that still fails stops the import, leaving the checkpoint at the
+    last record before the first unfinished batch.
+    """
+
+    def __init__(self, db, collection: str, batch_size: int = MAX_BATCH_SIZE, concurrency: int = 8,
+                 max_retries: int = 5, backoff: float = 0.2, progress_seconds: float = 5.0):
+        if collection not in NORMALIZERS:
+            raise ValueError(f"Unknown collection {collection!r}; expected one of {sorted(NORMALIZERS)}")
+        self.db = db
+        self.collection = collection
+        self.normalize = NORMALIZERS[collection]
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress_seconds = progress_seconds
+        self._lock = threading.Lock()
+
+    def run(self, path: str, checkpoint: Optional[str] = None, rejects: Optional[str] = None,
+            dry_run: bool = False) -> ImportStats:
+        stats = ImportStats()
+        done = self._load_checkpoint(checkpoint, path)
+        rejects_file = open(rejects, "a", encoding="utf-8") if rejects else None
+        start = last_report = time.perf_counter()
+        pending: deque = deque()  # (future, records read when the batch was cut), in submission order
+        batch = []
+
+        def cut():
+            nonlocal batch, last_report
+            if batch and not dry_run:
+                pending.append((executor.submit(self._commit, batch, stats), stats.read))
+                # Bound memory: wait for the oldest batch once enough are queued
+                while len(pending) > self.concurrency * 2:
+                    self._finish(pending.popleft(), stats, checkpoint, path)
+            batch = []
+            if time.perf_counter() - last_report >= self.progress_seconds:
+                last_report = time.perf_counter()
+                self._report(stats, start, final=False, dry_run=dry_run)
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-import")
+        try:
+            for record in iter_records(path):
+                stats.read += 1
+                if stats.read <= done:
+                    stats.skipped += 1
+                    continue
+                try:
+                    data = self.normalize(record)
+                except ValueError as e:
+                    stats.rejected += 1
+                    if rejects_file:
+                        rejects_file.write(json.dumps({"index": stats.read - 1, "error": str(e), "record": record},
+                                                      default=str) + "\n")
+                    elif stats.rejected <= 10:
+                        print(f"Rejected record {stats.read - 1}: {e}")
+                    continue
+                stats.validated += 1
+                # Id from the record as given, before normalization
+                batch.append((document_id(record), data))
+                if len(batch) >= self.batch_size:
+                    cut()
+            cut()
+            while pending:
+                self._finish(pending.popleft(), stats, checkpoint, path)
+        finally:
+            # On failure, let in-flight batches land before reporting where to resume from
+            executor.shutdown(wait=True)
+            if rejects_file:
+                rejects_file.close()
+            stats.elapsed = time.perf_counter() - start
+        if checkpoint and not dry_run:
+            self._save_checkpoint(checkpoint, path, stats.read, complete=True)
+        self._report(stats, start, final=True, dry_run=dry_run)
+        return stats
+
+    def _commit(self, docs, stats: ImportStats):
+        collection = self.db.collection(self.collection)
+        refs = [collection.document(doc_id) for doc_id, _ in docs]
+        for attempt in range(self.max_retries + 1):
+            try:
+                # New documents get a registration time (so snapshot deltas and the waitlist
+                # see them); existing ones keep theirs
+                existing = {snapshot.id for snapshot in self.db.get_all(refs) if snapshot.exists}
+                registered_at = datetime.utcnow().isoformat()
+                batch = self.db.batch()
+                for ref, (doc_id, data) in zip(refs, docs):
+                    if doc_id not in existing and "registeredAt" not in data:
+                        data = {**data, "registeredAt": registered_at}
+                    batch.set(ref, data, merge=True)
+                batch.commit()
+                return len(docs)
+            except _RETRYABLE:
+                if attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    stats.retries += 1
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _finish(self, entry: Tuple, stats: ImportStats, checkpoint: Optional[str], path: str):
+        future, records = entry
+        stats.written += future.result()
+        if checkpoint:
+            self._save_checkpoint(checkpoint, path, records)
+
+    def _report(self, stats: ImportStats, start: float, final: bool, dry_run: bool = False):
+        elapsed = time.perf_counter() - start
+        if dry_run:
+            label = "Validated" if final else "Validating:"
+            print(f"{label} {stats.validated} of {stats.read} {self.collection} records ({stats.rejected} rejected, "
+                  f"{stats.skipped} skipped) in {elapsed:.1f}s - dry run, nothing written")
+            return
+        rate = stats.written / elapsed if elapsed else 0.0
+        label = "Imported" if final else "Importing:"
+        print(f"{label} {stats.written} {self.collection} ({stats.rejected} rejected, {stats.skipped} skipped, "
+              f"{stats.retries} retries) in {elapsed:.1f}s - {rate:,.0f} rows/s")
+
+    # --- Checkpoints ---
+
+    def _load_checkpoint(self, checkpoint: Optional[str], path: str) -> int:
+        """Number of records already imported from `path` by an earlier run."""
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get("source") != os.path.abspath(path) or state.get("collection") != self.collection \
+                or state.get("size") != os.path.getsize(path):
+            print(f"Checkpoint {checkpoint} is for a different import; starting over")
+            return 0
+        note = " (import already complete)" if state.get("complete") else ""
+        print(f"Resuming after {state['records']} records{note}")
+        return state["records"]
+
+    def _save_checkpoint(self, checkpoint: str, path: str, records: int, complete: bool = False):
+        state = {"source": os.path.abspath(path), "collection": self.collection,
+                 "size": os.path.getsize(path), "records": records, "complete": complete}
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, checkpoint)
+
+
+def main(argv=None):
+    from ..core.config import settings
+    from ..core.firebase import db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collection", choices=sorted(NORMALIZERS), help="Registry collection to import into")
+    parser.add_argument("path", help="JSON array or JSON Lines file")
+    parser.add_argument("--checkpoint", help="Progress file; rerun with the same one to resume")
+    parser.add_argument("--rejects", help="Append rejected records and their errors to this JSONL file")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.IMPORT_CONCURRENCY)
+    parser.add_argument("--max-retries", type=int, default=settings.IMPORT_MAX_RETRIES)
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing")
+    args = parser.parse_args(argv)
+
+    if settings.DATASTORE == "memory" and not args.dry_run:
+        print("DATASTORE=memory: records are written to this process's in-memory store only")
+    importer = BulkImporter(db, args.collection, batch_size=args.batch_size, concurrency=args.concurrency,
+                            max_retries=args.max_retries)
+    importer.run(args.path, checkpoint=args.checkpoint, rejects=args.rejects, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+
+
+class Event:
+    __slots__ = ("offset", "type", "data")
+
+    def __init__(self, offset: int, type: str, data: Dict[str, Any]):
+        self.offset = offset
+        self.type = type
+        self.data = data
+
+
+class EventLog:
+    """
+    Bounded, offset-addressed log of dashboard events.
+    Publishers may be sync route handlers running in the threadpool; subscribers are
+    async streams. Each subscriber reads the shared log at its own pace, so a slow
+    client never blocks publishers or other clients. A client that falls further
+    behind than the retention window gets a single "reset" event and resumes at the head.
+
+    With several workers, share() makes the log host-wide: events are appended to a
+    SQLite file every worker opens, offsets are the file's, and each worker polls it
+    into its local log. A client then sees every worker's events, and can resume
+    against any worker.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._next_offset = 1
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.subscribers = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def share(self, path: str, poll: float = 0.5):
+        """Publishes to and follows the shared log at `path`, starting at its current head."""
+        db = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS events "
+                   "(offset INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, data TEXT NOT NULL)")
+        head = db.execute("SELECT COALESCE(MAX(offset), 0) FROM events").fetchone()[0]
+        with self._lock:
+            self._events.clear()
+            self._next_offset = max(self._next_offset, head + 1)
+        self._db = db
+        self._stop.clear()
+        if poll > 0:
+            self._thread = threading.Thread(target=self._follow, args=(poll,), name="event-log-follow", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def head(self) -> int:
+        """Offset of the most recent event (0 if none)."""
+        return self._next_offset - 1
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        if self._db is not None:
+            return self._publish_shared(event_type, data)
+        with self._lock:
+            offset = self._next_offset
+            self._next_offset += 1
+            self._events.append(Event(offset, event_type, data))
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+        return offset
+
+    def _publish_shared(self, event_type: str, data: Dict[str, Any]) -> int:
+        with self._db_lock:
+            offset = self._db.execute("INSERT INTO events (type, data) VALUES (?, ?)",
+                                      (event_type, json.dumps(data, default=str))).lastrowid
+            self._db.execute("DELETE FROM events WHERE offset <= ?", (offset - self.capacity,))
+        # Read back at once, so this worker's clients see it in offset order without waiting for a poll
+        self.pull()
+        return offset
+
+    def pull(self) -> int:
+        """Appends events other workers wrote to the shared log since the last pull; returns how many."""
+        with self._db_lock:
+            rows = self._db.execute("SELECT offset, type, data FROM events WHERE offset >= ? ORDER BY offset",
+                                    (self._next_offset,)).fetchall()
+            if not rows:
+                return 0
+            with self._lock:
+                if rows[0][0] != self._next_offset:
+                    # Trimmed before we read them; read() needs contiguous offsets, so start over
+                    self._events.clear()
+                for offset, event_type, data in rows:
+                    self._events.append(Event(offset, event_type, json.loads(data)))
+                self._next_offset = rows[-1][0] + 1
+                waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+        return len(rows)
+
+    def _follow(self, poll: float):
+        while not self._stop.wait(poll):
+            try:
+                self.pull()
+            except sqlite3.Error as e:
+                print(f"Error following the shared event log: {e}")
+
+    def read(self, after: int, limit: int = 100) -> Tuple[List[Event], bool]:
+        """Events with offset > after, and whether events between were already evicted."""
+        with self._lock:
+            if not self._events:
+                return [], False
+            oldest = self._events[0].offset
+            if after < oldest - 1:
+                return [], True
+            start = after - oldest + 1
+            return [self._events[i] for i in range(start, min(start + limit, len(self._events)))], False
+
+    async def stream(self, after: int, keepalive: float = 15.0) -> AsyncIterator[Optional[Event]]:
+        """Yields events after the given offset forever; None marks a keepalive tick."""
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        waiter = (loop, wakeup)
+        with self._lock:
+            self._waiters.add(waiter)
+            self.subscribers += 1
+        try:
+            while True:
+                # Clear before reading so a publish in between still wakes us
+                wakeup.clear()
+                batch, lost = self.read(after)
+                if lost:
+                    after = self.head
+                    yield Event(after, "reset", {"offset": after})
+                    continue
+                for event in batch:
+                    after = event.offset
+                    yield event
+                if batch:
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+                self.subscribers -= 1
+
+
+event_log = EventLog(capacity=settings.EVENT_LOG_CAPACITY)
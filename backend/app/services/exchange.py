@@ -0,0 +1,348 @@
+"""
+Kidney paired exchange: cycles and chains over incompatible donor-recipient pairs.
+
+A pair is a recipient with a willing living donor whose kidney they cannot take. Pairs
+swap donors in cycles (A's donor gives to B, B's donor to A), and altruistic donors,
+who have no recipient of their own, start chains through them. A run:
+
+1. Builds a sparse compatibility graph. An edge u -> v means u's donor can give v's
+   recipient a kidney (blood compatible), weighted by the usual compatibility score.
+   Edges below min_edge_score are dropped, and each recipient keeps only its
+   max_in_edges best donors. This bounds the degree and so the number of cycles.
+2. Enumerates every 2- and 3-cycle, each once from its smallest pair (at most
+   max_cycles). Chains of up to max_chain transplants are not enumerated, since their
+   number grows with the degree to the power of their length.
+3. Picks the vertex-disjoint set of cycles and chains with the largest total weight.
+   This is an integer program with a column per cycle and per chain edge and position.
+   It is solved with scipy's MILP (HiGHS) within the run's time budget. If scipy is
+   missing, or the solver has nothing by the deadline, a greedy packing is used
+   instead: heaviest cycles first, then chains grown along the best free edges.
+"""
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import metrics, stage
+from ..models.profiles import Donor, Recipient, blood_groups
+from .hla import DonorHlaPool
+from .incremental import _DONOR_GROUPS_FOR
+from .matching import compatibility_scores, get_blood_compatibility
+from .organ_index import organ_key
+
+try:
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import csr_matrix
+except ImportError:
+    milp = None
+
+metrics.describe("organ_exchange_runs_total", "Paired exchange runs by solver and outcome.")
+
+KIDNEY = "kidney"
+
+# (pair id, donor, recipient)
+Pair = Tuple[str, Donor, Recipient]
+
+
+def offers_kidney(donor: Donor) -> bool:
+    return any(organ_key(o) == KIDNEY for o in donor.organs_available)
+
+
+class CompatibilityGraph:
+    """
+    Pairs are vertices 0..n_pairs-1 and altruistic donors the vertices after them.
+    Altruistic donors only have out-edges, since they have no recipient.
+    """
+
+    def __init__(self, n_pairs: int, n_altruists: int):
+        self.n_pairs = n_pairs
+        self.n_altruists = n_altruists
+        # u -> {v: weight}, and u's out-edges best first
+        self.weights: List[Dict[int, float]] = [{} for _ in range(n_pairs + n_altruists)]
+        self.out: List[List[Tuple[int, float]]] = []
+
+    def __len__(self):
+        return sum(len(w) for w in self.weights)
+
+    @classmethod
+    def build(cls, pairs: Sequence[Pair], altruists: Sequence[Donor], min_edge_score: float,
+              max_in_edges: int) -> "CompatibilityGraph":
+        graph = cls(len(pairs), len(altruists))
+        donors = [donor for _, donor, _ in pairs] + list(altruists)
+        if not pairs:
+            graph.out = [[] for _ in donors]
+            return graph
+        blood = np.fromiter((d.blood for d in donors), dtype=np.int32, count=len(donors))
+        location = np.fromiter((d.location_code for d in donors), dtype=np.int32, count=len(donors))
+        hla = DonorHlaPool(donors)
+        for v, (_, _, recipient) in enumerate(pairs):
+            allowed = [blood_groups.encode(b) for b in _DONOR_GROUPS_FOR.get(recipient.blood_type, [])]
+            rows = np.flatnonzero(np.isin(blood, allowed))
+            rows = rows[rows != v]
+            if not len(rows):
+                continue
+            scores = compatibility_scores(recipient, blood[rows], location[rows], hla.scores(recipient, rows))
+            keep = scores >= min_edge_score
+            rows, scores = rows[keep], scores[keep]
+            if len(rows) > max_in_edges:
+                # Best donors for this recipient; ties go to the lower vertex
+                best = np.lexsort((rows, -scores))[:max_in_edges]
+                rows, scores = rows[best], scores[best]
+            for u, score in zip(rows.tolist(), scores.tolist()):
+                graph.weights[u][v] = score
+        graph.out = [sorted(w.items(), key=lambda e: (-e[1], e[0])) for w in graph.weights]
+        return graph
+
+
+class Structure:
+    """A cycle or chain: the vertices it uses and its transplants as (donor vertex, recipient vertex, score)."""
+    __slots__ = ("kind", "vertices", "transplants", "weight")
+
+    def __init__(self, kind: str, vertices: Tuple[int, ...], transplants: List[Tuple[int, int, float]]):
+        self.kind = kind
+        self.vertices = vertices
+        self.transplants = transplants
+        self.weight = sum(score for _, _, score in transplants)
+
+
+def enumerate_cycles(graph: CompatibilityGraph, max_cycle: int) -> List[Structure]:
+    """Every 2-cycle and (if max_cycle >= 3) 3-cycle among the pairs, each listed once."""
+    cycles = []
+    weights = graph.weights
+    for a in range(graph.n_pairs):
+        for b, ab in graph.out[a]:
+            if b <= a:
+                continue
+            for c, bc in graph.out[b]:
+                if c == a:
+                    cycles.append(Structure("cycle", (a, b), [(a, b, ab), (b, a, bc)]))
+                elif c > a and max_cycle >= 3:
+                    ca = weights[c].get(a)
+                    if ca is not None:
+                        cycles.append(Structure("cycle", (a, b, c), [(a, b, ab), (b, c, bc), (c, a, ca)]))
+    return cycles
+
+
+def greedy_chains(graph: CompatibilityGraph, max_chain: int, used: Set[int]) -> List[Structure]:
+    """Chains grown one best unused edge at a time from each altruistic donor, best first edge first."""
+    chains = []
+    starts = [a for a in range(graph.n_pairs, graph.n_pairs + graph.n_altruists) if graph.out[a]]
+    for a in sorted(starts, key=lambda a: -graph.out[a][0][1]):
+        u, path, transplants = a, [a], []
+        while len(transplants) < max_chain:
+            step = next(((v, score) for v, score in graph.out[u] if v not in used), None)
+            if step is None:
+                break
+            v, score = step
+            used.add(v)
+            transplants.append((u, v, score))
+            path.append(v)
+            u = v
+        if transplants:
+            used.add(a)
+            chains.append(Structure("chain", tuple(path), transplants))
+    return chains
+
+
+def pack_greedy(graph: CompatibilityGraph, cycles: Sequence[Structure], max_chain: int) -> List[Structure]:
+    """Heaviest cycles first, skipping any that reuses a pair, then chains through the pairs left."""
+    used: Set[int] = set()
+    chosen = []
+    for cycle in sorted(cycles, key=lambda c: -c.weight):
+        if used.isdisjoint(cycle.vertices):
+            used.update(cycle.vertices)
+            chosen.append(cycle)
+    return chosen + greedy_chains(graph, max_chain, used)
+
+
+def pack_optimal(graph: CompatibilityGraph, cycles: Sequence[Structure], max_chain: int,
+                 time_limit: float, chain_out_edges: int = 4) -> Tuple[Optional[List[Structure]], str]:
+    """
+    Maximum-weight packing of cycles and chains; (None, reason) when the solver is
+    unavailable or found nothing in time.
+
+    Cycles are columns of their own. Each chain edge gets one column per position it can
+    take in a chain. Flow constraints let a pair pass a chain on at position k + 1 only
+    if it received it at position k. Pairs continue chains only along their
+    `chain_out_edges` best edges. Those columns dominate the program, and further
+    edges rarely change the optimum.
+    """
+    if milp is None:
+        return None, "unavailable"
+    n_pairs, n_vertices = graph.n_pairs, graph.n_pairs + graph.n_altruists
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List[float] = []
+    weights: List[float] = []
+
+    def column(weight: float, entries) -> int:
+        col = len(weights)
+        weights.append(weight)
+        for row, value in entries:
+            rows.append(row)
+            cols.append(col)
+            values.append(value)
+        return col
+
+    # Row v < n_vertices: vertex v is used at most once. Then, per pair and position
+    # k < max_chain: chain edges leaving it at k + 1 <= edges entering it at k
+    def flow_row(v: int, k: int) -> int:
+        return n_vertices + v * max(max_chain - 1, 1) + (k - 1)
+
+    for cycle in cycles:
+        column(cycle.weight, ((v, 1.0) for v in cycle.vertices))
+    edges: List[Tuple[int, int, int, float]] = []
+    if max_chain >= 1:
+        for u in range(n_vertices):
+            # Altruistic donors start chains at position 1; pairs continue them from position 2
+            positions = (1,) if u >= n_pairs else range(2, max_chain + 1)
+            out = graph.out[u] if u >= n_pairs else graph.out[u][:chain_out_edges]
+            for v, score in out:
+                for k in positions:
+                    entries = [(v, 1.0)] if u < n_pairs else [(v, 1.0), (u, 1.0)]
+                    if k < max_chain:
+                        entries.append((flow_row(v, k), -1.0))
+                    if k > 1:
+                        entries.append((flow_row(u, k - 1), 1.0))
+                    column(score, entries)
+                    edges.append((u, v, k, score))
+    if not weights:
+        return [], "optimal"
+
+    n_rows = n_vertices + n_pairs * max(max_chain - 1, 1)
+    upper = np.zeros(n_rows)
+    upper[:n_vertices] = 1
+    matrix = csr_matrix((values, (rows, cols)), shape=(n_rows, len(weights)))
+    result = milp(-np.asarray(weights), constraints=LinearConstraint(matrix, -np.inf, upper),
+                  integrality=np.ones(len(weights)), bounds=Bounds(0, 1),
+                  options={"time_limit": max(time_limit, 0.1)})
+    if result.x is None:
+        return None, "no_solution"
+
+    taken = result.x > 0.5
+    chosen = [cycle for cycle, x in zip(cycles, taken) if x]
+    # Follow each chain from its altruistic donor through the positions
+    next_edge = {(u, k): (v, score) for (u, v, k, score), x in zip(edges, taken[len(cycles):]) if x}
+    for a in range(n_pairs, n_vertices):
+        u, k, path, transplants = a, 1, [a], []
+        while (u, k) in next_edge:
+            v, score = next_edge[(u, k)]
+            transplants.append((u, v, score))
+            path.append(v)
+            u, k = v, k + 1
+        if transplants:
+            chosen.append(Structure("chain", tuple(path), transplants))
+    # status 0: proven optimal; otherwise the best found before the time limit
+    return chosen, "optimal" if result.status == 0 else "time_limit"
+
+
+class PairedExchange:
+    """Runs the exchange for a pool of incompatible pairs and altruistic donors. Stateless between runs."""
+
+    def __init__(self, max_cycle: int = 3, max_chain: int = 3, min_edge_score: float = 0.0,
+                 max_in_edges: int = 25, chain_out_edges: int = 4, max_cycles: int = 200000,
+                 time_budget: float = 10.0):
+        self.max_cycle = max_cycle
+        self.max_chain = max_chain
+        self.min_edge_score = min_edge_score
+        self.max_in_edges = max_in_edges
+        self.chain_out_edges = chain_out_edges
+        self.max_cycles = max_cycles
+        self.time_budget = time_budget
+
+    def run(self, pairs: Sequence[Pair], altruists: Sequence[Donor] = (), max_cycle: Optional[int] = None,
+            max_chain: Optional[int] = None, time_budget: Optional[float] = None, exact: bool = True) -> Dict:
+        """Finds the exchange; `exact=False` skips the solver and returns the greedy packing."""
+        started = time.monotonic()
+        max_cycle = self.max_cycle if max_cycle is None else max_cycle
+        max_chain = self.max_chain if max_chain is None else max_chain
+        deadline = started + (self.time_budget if time_budget is None else time_budget)
+
+        pairs, altruists, skipped = self._eligible(pairs, altruists)
+        with stage("exchange_graph"):
+            graph = CompatibilityGraph.build(pairs, altruists, self.min_edge_score, self.max_in_edges)
+        with stage("exchange_enumerate"):
+            cycles = enumerate_cycles(graph, max_cycle)
+            truncated = len(cycles) > self.max_cycles
+            cycles = cycles[:self.max_cycles]
+
+        with stage("exchange_solve"):
+            greedy = pack_greedy(graph, cycles, max_chain)
+            chosen, status = pack_optimal(graph, cycles, max_chain, deadline - time.monotonic(),
+                                          self.chain_out_edges) if exact else (None, "skipped")
+            solver = "milp"
+            if chosen is None or sum(s.weight for s in chosen) < sum(s.weight for s in greedy):
+                chosen, solver, status = greedy, "greedy", "heuristic" if chosen is None else status
+        metrics.inc("organ_exchange_runs_total", (("solver", solver), ("status", status)))
+
+        donors = [donor for _, donor, _ in pairs] + list(altruists)
+        result = {"cycles": [], "chains": [], "transplants": 0, "total_weight": 0.0}
+        for structure in sorted(chosen, key=lambda s: -s.weight):
+            transplants = [
+                {"donor_id": str(donors[u].id), "recipient_id": str(pairs[v][2].id), "pair_id": pairs[v][0],
+                 "score": score}
+                for u, v, score in structure.transplants
+            ]
+            entry = {"transplants": transplants, "weight": round(structure.weight, 3)}
+            if structure.kind == "cycle":
+                result["cycles"].append({"pair_ids": [pairs[v][0] for v in structure.vertices], **entry})
+            else:
+                result["chains"].append({"altruistic_donor_id": str(donors[structure.vertices[0]].id), **entry})
+            result["transplants"] += len(transplants)
+            result["total_weight"] += structure.weight
+        result["total_weight"] = round(result["total_weight"], 3)
+        result.update({
+            "solver": solver,
+            "status": status,
+            "skipped": skipped,
+            "graph": {"pairs": graph.n_pairs, "altruistic_donors": graph.n_altruists, "edges": len(graph),
+                      "cycles": len(cycles), "truncated": truncated},
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        })
+        return result
+
+    @staticmethod
+    def _eligible(pairs: Sequence[Pair], altruists: Sequence[Donor]) -> Tuple[List[Pair], List[Donor], List[Dict]]:
+        """
+        Pairs that need the exchange (kidney, donor incompatible with their own recipient), and
+        kidney altruists. Vertices are people: a donor or recipient already taken by an earlier
+        eligible pair is skipped, so nobody gives or receives twice.
+        """
+        kept, skipped = [], []
+        donor_ids: Set[str] = set()
+        recipient_ids: Set[str] = set()
+        for pair_id, donor, recipient in pairs:
+            if organ_key(recipient.organ_required) != KIDNEY or not offers_kidney(donor):
+                skipped.append({"pair_id": pair_id, "reason": "not a kidney pair"})
+            elif get_blood_compatibility(donor.blood_type, recipient.blood_type):
+                skipped.append({"pair_id": pair_id, "reason": "directly compatible"})
+            elif str(recipient.id) in recipient_ids:
+                skipped.append({"pair_id": pair_id, "reason": "recipient already in a pair"})
+            elif str(donor.id) in donor_ids:
+                skipped.append({"pair_id": pair_id, "reason": "donor already in a pair"})
+            else:
+                kept.append((pair_id, donor, recipient))
+                donor_ids.add(str(donor.id))
+                recipient_ids.add(str(recipient.id))
+        kidney_altruists = []
+        for donor in altruists:
+            if not offers_kidney(donor):
+                skipped.append({"donor_id": str(donor.id), "reason": "not a kidney donor"})
+            elif str(donor.id) in donor_ids:
+                skipped.append({"donor_id": str(donor.id), "reason": "donor already in a pair"})
+            else:
+                kidney_altruists.append(donor)
+                donor_ids.add(str(donor.id))
+        return kept, kidney_altruists, skipped
+
+
+paired_exchange = PairedExchange(
+    max_cycle=settings.EXCHANGE_MAX_CYCLE_LENGTH,
+    max_chain=settings.EXCHANGE_MAX_CHAIN_LENGTH,
+    min_edge_score=settings.EXCHANGE_MIN_EDGE_SCORE,
+    max_in_edges=settings.EXCHANGE_MAX_IN_EDGES,
+    chain_out_edges=settings.EXCHANGE_CHAIN_OUT_EDGES,
+    max_cycles=settings.EXCHANGE_MAX_CYCLES,
+    time_budget=settings.EXCHANGE_TIME_BUDGET_SECONDS,
+)
@@ -0,0 +1,181 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import metrics, stage
+from ..models.profiles import Donor, Recipient
+from .hla import hla_scores
+from .incremental import _DONOR_GROUPS_FOR, incremental_matcher
+from .matching import basic_compatibility_score
+from .organ_index import OrganBloodIndex
+from .shared_pool import shared_pool
+from .snapshot import DonorSnapshot
+
+metrics.describe("organ_federated_shards_total", "Federated shard queries by outcome (ok, timeout, error).")
+metrics.describe("organ_federated_shard_seconds", "Time for a hospital shard to return its local top-k.")
+
+# (score, donor id) as exchanged between a hospital node and the coordinator
+ShardMatch = Tuple[float, str]
+
+
+class HospitalNode:
+    """
+    Local stand-in for one hospital's matching node. It holds only its own donors,
+    filters and scores them locally, and hands back nothing but its top-k
+    (score, donor id) pairs; donor records never leave the node.
+    """
+
+    def __init__(self, location: str, donors: List[Donor], latency: float = 0.0):
+        self.location = location
+        self.latency = latency
+        self._donors = {str(d.id): d for d in donors}
+        self._index = OrganBloodIndex()
+        for donor_id, donor in self._donors.items():
+            self._index.add(donor_id, donor.organs_available, donor.blood_type)
+
+    def __len__(self):
+        return len(self._donors)
+
+    def top_k(self, recipient: Recipient, k: int) -> List[ShardMatch]:
+        if self.latency:
+            time.sleep(self.latency)  # simulated network/remote compute time
+        return _local_top_k(recipient, self._candidates(recipient), k)
+
+    def _candidates(self, recipient: Recipient) -> List[Donor]:
+        ids = self._index.lookup([recipient.organ_required], _DONOR_GROUPS_FOR.get(recipient.blood_type, []))
+        return [self._donors[i] for i in ids]
+
+
+class SnapshotNode(HospitalNode):
+    """A hospital node over its rows of the shared pool snapshot (follower workers)."""
+
+    def __init__(self, location: str, snapshot: DonorSnapshot, rows, latency: float = 0.0):
+        self.location = location
+        self.latency = latency
+        self._snapshot = snapshot
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _candidates(self, recipient: Recipient) -> List[Donor]:
+        return self._snapshot.donors(shared_pool.candidate_rows(self._snapshot, recipient, self._rows))
+
+
+def _local_top_k(recipient: Recipient, candidates: List[Donor], k: int) -> List[ShardMatch]:
+    hla = hla_scores(recipient, candidates)
+    scored = [
+        (basic_compatibility_score(recipient, donor, hla_score)[0], str(donor.id))
+        for donor, hla_score in zip(candidates, hla)
+    ]
+    return heapq.nlargest(k, scored)
+
+
+class ShardResult:
+    __slots__ = ("location", "status", "matches", "elapsed_ms")
+
+    def __init__(self, location: str, status: str, matches: List[ShardMatch], elapsed_ms: float):
+        self.location = location
+        self.status = status
+        self.matches = matches
+        self.elapsed_ms = elapsed_ms
+
+
+class FederatedMatcher:
+    """
+    Queries every hospital shard concurrently and merges their local top-k lists
+    into a global top-k with a heap. Each query has one deadline: shards that miss
+    it are reported as timed out and left out, so a slow hospital can't stall the
+    answer.
+    """
+
+    def __init__(self, local_k: int = 5, timeout: float = 2.0, max_workers: int = 8,
+                 nodes: Optional[Callable[[], List[HospitalNode]]] = None):
+        self.local_k = local_k
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="federated-shard")
+        self._nodes_provider = nodes or self._pool_nodes
+        self._lock = threading.Lock()
+        self._nodes: List[HospitalNode] = []
+        self._nodes_version = None
+
+    def _pool_nodes(self) -> List[HospitalNode]:
+        """One node per donor location, rebuilt when the pool changes."""
+        if shared_pool.attached():
+            snapshot = shared_pool.snapshot()
+            with self._lock:
+                if self._nodes_version != snapshot.path:
+                    locations = np.asarray(snapshot.columns["location"])
+                    self._nodes = [
+                        SnapshotNode(snapshot.tables["locations"][code], snapshot, np.flatnonzero(locations == code))
+                        for code in np.unique(locations).tolist()
+                    ]
+                    self._nodes_version = snapshot.path
+                return self._nodes
+
+        incremental_matcher.ensure_primed()
+        with self._lock:
+            if self._nodes_version != incremental_matcher.version:
+                version = incremental_matcher.version
+                by_location: Dict[str, List[Donor]] = defaultdict(list)
+                for donor in incremental_matcher.donors():
+                    by_location[donor.location].append(donor)
+                self._nodes = [HospitalNode(location, donors) for location, donors in sorted(by_location.items())]
+                self._nodes_version = version
+            return self._nodes
+
+    def nodes(self) -> List[HospitalNode]:
+        return self._nodes_provider()
+
+    def match(self, recipient: Recipient, k: int = 3) -> Tuple[List[Tuple[float, str, str]], List[ShardResult]]:
+        """Global top-k as (score, donor id, location), plus each shard's outcome."""
+        nodes = self.nodes()
+        started = time.perf_counter()
+        futures = {self._executor.submit(self._query, node, recipient): node for node in nodes}
+        with stage("federated_wait"):
+            done, _ = wait(futures, timeout=self.timeout)
+
+        shards = []
+        for future, node in futures.items():
+            if future in done:
+                try:
+                    matches, elapsed = future.result()
+                    shards.append(ShardResult(node.location, "ok", matches, elapsed * 1000))
+                except Exception as e:
+                    print(f"Federated shard {node.location} failed: {e}")
+                    shards.append(ShardResult(node.location, "error", [], (time.perf_counter() - started) * 1000))
+            else:
+                # Not started yet: drop it; already running: let it finish unobserved
+                future.cancel()
+                shards.append(ShardResult(node.location, "timeout", [], self.timeout * 1000))
+        for shard in shards:
+            metrics.inc("organ_federated_shards_total", (("status", shard.status),))
+
+        with stage("federated_merge"):
+            # Each shard's list is already sorted best-first
+            merged = heapq.merge(
+                *[[(score, donor_id, shard.location) for score, donor_id in shard.matches] for shard in shards],
+                reverse=True,
+            )
+            return list(islice(merged, k)), shards
+
+    def _query(self, node: HospitalNode, recipient: Recipient) -> Tuple[List[ShardMatch], float]:
+        start = time.perf_counter()
+        matches = node.top_k(recipient, self.local_k)
+        elapsed = time.perf_counter() - start
+        metrics.observe("organ_federated_shard_seconds", elapsed)
+        return matches, elapsed
+
+
+federated_matcher = FederatedMatcher(
+    local_k=settings.FEDERATED_LOCAL_K,
+    timeout=settings.FEDERATED_SHARD_TIMEOUT_SECONDS,
+    max_workers=settings.FEDERATED_MAX_WORKERS,
+)
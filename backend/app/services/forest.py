@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from ..core.versions import current_version, publish_version
+
+FOREST_FORMAT = 1
+_ARRAYS = ("left", "right", "feature", "threshold", "proba", "roots")
+
+
+class FlatForest:
+    """
+    A fitted random forest flattened into plain node arrays (all trees concatenated,
+    child indices global). sklearn's pickled trees are copied into private buffers when
+    loaded, so they can't be shared between processes; these arrays can be memory-mapped.
+    Predictions match the sklearn model's predict_proba.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], classes: Sequence, n_features: int):
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.proba = arrays["proba"]
+        self.roots = arrays["roots"]
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.path: Optional[str] = None
+        self._walk = None
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        left, right, feature, threshold, proba, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(tree.feature)
+            threshold.append(tree.threshold)
+            value = tree.value[:, 0, :]
+            proba.append(value / np.maximum(value.sum(axis=1, keepdims=True), np.finfo(float).tiny))
+            roots.append(offset)
+            offset += tree.node_count
+        arrays = {
+            "left": np.concatenate(left).astype(np.int32),
+            "right": np.concatenate(right).astype(np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "proba": np.concatenate(proba).astype(np.float64),
+            "roots": np.array(roots, dtype=np.int32),
+        }
+        return cls(arrays, [c.item() if hasattr(c, "item") else c for c in model.classes_], model.n_features_in_)
+
+    def predict_proba_batch(self, X) -> np.ndarray:
+        """
+        Class probabilities for each row of X, identical to sklearn's predict_proba.
+        Every (tree, row) pair walks down one level per step, all pairs at once.
+        """
+        # sklearn compares float32 features against the float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected an (n, {self.n_features}) array, got shape {X.shape}")
+        children, feature, threshold, depth = self._walk_arrays()
+        n, trees = len(X), len(self.roots)
+        nodes = np.repeat(np.asarray(self.roots, dtype=np.intp), n)
+        offsets = np.tile(np.arange(n) * self.n_features, trees)
+        values = X.ravel()
+
+        # children holds (right, left) per node, so the comparison result picks the child;
+        # leaves loop back to themselves, so every pair can take exactly `depth` steps
+        for _ in range(depth):
+            nodes = children[(nodes << 1) + (values[offsets + feature[nodes]] <= threshold[nodes])]
+
+        # Summed tree by tree in order, as sklearn does, so results match bit for bit
+        leaves = np.asarray(self.proba)[nodes].reshape(trees, n, -1)
+        total = np.zeros((n, leaves.shape[2]))
+        for tree in leaves:
+            total += tree
+        return total / trees
+
+    def _walk_arrays(self):
+        """Traversal arrays, derived once per process from the stored node arrays."""
+        if self._walk is None:
+            internal = np.asarray(self.left) >= 0
+            ids = np.arange(len(internal))
+            depth, frontier = 0, np.asarray(self.roots)
+            while True:
+                frontier = frontier[internal[frontier]]
+                if not frontier.size:
+                    break
+                frontier = np.concatenate([self.left[frontier], self.right[frontier]])
+                depth += 1
+            children = np.stack([np.where(internal, self.right, ids), np.where(internal, self.left, ids)], axis=1)
+            self._walk = (
+                children.ravel().astype(np.intp),
+                np.where(internal, self.feature, 0).astype(np.intp),
+                np.asarray(self.threshold),
+                depth,
+            )
+        return self._walk
+
+    def predict_proba(self, row: Sequence[float]) -> np.ndarray:
+        """Class probabilities for one sample, averaged over the trees."""
+        return self.predict_proba_batch([row])[0]
+
+    def save(self, directory: str) -> str:
+        """Publishes these arrays as a new version of `directory`."""
+        def write(path):
+            for name in _ARRAYS:
+                np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(path, "forest.json"), "w") as f:
+                json.dump({"format": FOREST_FORMAT, "classes": self.classes, "n_features": self.n_features}, f)
+
+        return publish_version(directory, write)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional["FlatForest"]:
+        """The current version, memory-mapped read-only; None when nothing was published."""
+        path = current_version(directory)
+        if path is None:
+            return None
+        with open(os.path.join(path, "forest.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FOREST_FORMAT:
+            return None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in _ARRAYS}
+        forest = cls(arrays, meta["classes"], meta["n_features"])
+        forest.path = path
+        return forest
@@ -0,0 +1,214 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Loci used for matching, two antigens per locus -> 6 slots per typing
+LOCI = ("A", "B", "DR")
+SLOTS = len(LOCI) * 2
+
+# Matches serological ("A2", "DR15") and molecular ("A*02:01", "DRB1*15:01") tokens.
+# Only the first field is kept, so molecular typings are reduced to their antigen group.
+_TOKEN_RE = re.compile(r"\b(DRB1|DR|A|B)\s*\*?\s*0*(\d{1,3})(?::\d+)*", re.IGNORECASE)
+_LOCUS_ALIASES = {"A": "A", "B": "B", "DR": "DR", "DRB1": "DR"}
+
+# Antigen numbers have at most 3 digits, so a locus never needs more than 1001 codes
+_CODE_BITS = 10
+_CODE_MASK = (1 << _CODE_BITS) - 1
+_SHIFTS = np.arange(SLOTS, dtype=np.uint64) * np.uint64(_CODE_BITS)
+
+
+class AlleleCodes:
+    """Interns antigen names into small per-locus integer codes (0 = untyped)."""
+
+    def __init__(self):
+        self._codes: Dict[str, Dict[str, int]] = {locus: {} for locus in LOCI}
+        self._names: Dict[str, List[str]] = {locus: [""] for locus in LOCI}
+
+    def encode(self, locus: str, antigen: str) -> int:
+        table = self._codes[locus]
+        code = table.get(antigen)
+        if code is None:
+            code = len(self._names[locus])
+            table[antigen] = code
+            self._names[locus].append(antigen)
+        return code
+
+    def decode(self, locus: str, code: int) -> str:
+        return self._names[locus][code] if code else ""
+
+    def names(self, locus: str) -> List[str]:
+        """Antigen names by code for one locus (index 0 is untyped)."""
+        return list(self._names[locus])
+
+
+allele_codes = AlleleCodes()
+
+
+def _encode_typing(antigens: Dict[str, List[str]]) -> Optional[Tuple[int, ...]]:
+    codes = []
+    for locus in LOCI:
+        found = antigens.get(locus, [])
+        if not found:
+            # A typing missing a whole locus can't be compared antigen by antigen
+            return None
+        first = allele_codes.encode(locus, found[0])
+        second = allele_codes.encode(locus, found[1]) if len(found) > 1 else 0
+        # Homozygous loci carry the antigen once so it is never counted twice
+        codes.extend([first, second if second != first else 0])
+    return tuple(codes)
+
+
+@lru_cache(maxsize=65536)
+def _parse_typing_str(text: str) -> Optional[Tuple[int, ...]]:
+    antigens: Dict[str, List[str]] = {locus: [] for locus in LOCI}
+    for locus, number in _TOKEN_RE.findall(text):
+        bucket = antigens[_LOCUS_ALIASES[locus.upper()]]
+        if len(bucket) < 2:
+            bucket.append(number)
+    return _encode_typing(antigens)
+
+
+def parse_hla_typing(value) -> Optional[Tuple[int, ...]]:
+    """
+    Parses an HLA typing into 6 integer codes (A, A, B, B, DR, DR).
+    Accepts free text ("A2 A24 B7 B8 DR15 DR4", "A*02:01, ... DRB1*15:01")
+    or a {"A": [...], "B": [...], "DR": [...]} mapping.
+    Returns None for legacy "X/6" strings or anything without all three loci.
+    """
+    if not value:
+        return None
+    if isinstance(value, dict):
+        text = " ".join(
+            f"{locus}{antigen}"
+            for locus, antigens in value.items()
+            for antigen in (antigens if isinstance(antigens, (list, tuple)) else [antigens])
+        )
+        return _parse_typing_str(text)
+    if isinstance(value, str):
+        return _parse_typing_str(value)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def legacy_match_fraction(hla_str: str) -> float:
+    """Reads 'X/Y HLA match potential' as X/6, clamped to 0-1. Malformed input scores 0."""
+    try:
+        return min(1.0, max(0.0, int(str(hla_str).split("/")[0]) / 6.0))
+    except (ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+def format_typing(codes: Sequence[int]) -> str:
+    """Canonical text for parsed codes, e.g. "A2 A24 B7 B8 DR15 DR4"."""
+    return " ".join(
+        f"{LOCI[i // 2]}{allele_codes.decode(LOCI[i // 2], code)}" for i, code in enumerate(codes) if code
+    )
+
+
+def pack_codes(codes: Optional[Sequence[int]]) -> Optional[int]:
+    """Packs 6 typing codes into one int (10 bits each)."""
+    if codes is None:
+        return None
+    packed = 0
+    for i, code in enumerate(codes):
+        packed |= code << (i * _CODE_BITS)
+    return packed
+
+
+def unpack_codes(packed: int) -> Tuple[int, ...]:
+    return tuple((packed >> (i * _CODE_BITS)) & _CODE_MASK for i in range(SLOTS))
+
+
+def unpack_matrix(packed: Sequence[int]) -> np.ndarray:
+    """Vectorized unpack of many packed typings into an n x 6 code matrix."""
+    column = np.asarray(packed, dtype=np.uint64)[:, None]
+    return ((column >> _SHIFTS) & np.uint64(_CODE_MASK)).astype(np.int32)
+
+
+def pack_matrix(codes: np.ndarray) -> np.ndarray:
+    """Vectorized pack of an n x 6 code matrix (inverse of unpack_matrix)."""
+    return np.bitwise_or.reduce(np.asarray(codes, dtype=np.uint64) << _SHIFTS, axis=1).astype(np.int64)
+
+
+def profile_hla_codes(profile) -> Optional[Tuple[int, ...]]:
+    """Typing codes parsed at ingest, or parsed now for dict profiles that skipped normalization."""
+    if not isinstance(profile, dict):
+        return profile.hla_codes
+    if "hla_codes" in profile:
+        return profile["hla_codes"]
+    return parse_hla_typing(profile.get("hla_markers"))
+
+
+def _profile_hla_packed(profile) -> Optional[int]:
+    if not isinstance(profile, dict):
+        return profile.hla
+    return pack_codes(profile_hla_codes(profile))
+
+
+def _profile_markers(profile) -> str:
+    if not isinstance(profile, dict):
+        return profile.hla_markers
+    return profile.get("hla_markers", "0/6")
+
+
+def mismatch_counts(recipient_codes: Sequence[int], donor_codes: np.ndarray) -> np.ndarray:
+    """
+    Vectorized A/B/DR antigen mismatch count (0-6) for every row of donor_codes (n x 6).
+    A donor antigen is a mismatch when the recipient lacks it at the same locus.
+    """
+    donors = np.asarray(donor_codes, dtype=np.int32).reshape(-1, len(LOCI), 2)
+    recipient = np.asarray(recipient_codes, dtype=np.int32).reshape(len(LOCI), 2)
+    shared = (donors[:, :, :, None] == recipient[None, :, None, :]).any(axis=3)
+    return ((donors != 0) & ~shared).sum(axis=(1, 2))
+
+
+def hla_score(recipient, donor) -> float:
+    """0-1 HLA score for a single pair: 1 - mismatches/6, or the legacy donor fraction."""
+    r_codes = profile_hla_codes(recipient)
+    d_codes = profile_hla_codes(donor)
+    if r_codes is None or d_codes is None:
+        return legacy_match_fraction(_profile_markers(donor))
+    return 1.0 - float(mismatch_counts(r_codes, np.array([d_codes]))[0]) / SLOTS
+
+
+class DonorHlaPool:
+    """A donor pool's typings unpacked once, for scoring many recipients against it."""
+
+    def __init__(self, donors: Iterable):
+        donors = list(donors)
+        packed = [_profile_hla_packed(d) for d in donors]
+        self._typed = np.array([p is not None for p in packed], dtype=bool)
+        self._legacy = np.array([legacy_match_fraction(_profile_markers(d)) for d in donors], dtype=float)
+        # Untyped rows are all zeros; their scores come from the legacy fraction
+        self._codes = unpack_matrix([p or 0 for p in packed]) if donors else np.zeros((0, SLOTS), dtype=np.int32)
+
+    def __len__(self):
+        return len(self._legacy)
+
+    def scores(self, recipient, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Same values as hla_scores(recipient, donors), for all donors or just `rows`."""
+        rows = np.arange(len(self)) if rows is None else rows
+        r_codes = profile_hla_codes(recipient)
+        if r_codes is None:
+            return self._legacy[rows]
+        typed = 1.0 - mismatch_counts(r_codes, self._codes[rows]) / SLOTS
+        return np.where(self._typed[rows], typed, self._legacy[rows])
+
+
+def hla_scores(recipient, donors: Iterable) -> np.ndarray:
+    """HLA scores for a recipient against a whole donor pool in one vectorized pass."""
+    donors = list(donors)
+    r_codes = profile_hla_codes(recipient)
+    packed = [_profile_hla_packed(d) for d in donors] if r_codes is not None else [None] * len(donors)
+    typed = [i for i, p in enumerate(packed) if p is not None]
+
+    scores = np.empty(len(donors), dtype=float)
+    for i, p in enumerate(packed):
+        if p is None:
+            scores[i] = legacy_match_fraction(_profile_markers(donors[i]))
+    if typed:
+        matrix = unpack_matrix([packed[i] for i in typed])
+        scores[typed] = 1.0 - mismatch_counts(r_codes, matrix) / SLOTS
+    return scores
@@ -0,0 +1,415 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+from ..core.metrics import metrics, stage
+from ..models.profiles import Donor, Recipient
+from .hla import hla_scores
+from .matching import BLOOD_GROUPS, basic_compatibility_score, get_blood_compatibility
+from .organ_index import OrganBloodIndex, organ_key
+from .profile_service import profile_service
+from .regions import RegionIndex, ring_top_k
+from .snapshot import DonorSnapshot, load_donor_snapshot, snapshot_stamp, write_donor_snapshot
+from .viability import TimingWheel, expires_at, live_organs
+from .waitlist import Waitlist
+
+metrics.describe("organ_viability_expired_total", "Donor organs dropped from the pool when their viability window closed.")
+
+# Recipient blood group -> donor blood groups it can receive, and the reverse
+_DONOR_GROUPS_FOR = {r: [d for d in BLOOD_GROUPS if get_blood_compatibility(d, r)] for r in BLOOD_GROUPS}
+_RECIPIENT_GROUPS_FOR = {d: [r for r in BLOOD_GROUPS if get_blood_compatibility(d, r)] for d in BLOOD_GROUPS}
+
+
+class IncrementalMatcher:
+    """
+    Keeps a per-recipient top-k of exact compatibility scores up to date as profiles
+    arrive. A new donor is scored only against recipients needing one of its organs
+    with a compatible blood group; a new recipient only against the matching donors.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._primed = threading.Event()
+        self._synced: Set[str] = set()
+        self._watches = []
+        self._listeners: List[Callable[[], None]] = []
+        # Donors loaded from a snapshot that the first watch replay hasn't confirmed yet
+        self._unconfirmed: Optional[Set[str]] = None
+
+        self._donors: Dict[str, Donor] = {}
+        self._recipients: Dict[str, Recipient] = {}
+        # Organ and blood group -> ids, for the candidate filter in both directions;
+        # donors are partitioned by region for the expanding-ring search
+        self._donor_index = RegionIndex()
+        self._recipient_index = OrganBloodIndex()
+        # recipient id -> min-heap of (score, donor id), at most k entries
+        self._top: Dict[str, List[Tuple[float, str]]] = {}
+        # donor id -> recipients whose top-k holds it
+        self._holders: Dict[str, Set[str]] = defaultdict(set)
+        # Recipients still waiting, by urgency then registration time, per organ
+        self._waitlist = Waitlist()
+        # (donor id, organ) -> end of its viability window
+        self._expiry = TimingWheel(settings.VIABILITY_TICK_SECONDS, time.time())
+        self._expiry_stop = threading.Event()
+        self._expiry_thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+
+    def prime(self, donors: List[Donor], recipients: List[Recipient]):
+        """Loads a full registry snapshot and scores every recipient once."""
+        with self._lock:
+            for donor in donors:
+                self._index_donor(donor)
+            for recipient in recipients:
+                self._index_recipient(recipient)
+            for recipient in recipients:
+                self._rescore_recipient(str(recipient.id))
+            self._bump()
+            self._primed.set()
+
+    def ensure_primed(self):
+        if self._primed.is_set():
+            return
+        if self._watches and self._primed.wait(timeout=settings.WATCH_SYNC_TIMEOUT_SECONDS):
+            return
+        # No watch (or it hasn't synced yet): fall back to a one-off load
+        with self._lock:
+            if not self._primed.is_set():
+                self.prime(self._initial_donors(), profile_service.get_recipients())
+
+    def start_watch(self):
+        """Follows Firestore so registrations made outside this API are matched too."""
+        try:
+            # With a snapshot, the watch's initial replay only normalizes donors written since
+            since = None
+            snapshot = self._load_snapshot()
+            if snapshot is not None:
+                with self._lock, stage("snapshot_load"):
+                    donors = snapshot.donors()
+                    for donor in donors:
+                        self._index_donor(donor)
+                    self._unconfirmed = {str(d.id) for d in donors}
+                since = snapshot.stamp
+            self._watches = profile_service.watch(
+                lambda changes: self._apply_changes("recipients", changes, self.on_recipient_added, self.on_recipient_removed),
+                lambda changes: self._apply_changes("donors", changes, self.on_donor_added, self.on_donor_removed),
+                donors_unchanged_before=since,
+            )
+        except Exception as e:
+            print(f"Warning: registry watch unavailable, matching on demand: {e}")
+
+    def start_expiry(self):
+        """Drops organs as their windows close, so the version (and allocation rounds) follow promptly."""
+        if self._expiry_thread is not None:
+            return
+        self._expiry_stop.clear()
+        self._expiry_thread = threading.Thread(target=self._expiry_loop, name="viability-expiry", daemon=True)
+        self._expiry_thread.start()
+
+    def stop_expiry(self):
+        self._expiry_stop.set()
+        if self._expiry_thread is not None:
+            self._expiry_thread.join(timeout=5)
+        self._expiry_thread = None
+
+    def _expiry_loop(self):
+        while not self._expiry_stop.wait(self._expiry.tick):
+            try:
+                self.expire_due()
+            except Exception as e:
+                print(f"Viability expiry failed: {e}")
+
+    def stop_watch(self):
+        for handle in self._watches:
+            handle.unsubscribe()
+        # The watched pool is current, so it makes the next start's snapshot
+        if self._watches and "donors" in self._synced:
+            self._save_snapshot(self.donors(), snapshot_stamp())
+        self._watches = []
+
+    def _load_snapshot(self) -> Optional[DonorSnapshot]:
+        if not settings.DONOR_SNAPSHOT_DIR:
+            return None
+        return load_donor_snapshot(settings.DONOR_SNAPSHOT_DIR, max_age=settings.DONOR_SNAPSHOT_MAX_AGE_SECONDS)
+
+    def _save_snapshot(self, donors: List[Donor], stamp):
+        if not settings.DONOR_SNAPSHOT_DIR:
+            return
+        try:
+            write_donor_snapshot(settings.DONOR_SNAPSHOT_DIR, donors, stamp)
+        except Exception as e:
+            print(f"Warning: could not write donor snapshot: {e}")
+
+    def _initial_donors(self) -> List[Donor]:
+        """The snapshot's donors plus those registered since, else a full scan (which refreshes the snapshot)."""
+        snapshot = self._load_snapshot()
+        if snapshot is None:
+            stamp = snapshot_stamp()
+            donors = profile_service.get_donors()
+            self._save_snapshot(donors, stamp)
+            return donors
+        with stage("snapshot_load"):
+            donors = {str(d.id): d for d in snapshot.donors()}
+        for donor in profile_service.get_donors_registered_since(snapshot.stamp):
+            donors[str(donor.id)] = donor
+        return list(donors.values())
+
+    def _apply_changes(self, collection, changes, on_added, on_removed):
+        for change_type, profile in changes:
+            if change_type == "UNCHANGED":
+                # Already pooled from the snapshot
+                if self._unconfirmed is not None:
+                    self._unconfirmed.discard(profile)
+            elif change_type == "REMOVED":
+                on_removed(profile.id)
+            else:
+                if collection == "donors" and self._unconfirmed is not None:
+                    self._unconfirmed.discard(str(profile.id))
+                on_added(profile)
+        with self._lock:
+            if collection == "donors" and self._unconfirmed is not None:
+                # Snapshot donors missing from the first replay were deleted meanwhile
+                for donor_id in self._unconfirmed:
+                    on_removed(donor_id)
+                self._unconfirmed = None
+            self._synced.add(collection)
+            if {"recipients", "donors"} <= self._synced:
+                self._primed.set()
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Registers a callback run (under the matcher lock, so keep it cheap) whenever the pool version changes."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _bump(self):
+        self.version += 1
+        for callback in self._listeners:
+            callback()
+
+    # --- Events ---
+
+    def on_donor_added(self, donor: Donor):
+        with self._lock:
+            self._add_donor(donor)
+            self._bump()
+
+    def on_donor_removed(self, donor_id):
+        with self._lock:
+            if str(donor_id) in self._donors:
+                self._remove_donor(str(donor_id))
+                self._bump()
+
+    def on_recipient_added(self, recipient: Recipient):
+        with self._lock:
+            recipient_id = str(recipient.id)
+            if recipient_id in self._recipients:
+                self._remove_recipient(recipient_id)
+            self._index_recipient(recipient)
+            self._rescore_recipient(recipient_id)
+            self._bump()
+
+    def on_recipient_removed(self, recipient_id):
+        with self._lock:
+            if str(recipient_id) in self._recipients:
+                self._remove_recipient(str(recipient_id))
+                self._bump()
+
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """Drops every organ whose viability window has closed; returns how many."""
+        with self._lock:
+            fired = self._expiry.advance(time.time() if now is None else now)
+            if not fired:
+                return 0
+            expired: Dict[str, Set[str]] = defaultdict(set)
+            for donor_id, organ in fired:
+                expired[donor_id].add(organ)
+                metrics.inc("organ_viability_expired_total", (("organ", organ_key(organ)),))
+            for donor_id, organs in expired.items():
+                donor = self._donors.get(donor_id)
+                if donor is None:
+                    continue
+                remaining = [organ for organ in donor.organs_available if organ not in organs]
+                if remaining:
+                    self._add_donor(donor.with_organs(remaining))
+                else:
+                    self._remove_donor(donor_id)
+            self._bump()
+            return len(fired)
+
+    def mark_allocated(self, recipient_id) -> bool:
+        """
+        Takes a recipient off this worker's waitlist once an allocation for them is accepted.
+        The accept persists the recipient's "allocated" status, which is what keeps them
+        off every other worker's waitlist (the watch relays them as removed) and across restarts.
+        """
+        with self._lock:
+            if not self._waitlist.remove(recipient_id):
+                return False
+            recipient = self._recipients.get(str(recipient_id))
+            if recipient is not None:
+                recipient.allocated = True
+            self._bump()
+            return True
+
+    # --- Reads ---
+
+    def get_recipient(self, recipient_id) -> Optional[Recipient]:
+        return self._recipients.get(str(recipient_id))
+
+    def get_donor(self, donor_id) -> Optional[Donor]:
+        return self._donors.get(str(donor_id))
+
+    def recipients(self) -> List[Recipient]:
+        with self._lock:
+            return list(self._recipients.values())
+
+    def donors(self) -> List[Donor]:
+        with self._lock:
+            return list(self._donors.values())
+
+    def waitlist(self, n: int, organ: Optional[str] = None) -> List[Recipient]:
+        """The n most urgent waiting recipients (earliest registered first on ties), optionally for one organ."""
+        with self._lock:
+            return [self._recipients[recipient_id] for recipient_id in self._waitlist.top(n, organ)]
+
+    def waitlist_sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return self._waitlist.organs()
+
+    def top_candidates(self, recipient_id, limit: Optional[int] = None) -> List[Tuple[float, Donor]]:
+        """Precomputed (exact score, donor) pairs for a recipient, best first."""
+        with self._lock:
+            # Never hand out an organ whose window closed since the last tick
+            self.expire_due()
+            heap = self._top.get(str(recipient_id), [])
+            ranked = sorted(heap, reverse=True)[:limit or self.k]
+            return [(score, self._donors[donor_id]) for score, donor_id in ranked]
+
+    def candidates(self, recipient: Recipient) -> List[Donor]:
+        """Every pooled donor offering the recipient's organ with a compatible blood group."""
+        with self._lock:
+            self.expire_due()
+            return [self._donors[d] for d in self._candidate_ids(recipient)]
+
+    # --- Internals ---
+
+    def _add_donor(self, donor: Donor):
+        donor_id = str(donor.id)
+        if donor_id in self._donors:
+            self._remove_donor(donor_id)
+        donor = self._index_donor(donor)
+        if donor is None:
+            return
+
+        with stage("candidate_filter"):
+            affected = self._recipient_index.lookup(
+                donor.organs_available, _RECIPIENT_GROUPS_FOR.get(donor.blood_type, []))
+
+        with stage("compatibility_score"):
+            for recipient_id in affected:
+                score, _, _ = basic_compatibility_score(self._recipients[recipient_id], donor)
+                self._offer(recipient_id, score, donor_id)
+
+    def _index_donor(self, donor: Donor) -> Optional[Donor]:
+        """Pools the donor's still-viable organs and schedules their expiry; None when none are left."""
+        donor_id = str(donor.id)
+        if donor.procured_at is not None:
+            organs = live_organs(donor, time.time())
+            if not organs:
+                return None
+            if len(organs) < len(donor.organs):
+                donor = donor.with_organs(organs)
+            for organ in organs:
+                expiry = expires_at(donor.procured_at, organ)
+                if expiry is not None:
+                    self._expiry.schedule((donor_id, organ), expiry)
+        self._donors[donor_id] = donor
+        self._donor_index.add(donor_id, donor.organs_available, donor.blood_type, donor.location_code)
+        return donor
+
+    def _index_recipient(self, recipient: Recipient):
+        recipient_id = str(recipient.id)
+        self._recipients[recipient_id] = recipient
+        self._recipient_index.add(recipient_id, [recipient.organ_required], recipient.blood_type)
+        if recipient.allocated:
+            self._waitlist.remove(recipient_id)
+        else:
+            self._waitlist.upsert(recipient)
+
+    def _candidate_ids(self, recipient: Recipient) -> Set[str]:
+        return self._donor_index.lookup([recipient.organ_required], _DONOR_GROUPS_FOR.get(recipient.blood_type, []))
+
+    def _rescore_recipient(self, recipient_id: str):
+        recipient = self._recipients[recipient_id]
+        for _, donor_id in self._top.pop(recipient_id, []):
+            self._holders[donor_id].discard(recipient_id)
+
+        if settings.MATCH_RING_SEARCH:
+            with stage("ring_search"):
+                heap = ring_top_k(recipient, self.k, self._donor_index.regions(),
+                                  lambda region: self._score_region(recipient, region))
+        else:
+            with stage("candidate_filter"):
+                candidates = [self._donors[d] for d in self._candidate_ids(recipient)]
+            with stage("compatibility_score"):
+                scored = self._score(recipient, candidates)
+            with stage("sort"):
+                heap = heapq.nlargest(self.k, scored)
+        heapq.heapify(heap)
+        self._top[recipient_id] = heap
+        for _, donor_id in heap:
+            self._holders[donor_id].add(recipient_id)
+
+    def _score_region(self, recipient: Recipient, region: int) -> List[Tuple[float, str]]:
+        ids = self._donor_index.lookup_in(region, [recipient.organ_required], _DONOR_GROUPS_FOR.get(recipient.blood_type, []))
+        return self._score(recipient, [self._donors[d] for d in ids])
+
+    @staticmethod
+    def _score(recipient: Recipient, candidates: List[Donor]) -> List[Tuple[float, str]]:
+        hla = hla_scores(recipient, candidates)
+        return [
+            (basic_compatibility_score(recipient, donor, hla_score)[0], str(donor.id))
+            for donor, hla_score in zip(candidates, hla)
+        ]
+
+    def _offer(self, recipient_id: str, score: float, donor_id: str):
+        heap = self._top.setdefault(recipient_id, [])
+        if len(heap) < self.k:
+            heapq.heappush(heap, (score, donor_id))
+        elif (score, donor_id) > heap[0]:
+            _, evicted = heapq.heapreplace(heap, (score, donor_id))
+            self._holders[evicted].discard(recipient_id)
+        else:
+            return
+        self._holders[donor_id].add(recipient_id)
+
+    def _remove_donor(self, donor_id: str):
+        donor = self._donors.pop(donor_id)
+        self._donor_index.remove(donor_id)
+        if donor.procured_at is not None:
+            for organ in donor.organs_available:
+                self._expiry.cancel((donor_id, organ))
+        # Only recipients that had this donor in their top-k need a refill
+        for recipient_id in self._holders.pop(donor_id, set()):
+            if recipient_id in self._recipients:
+                self._rescore_recipient(recipient_id)
+
+    def _remove_recipient(self, recipient_id: str):
+        self._recipients.pop(recipient_id)
+        self._recipient_index.remove(recipient_id)
+        self._waitlist.remove(recipient_id)
+        for _, donor_id in self._top.pop(recipient_id, []):
+            self._holders[donor_id].discard(recipient_id)
+
+
+incremental_matcher = IncrementalMatcher(k=settings.MATCH_TOP_K)
@@ -1,7 +1,10 @@
-from typing import Dict, Tuple
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 from geopy.distance import geodesic
 from diffprivlib.mechanisms import Gaussian
 import numpy as np
+from .hla import hla_score as pair_hla_score
+from ..models.profiles import Donor, Recipient, blood_groups, locations
 
 # Privacy Mechanism
 # Sensitivity is 1.0 because score is bound 0-1
@@ -15,6 +18,8 @@ def parse_hla(hla_str: str) -> int:
     except (ValueError, IndexError, AttributeError):
         return 0
 
+BLOOD_GROUPS = ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"]
+
 def get_blood_compatibility(donor_type: str, recipient_type: str) -> int:
     """Returns 1 if compatible, 0 otherwise."""
     compatible = {
@@ -41,20 +46,31 @@ def haversine_distance(loc1: str, loc2: str) -> float:
     coord2 = location_coords.get(loc2, (0,0))
     return geodesic(coord1, coord2).km
 
-def basic_compatibility_score(recipient: Dict, donor: Dict) -> Tuple[float, dict, float]:
-    # Blood type match
-    blood_score = 1.0 if donor["blood_type"] == recipient["blood_type"] else \
-                  0.5 if donor["blood_type"] in ["O-", "O+"] or recipient["blood_type"] in ["AB+", "AB-"] else 0.0
+@lru_cache(maxsize=None)
+def location_distance(code1: int, code2: int) -> float:
+    """Distance between two location category codes; there are only a handful, so it's cached."""
+    return haversine_distance(locations.decode(code1), locations.decode(code2))
+
+_UNIVERSAL_DONORS = {blood_groups.encode("O-"), blood_groups.encode("O+")}
+_UNIVERSAL_RECIPIENTS = {blood_groups.encode("AB+"), blood_groups.encode("AB-")}
+
+def basic_compatibility_score(recipient: Recipient, donor: Donor, hla_score: Optional[float] = None) -> Tuple[float, dict, float]:
+    recipient = Recipient.coerce(recipient)
+    donor = Donor.coerce(donor)
+
+    # Blood type match (compared as category codes)
+    blood_score = 1.0 if donor.blood == recipient.blood else \
+                  0.5 if donor.blood in _UNIVERSAL_DONORS or recipient.blood in _UNIVERSAL_RECIPIENTS else 0.0
 
-    # HLA similarity
-    hla_str = donor.get("hla_markers", "0/6")
-    hla_score = int(hla_str.split("/")[0]) / 6.0
+    # HLA similarity (callers scoring a whole pool pass the vectorized value in)
+    if hla_score is None:
+        hla_score = pair_hla_score(recipient, donor)
 
     # Urgency weighting
-    urgency_weight = recipient.get("urgency_score", 5) / 10.0
+    urgency_weight = recipient.urgency_score / 10.0
 
     # Proximity
-    dist = haversine_distance(recipient["location"], donor.get("location", "USA-New York"))
+    dist = location_distance(recipient.location_code, donor.location_code)
     proximity_score = max(0, 1 - (dist / 10000))
 
     # Combined score
@@ -69,6 +85,23 @@ def basic_compatibility_score(recipient: Dict, donor: Dict) -> Tuple[float, dict
     
     return round(score, 3), breakdown, round(dist, 1)
 
+def compatibility_scores(recipient: Recipient, donor_blood: np.ndarray, donor_location: np.ndarray,
+                         hla: np.ndarray) -> np.ndarray:
+    """basic_compatibility_score against many donors at once, from their blood and location codes and HLA scores."""
+    recipient = Recipient.coerce(recipient)
+    universal = np.isin(donor_blood, list(_UNIVERSAL_DONORS)) | (recipient.blood in _UNIVERSAL_RECIPIENTS)
+    blood_score = np.where(donor_blood == recipient.blood, 1.0, np.where(universal, 0.5, 0.0))
+    codes, inverse = np.unique(donor_location, return_inverse=True)
+    dist = np.array([location_distance(recipient.location_code, int(c)) for c in codes], dtype=float)[inverse]
+    proximity_score = np.maximum(0, 1 - (dist / 10000))
+    score = (blood_score * 0.4) + (hla * 0.3) + (proximity_score * 0.2) + (recipient.urgency_score / 10.0 * 0.1)
+    return np.round(score, 3)
+
+def compatibility_upper_bound(recipient: Recipient, dist: float) -> float:
+    """Best score any donor at least `dist` km away could reach: same blood group, full HLA match."""
+    proximity_score = max(0, 1 - (dist / 10000))
+    return round(0.4 + 0.3 + (proximity_score * 0.2) + (recipient.urgency_score / 10.0 * 0.1), 3)
+
 def noisy_score(original_score: float) -> float:
     noisy = dp_mech_score.randomise(original_score)
     return max(0.0, min(1.0, noisy))
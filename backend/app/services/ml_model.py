@@ -1,18 +1,37 @@
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
+import argparse
+import json
+import logging
 import os
+import threading
+import time
+from ..core.versions import current_version
+from .forest import FlatForest
+
+logger = logging.getLogger(__name__)
+
+# Model inputs, in column order
+FEATURES = ["age", "urgency_score"]
 
 class SuccessModel:
     def __init__(self):
         self.model = RandomForestClassifier(n_estimators=50, random_state=42)
         self.is_trained = False
+        # Predictions come from the forest compiled into flat arrays: this process's
+        # trained model, or the memory-mapped one published by the owning worker
+        self.forest = None
+        self._forest_dir = None
+        self._forest_checked_at = float("-inf")
+        self._forest_lock = threading.Lock()
 
     def train(self, profiles_data):
-        print("Training Success Prediction Model using Mock Data...")
+        logger.info("Training Success Prediction Model using Mock Data...")
         if not profiles_data:
-            print("No profiles to train on.")
+            logger.warning("No profiles to train on.")
             return
 
         df_profiles = pd.DataFrame(profiles_data)
@@ -27,8 +46,7 @@ class SuccessModel:
         df_train = df_profiles.copy()
         df_train['success'] = df_train.apply(mock_outcome, axis=1)
         
-        features = ['age', 'urgency_score'] 
-        X = df_train[features].fillna(0)
+        X = df_train[FEATURES].fillna(0)
         y = df_train['success']
         
         try:
@@ -36,21 +54,120 @@ class SuccessModel:
             self.model.fit(X_train, y_train)
             acc = accuracy_score(y_test, self.model.predict(X_test))
             self.is_trained = True
-            print(f"Success Model Trained. Accuracy: {acc:.2f}")
-        except Exception as e:
-            print(f"Model training failed: {e}")
+            self.forest = FlatForest.from_sklearn(self.model)
+            logger.info(f"Success Model Trained. Accuracy: {acc:.2f}")
+        except Exception:
+            logger.exception("Model training failed")
 
-    def predict_probability(self, donor_age, recipient_urgency):
+    def export(self, directory):
+        """Publishes the trained forest as flat arrays other workers can map."""
         if not self.is_trained:
-            return 0.5
-        try:
-            pred_input = pd.DataFrame([{
-                'age': donor_age,
-                'urgency_score': recipient_urgency
-            }])
-            return self.model.predict_proba(pred_input)[0][1]
-        except Exception as e:
-            print(f"Prediction error: {e}")
-            return 0.5
+            return None
+        return FlatForest.from_sklearn(self.model).save(directory)
+
+    def attach(self, directory, poll=1.0):
+        """Predicts from the forest published in `directory`, re-attaching when a new version is swapped in."""
+        self._forest_dir = directory
+        self._forest_poll = poll
+        self._refresh_forest(force=True)
+
+    def _refresh_forest(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._forest_checked_at < self._forest_poll:
+            return
+        with self._forest_lock:
+            self._forest_checked_at = now
+            # Only the pointer is read per poll; the arrays are mapped again when it moves
+            path = current_version(self._forest_dir)
+            if path is None or (self.forest is not None and path == self.forest.path):
+                return
+            try:
+                forest = FlatForest.load(self._forest_dir)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not attach shared model: {e}")
+                return
+            if forest is not None and (self.forest is None or forest.path != self.forest.path):
+                self.forest = forest
+
+    def predict_batch(self, donor_ages, recipient_urgency):
+        """
+        Success probabilities for several donors at once; recipient_urgency is one value
+        or one per donor. Same results as the sklearn model, without its per-call overhead.
+        """
+        if self._forest_dir is not None:
+            self._refresh_forest()
+        # One read of the reference: a model swapped in meanwhile doesn't affect this call
+        forest = self.forest
+        ages = np.asarray(donor_ages, dtype=float).reshape(-1)
+        if forest is None:
+            return np.full(len(ages), 0.5)
+        if 1 not in forest.classes or not len(ages):
+            return np.zeros(len(ages))
+        X = np.column_stack([ages, np.broadcast_to(np.asarray(recipient_urgency, dtype=float), ages.shape)])
+        return forest.predict_proba_batch(X)[:, forest.classes.index(1)]
+
+    def predict_probability(self, donor_age, recipient_urgency):
+        return float(self.predict_batch([donor_age], recipient_urgency)[0])
 
 ml_service = SuccessModel()
+
+
+def train_outcome_model(dataset_path, model_dir, min_rows=50, tolerance=0.01, validation_split=0.2, seed=42):
+    """
+    Trains a candidate model on recorded match outcomes and publishes it to `model_dir`
+    only if it passes validation. Runs in a separate process, so it takes file paths
+    and returns a plain dict.
+
+    The dataset is float32 rows of (donor age, recipient urgency, accepted). On a held-out
+    split the compiled forest must reproduce sklearn exactly, and its Brier score must be
+    within `tolerance` of the currently published model's.
+    """
+    data = np.fromfile(dataset_path, dtype=np.float32).reshape(-1, len(FEATURES) + 1)
+    X, y = data[:, :-1].astype(np.float64), data[:, -1].astype(int)
+    if len(y) < min_rows or len(np.unique(y)) < 2:
+        return {"status": "skipped", "rows": len(y), "reason": "not enough outcomes of both kinds"}
+
+    stratify = y if np.bincount(y).min() >= 2 else None
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=validation_split, random_state=seed, stratify=stratify)
+    model = RandomForestClassifier(n_estimators=50, random_state=seed).fit(X_train, y_train)
+    forest = FlatForest.from_sklearn(model)
+
+    proba = forest.predict_proba_batch(X_val)
+    if not np.array_equal(proba, model.predict_proba(X_val)):
+        return {"status": "rejected", "rows": len(y), "reason": "compiled forest disagrees with sklearn"}
+    brier = float(np.mean((_success_column(forest, proba) - y_val) ** 2))
+    result = {"rows": len(y), "brier": brier, "accuracy": float(accuracy_score(y_val, model.predict(X_val)))}
+
+    served = FlatForest.load(model_dir, mmap=False) if os.path.isdir(model_dir) else None
+    if served is not None and served.n_features == X.shape[1]:
+        result["served_brier"] = float(np.mean(
+            (_success_column(served, served.predict_proba_batch(X_val)) - y_val) ** 2))
+        if brier > result["served_brier"] + tolerance:
+            return {**result, "status": "rejected", "reason": "worse than the served model"}
+    return {**result, "status": "published", "path": forest.save(model_dir)}
+
+
+def _success_column(forest, proba):
+    return proba[:, forest.classes.index(1)] if 1 in forest.classes else np.zeros(len(proba))
+
+
+def main(argv=None):
+    from ..core.config import settings
+
+    parser = argparse.ArgumentParser(description="Train the success model on the mock profiles and publish it for workers.")
+    parser.add_argument("--data", default=settings.DATA_FILE)
+    parser.add_argument("--out", default=settings.SUCCESS_MODEL_PATH)
+    args = parser.parse_args(argv)
+    if not args.out:
+        parser.error("--out is required when SUCCESS_MODEL_PATH is not set")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with open(args.data) as f:
+        ml_service.train(json.load(f))
+    path = ml_service.export(args.out)
+    print(f"Published model to {path}" if path else "Model not trained; nothing published")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Tuple
+
+# Registration forms disagree on organ names ("lungs" in one, "Lungs" in another,
+# "Kidney" vs "kidney"); index and look up by one canonical key
+_ORGAN_ALIASES = {
+    "lungs": "lung",
+    "kidneys": "kidney",
+    "corneas": "cornea",
+    "intestines": "intestine",
+}
+
+
+def organ_key(organ) -> str:
+    """Canonical organ name: case- and whitespace-insensitive, with plural forms folded."""
+    key = " ".join(str(organ or "").split()).lower()
+    return _ORGAN_ALIASES.get(key, key)
+
+
+class OrganBloodIndex:
+    """
+    Inverted indexes from organ and from blood group to profile ids. A lookup takes
+    the organ postings and the union of the allowed blood groups' postings and
+    intersects them smallest-first, so only profiles that both offer (or need) the
+    organ and have a compatible blood group come back.
+    """
+
+    def __init__(self):
+        self._by_organ: Dict[str, Set[str]] = defaultdict(set)
+        self._by_blood: Dict[str, Set[str]] = defaultdict(set)
+        self._entries: Dict[str, Tuple[Tuple[str, ...], str]] = {}
+
+    def add(self, profile_id: str, organs: Iterable[str], blood_type: str):
+        self.remove(profile_id)
+        keys = tuple({organ_key(o) for o in organs if organ_key(o)})
+        self._entries[profile_id] = (keys, blood_type)
+        for key in keys:
+            self._by_organ[key].add(profile_id)
+        self._by_blood[blood_type].add(profile_id)
+
+    def remove(self, profile_id: str):
+        entry = self._entries.pop(profile_id, None)
+        if entry is None:
+            return
+        keys, blood_type = entry
+        for key in keys:
+            self._by_organ[key].discard(profile_id)
+        self._by_blood[blood_type].discard(profile_id)
+
+    def lookup(self, organs: Iterable[str], blood_types: Iterable[str]) -> Set[str]:
+        """Ids indexed under any of `organs` and any of `blood_types`."""
+        by_organ = set()
+        for organ in {organ_key(o) for o in organs}:
+            by_organ |= self._by_organ.get(organ, set())
+        if not by_organ:
+            return set()
+        blood_sets = [self._by_blood[b] for b in set(blood_types) if self._by_blood.get(b)]
+        if sum(len(s) for s in blood_sets) < len(by_organ):
+            by_blood = set().union(*blood_sets)
+            return by_blood & by_organ
+        # Usually the organ side is the small one: filter it by each id's blood group
+        allowed = set(blood_types)
+        return {i for i in by_organ if self._entries[i][1] in allowed}
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,278 @@
+"""
+Synthetic donor and recipient populations of any size, for load and capacity testing.
+
+Columns are sampled with NumPy a block at a time. Every block has its own generator
+seeded from (seed, kind, block index), so the output depends only on the seed, the
+count and the reference time, and blocks can be rendered in parallel. Records have
+the same shape as the registry documents the seed scripts produce, including the
+per-organ test_* fields, and stream to JSON Lines (or Parquet when pyarrow is
+installed) in chunks.
+
+    cd backend
+    python -m app.services.population donors 10000000 --out ../donors.jsonl --seed 7 --workers 8
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..core.responses import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+BLOCK_SIZE = 100_000
+
+# US blood group frequencies
+BLOOD_GROUPS = ["O+", "A+", "B+", "AB+", "O-", "A-", "B-", "AB-"]
+BLOOD_WEIGHTS = [0.374, 0.357, 0.085, 0.034, 0.066, 0.063, 0.015, 0.006]
+LOCATIONS = ["USA-California", "USA-New York", "Europe-UK", "Asia-India", "Africa-South Africa"]
+LOCATION_WEIGHTS = [0.25, 0.2, 0.2, 0.25, 0.1]
+ORGANS = ["kidney", "liver", "heart", "lungs"]
+# Chance a deceased donor gives each organ; living donors give one kidney or part of a liver
+DECEASED_ORGAN_RATES = [0.9, 0.75, 0.3, 0.25]
+LIVING_DONOR_SHARE = 0.4
+LIVING_KIDNEY_SHARE = 0.85
+# Waitlist mix of required organs, and of urgency among recipients
+WAITLIST_WEIGHTS = [0.83, 0.10, 0.035, 0.035]
+URGENCY = ["Stable", "Moderate", "Urgent (Hospitalized)", "Critical (ICU)"]
+URGENCY_WEIGHTS = [0.35, 0.35, 0.2, 0.1]
+GENDERS = ["Male", "Female"]
+NEXT_OF_KIN = ["Mother", "Father", "Brother", "Sister", "Spouse", "Aunty"]
+TESTS = ["ct", "echo", "pftsTest", "xray"]
+HLA_LOCI = ["A", "A", "B", "B", "DR", "DR"]
+HLA_ANTIGENS = 30
+_KINDS = {"donors": 1, "recipients": 2}
+
+# Common antigens are far more frequent than rare ones
+_ANTIGEN_WEIGHTS = 1.0 / np.arange(1, HLA_ANTIGENS + 1)
+_ANTIGEN_WEIGHTS /= _ANTIGEN_WEIGHTS.sum()
+
+
+def _days_before(as_of: np.datetime64, days: np.ndarray) -> np.ndarray:
+    return (as_of.astype("datetime64[D]") - days.astype("timedelta64[D]")).astype(str)
+
+
+def generate_block(kind: str, seed: int, block: int, size: int, as_of: datetime) -> Dict[str, np.ndarray]:
+    """
+    Columns for rows [block * BLOCK_SIZE, block * BLOCK_SIZE + size) of a population.
+    A full block is always sampled, so a smaller population is a prefix of a larger one.
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"Unknown population {kind!r}; expected one of {sorted(_KINDS)}")
+    rng = np.random.default_rng([seed, _KINDS[kind], block])
+    now = np.datetime64(as_of.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    donor = kind == "donors"
+    n = BLOCK_SIZE
+
+    cols = {
+        "index": np.arange(block * BLOCK_SIZE, block * BLOCK_SIZE + n),
+        "abhaId": rng.integers(10 ** 13, 10 ** 14, n),
+        "blood": rng.choice(len(BLOOD_GROUPS), n, p=BLOOD_WEIGHTS).astype(np.int8),
+        "location": rng.choice(len(LOCATIONS), n, p=LOCATION_WEIGHTS).astype(np.int8),
+        "gender": rng.integers(0, len(GENDERS), n, dtype=np.int8),
+        "hospital": rng.integers(100, 1000, n, dtype=np.int16),
+        "name": rng.integers(0, 16 ** 6, n),
+        "hla": rng.choice(HLA_ANTIGENS, (n, len(HLA_LOCI)), p=_ANTIGEN_WEIGHTS).astype(np.int8) + 1,
+    }
+    age = np.clip(rng.normal(42 if donor else 52, 14 if donor else 15, n), 18 if donor else 1, 75 if donor else 80)
+    cols["dob"] = _days_before(now, (age * 365.25).astype(np.int64) + rng.integers(0, 365, n))
+    seconds = rng.integers(0, 365 * 86400 * 10 ** 6, n).astype("timedelta64[us]")
+    cols["registeredAt"] = (now - seconds).astype(str)
+
+    if donor:
+        living = rng.random(n) < LIVING_DONOR_SHARE
+        organs = rng.random((n, len(ORGANS))) < DECEASED_ORGAN_RATES
+        # Deceased donors give at least a kidney; living donors exactly one kidney or liver
+        organs[~organs.any(axis=1), 0] = True
+        living_kidney = rng.random(n) < LIVING_KIDNEY_SHARE
+        organs[living] = False
+        organs[living, 0] = living_kidney[living]
+        organs[living, 1] = ~living_kidney[living]
+        cols["living"] = living
+        cols["organs"] = organs
+        cols["kin"] = rng.integers(0, len(NEXT_OF_KIN), n, dtype=np.int8)
+        cols["phone"] = rng.integers(6 * 10 ** 9, 10 ** 10, n)
+    else:
+        required = rng.choice(len(ORGANS), n, p=WAITLIST_WEIGHTS)
+        cols["organs"] = np.eye(len(ORGANS), dtype=bool)[required]
+        cols["urgency"] = rng.choice(len(URGENCY), n, p=URGENCY_WEIGHTS).astype(np.int8)
+        cols["diagnosis"] = rng.integers(0, 16 ** 8, n)
+
+    # Test results (1-10) taken 1-30 days ago, for every organ; only the ones for organs
+    # the profile has are emitted. Dates are offsets into a small table of day strings.
+    shape = (n, len(ORGANS), len(TESTS))
+    cols["test_values"] = rng.integers(1, 11, shape, dtype=np.int8)
+    cols["test_days"] = rng.integers(1, 31, shape, dtype=np.int8)
+    cols = {name: column[:size] for name, column in cols.items()}
+    cols["day_names"] = _days_before(now, np.arange(31))
+    return cols
+
+
+def blocks(kind: str, count: int, seed: int = 0, as_of: Optional[datetime] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Column blocks for a population of `count` profiles."""
+    as_of = as_of or _today()
+    for block in range(-(-count // BLOCK_SIZE)):
+        yield generate_block(kind, seed, block, min(BLOCK_SIZE, count - block * BLOCK_SIZE), as_of)
+
+
+# Every "A1 A2"-style antigen pair per locus, so a typing is three table lookups
+_HLA_PAIRS = [
+    (column, np.asarray([f"{locus}{a} {locus}{b}" for a in range(1, HLA_ANTIGENS + 1)
+                         for b in range(1, HLA_ANTIGENS + 1)]))
+    for column, locus in ((0, "A"), (2, "B"), (4, "DR"))
+]
+
+
+def _hla_text(hla: np.ndarray) -> List[str]:
+    pairs = [table[(hla[:, column].astype(np.int32) - 1) * HLA_ANTIGENS + hla[:, column + 1] - 1].tolist()
+             for column, table in _HLA_PAIRS]
+    return [f"{a} {b} {dr}" for a, b, dr in zip(*pairs)]
+
+
+_ORGAN_LISTS = [[organ for j, organ in enumerate(ORGANS) if mask >> j & 1] for mask in range(1 << len(ORGANS))]
+_TEST_KEYS = [[key for test in TESTS for key in (f"test_{organ}_{test}", f"test_{organ}_{test}_date")]
+              for organ in ORGANS]
+_VALUE_NAMES = [str(v) for v in range(11)]
+
+
+def records(kind: str, cols: Dict[str, np.ndarray]) -> List[dict]:
+    """Registry documents for one block of columns."""
+    donor = kind == "donors"
+    prefix = "don" if donor else "rec"
+    blood = np.asarray(BLOOD_GROUPS)[cols["blood"]].tolist()
+    location = np.asarray(LOCATIONS)[cols["location"]].tolist()
+    gender = np.asarray(GENDERS)[cols["gender"]].tolist()
+    hla_field = "hlaTissueTyping" if donor else "hlaResults"
+    hla_text = _hla_text(cols["hla"])
+    masks = (cols["organs"] @ (1 << np.arange(len(ORGANS)))).tolist()
+    # Flat lists: nested ones cost more to build than the records themselves
+    test_values = cols["test_values"].ravel().tolist()
+    test_days = cols["test_days"].ravel().tolist()
+    per_row = len(ORGANS) * len(TESTS)
+    day_names = cols["day_names"].tolist()
+    if donor:
+        living, kin, phone = cols["living"].tolist(), cols["kin"].tolist(), cols["phone"].tolist()
+    else:
+        urgency, diagnosis = cols["urgency"].tolist(), cols["diagnosis"].tolist()
+
+    out = []
+    for i, (index, abha, dob, registered, hospital, name, mask) in enumerate(zip(
+            cols["index"].tolist(), cols["abhaId"].tolist(), cols["dob"].tolist(), cols["registeredAt"].tolist(),
+            cols["hospital"].tolist(), cols["name"].tolist(), masks)):
+        organs = _ORGAN_LISTS[mask]
+        doc = {
+            "id": f"{prefix}-{index:010d}",
+            "abhaId": str(abha),
+            "bloodGroup": blood[i],
+            "dob": dob,
+            "fullName": f"{'Donor' if donor else 'Recipient'}_{name:06x}",
+            "gender": gender[i],
+            "hospitalId": f"H-{hospital}",
+            "hospitalLocation": location[i],
+            hla_field: hla_text[i],
+            "registeredAt": registered,
+            "status": "active",
+            "submissionType": "synthetic",
+        }
+        if donor:
+            doc["donorType"] = "living" if living[i] else "deceased"
+            doc["email"] = f"user{index}@example.com"
+            doc["nextOfKin"] = NEXT_OF_KIN[kin[i]]
+            doc["organsWillingToDonate"] = list(organs)
+            doc["phone"] = str(phone[i])
+        else:
+            doc["diagnosis"] = f"Diagnosis_{diagnosis[i]:08x}"
+            doc["organRequired"] = organs[0].capitalize()
+            doc["urgencyStatus"] = URGENCY[urgency[i]]
+        for j in range(len(ORGANS)):
+            if mask >> j & 1:
+                base = i * per_row + j * len(TESTS)
+                doc.update(zip(_TEST_KEYS[j], [cell for k in range(base, base + len(TESTS))
+                                               for cell in (_VALUE_NAMES[test_values[k]], day_names[test_days[k]])]))
+        out.append(doc)
+    return out
+
+
+def _render_jsonl(args) -> bytes:
+    kind, seed, block, size, as_of = args
+    return b"".join(dumps(doc) + b"\n" for doc in records(kind, generate_block(kind, seed, block, size, as_of)))
+
+
+def _parquet_table(kind: str, cols: Dict[str, np.ndarray]):
+    docs = records(kind, cols)
+    names = sorted({key for doc in docs for key in doc} | {
+        f"test_{organ}_{test}{suffix}" for organ in ORGANS for test in TESTS for suffix in ("", "_date")})
+    return pa.table({name: [doc.get(name) for doc in docs] for name in names})
+
+
+def write_population(path: str, kind: str, count: int, seed: int = 0, as_of: Optional[datetime] = None,
+                     fmt: Optional[str] = None, workers: int = 1) -> int:
+    """Writes `count` profiles to `path` (JSONL, or Parquet by suffix/fmt) and returns the count."""
+    as_of = as_of or _today()
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "jsonl")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+    jobs = [(kind, seed, block, min(BLOCK_SIZE, count - block * BLOCK_SIZE), as_of)
+            for block in range(-(-count // BLOCK_SIZE))]
+
+    tmp = f"{path}.tmp"
+    if fmt == "jsonl":
+        with open(tmp, "wb") as f:
+            if workers > 1:
+                with Pool(workers) as pool:
+                    for chunk in pool.imap(_render_jsonl, jobs):
+                        f.write(chunk)
+            else:
+                for job in jobs:
+                    f.write(_render_jsonl(job))
+    else:
+        writer = None
+        try:
+            for job in jobs:
+                table = _parquet_table(kind, generate_block(*job))
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    os.replace(tmp, path)
+    return count
+
+
+def _today() -> datetime:
+    # Midnight UTC, so runs on the same day with the same seed produce identical files
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def main(argv=None):
+    import time
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(_KINDS))
+    parser.add_argument("count", type=int)
+    parser.add_argument("--out", required=True, help="Output file (.jsonl or .parquet)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--as-of", help="Reference time for dates (ISO 8601, default today 00:00 UTC)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"])
+    parser.add_argument("--workers", type=int, default=1, help="Processes rendering blocks (JSONL)")
+    args = parser.parse_args(argv)
+
+    as_of = datetime.fromisoformat(args.as_of) if args.as_of else None
+    if as_of is not None and as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+    start = time.perf_counter()
+    write_population(args.out, args.kind, args.count, args.seed, as_of, args.format, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.count} {args.kind} to {args.out} in {elapsed:.1f}s ({args.count / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
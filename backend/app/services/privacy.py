@@ -0,0 +1,200 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from ..core.config import settings
+
+
+class PrivacyBudgetExceeded(Exception):
+    """Raised when a fresh release would push a recipient past their epsilon budget."""
+
+
+class PrivacyAccountant:
+    """
+    Memoizes noisy releases per (recipient, donor, kind) and keeps a per-recipient
+    epsilon ledger. A release is only re-randomised when the underlying data version
+    changes, so repeated polling returns the same noisy value and costs no budget.
+
+    Each process keeps its own ledger and memo unless share() moves them into a SQLite
+    file that every worker on the host opens; releases then run in a write transaction
+    on it, so the budget and the noise a recipient sees don't depend on the worker.
+    """
+
+    def __init__(self, budget: float, ledger_path: Optional[str] = None,
+                 flush_interval: float = 30.0, max_releases: int = 200000):
+        self.budget = budget
+        self.ledger_path = ledger_path
+        self.flush_interval = flush_interval
+        self.max_releases = max_releases
+
+        self._lock = threading.Lock()
+        self._spent: Dict[str, float] = {}
+        # (recipient, donor, kind) -> (data_version, noisy_value), in LRU order
+        self._releases: "OrderedDict[Tuple[str, str, str], Tuple[Hashable, Any]]" = OrderedDict()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def share(self, path: str):
+        """
+        Keeps the ledger and the releases in the SQLite file at `path` from now on.
+        Spent budget from the JSON ledger is carried over for recipients the file doesn't
+        know yet; the JSON ledger is no longer written.
+        """
+        db = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS spent (recipient TEXT PRIMARY KEY, epsilon REAL NOT NULL)")
+        db.execute("CREATE TABLE IF NOT EXISTS releases (recipient TEXT, donor TEXT, kind TEXT, version TEXT,"
+                   " value TEXT, PRIMARY KEY (recipient, donor, kind))")
+        with self._lock:
+            db.executemany("INSERT OR IGNORE INTO spent VALUES (?, ?)", list(self._spent.items()))
+            self._spent.clear()
+            self._releases.clear()
+            self.ledger_path = None
+            self._dirty = False
+            self._db = db
+
+    def release(self, recipient_id, donor_id, kind: str, value, mechanism: Callable,
+                epsilon: float, version: Hashable = None):
+        """
+        Returns mechanism(value) for this pair, drawing fresh noise only if no release
+        exists for the current data version. version defaults to the exact value itself.
+        Once the budget is spent, the last release for the pair is reused if there is one;
+        otherwise PrivacyBudgetExceeded is raised.
+        """
+        r_key = str(recipient_id)
+        key = (r_key, str(donor_id), kind)
+        if version is None:
+            version = round(float(value), 6)
+
+        with self._lock:
+            if self._db is not None:
+                return self._release_shared(key, version, value, mechanism, epsilon)
+            cached = self._releases.get(key)
+            if cached is not None and cached[0] == version:
+                self._releases.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+            spent = self._spent.get(r_key, 0.0)
+            if spent + epsilon > self.budget:
+                if cached is not None:
+                    # Re-publishing an old release leaks nothing new
+                    self.hits += 1
+                    return cached[1]
+                raise PrivacyBudgetExceeded(
+                    f"Recipient {r_key} has spent {spent:.2f} of {self.budget:.2f} epsilon"
+                )
+
+            noisy = mechanism(value)
+            self._spent[r_key] = spent + epsilon
+            self._releases[key] = (version, noisy)
+            self._releases.move_to_end(key)
+            if len(self._releases) > self.max_releases:
+                self._releases.popitem(last=False)
+            self._dirty = True
+            self.misses += 1
+
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+        return noisy
+
+    def _release_shared(self, key, version, value, mechanism: Callable, epsilon: float):
+        """release() against the shared file; the caller holds self._lock."""
+        db, stamp = self._db, json.dumps(version)
+        query = "SELECT version, value FROM releases WHERE recipient = ? AND donor = ? AND kind = ?"
+        row = db.execute(query, key).fetchone()
+        if row is not None and row[0] == stamp:
+            self.hits += 1
+            return json.loads(row[1])
+        # Re-read under the write lock: another worker may have released meanwhile
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(query, key).fetchone()
+            spent = self._spent_shared(key[0])
+            if row is not None and (row[0] == stamp or spent + epsilon > self.budget):
+                # The current release, or once the budget is spent the last one
+                db.execute("COMMIT")
+                self.hits += 1
+                return json.loads(row[1])
+            if spent + epsilon > self.budget:
+                raise PrivacyBudgetExceeded(
+                    f"Recipient {key[0]} has spent {spent:.2f} of {self.budget:.2f} epsilon"
+                )
+            noisy = mechanism(value)
+            db.execute("INSERT OR REPLACE INTO spent VALUES (?, ?)", (key[0], spent + epsilon))
+            db.execute("INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?)", (*key, stamp, json.dumps(noisy)))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.misses += 1
+        return noisy
+
+    def _spent_shared(self, recipient_id: str) -> float:
+        row = self._db.execute("SELECT epsilon FROM spent WHERE recipient = ?", (recipient_id,)).fetchone()
+        return row[0] if row is not None else 0.0
+
+    def spent(self, recipient_id) -> float:
+        with self._lock:
+            if self._db is not None:
+                return self._spent_shared(str(recipient_id))
+            return self._spent.get(str(recipient_id), 0.0)
+
+    def remaining(self, recipient_id) -> float:
+        return max(0.0, self.budget - self.spent(recipient_id))
+
+    def reset(self, ledger_path: Optional[str] = None):
+        """Forgets every release and all spent budget, and persists to `ledger_path` from now on (None: nowhere)."""
+        with self._lock:
+            self._spent.clear()
+            self._releases.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self.ledger_path = ledger_path
+            self._dirty = False
+            self.hits = self.misses = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._dirty or not self.ledger_path:
+            return
+        tmp_path = f"{self.ledger_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"budget": self.budget, "spent": self._spent}, f)
+            os.replace(tmp_path, self.ledger_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error persisting privacy ledger: {e}")
+
+    def _load(self):
+        if not self.ledger_path or not os.path.exists(self.ledger_path):
+            return
+        try:
+            with open(self.ledger_path, "r") as f:
+                self._spent = {k: float(v) for k, v in json.load(f).get("spent", {}).items()}
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not load privacy ledger: {e}")
+
+
+privacy_accountant = PrivacyAccountant(
+    budget=settings.DP_RECIPIENT_EPSILON_BUDGET,
+    ledger_path=settings.PRIVACY_LEDGER_FILE,
+    flush_interval=settings.PRIVACY_LEDGER_FLUSH_SECONDS,
+)
+atexit.register(privacy_accountant.flush)
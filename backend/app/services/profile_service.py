@@ -1,7 +1,16 @@
 from ..core.firebase import db
+from ..core.metrics import stage
+from .hla import parse_hla_typing
+from .viability import procurement_time
+from ..models.profiles import Donor, Recipient
 import pandas as pd
 from datetime import datetime
 
+# Donors whose status is anything else (inactive, withdrawn...) are left out of the pool
+ACTIVE_DONOR_STATUSES = ("active",)
+# Recipients with these statuses have had an allocation accepted and no longer wait
+ALLOCATED_RECIPIENT_STATUSES = ("allocated",)
+
 class ProfileService:
     def __init__(self):
         pass
@@ -16,8 +25,9 @@ class ProfileService:
             return 30
 
     def _normalize_patient(self, doc):
-        data = doc.to_dict()
-        
+        return self.normalize_recipient(doc.id, doc.to_dict())
+
+    def normalize_recipient(self, doc_id, data):
         # Map urgency status text to numeric score
         urgency_map = {
             "Critical (ICU)": 10,
@@ -28,52 +38,99 @@ class ProfileService:
         urgency_text = data.get("urgencyStatus", "Moderate")
         urgency_score = urgency_map.get(urgency_text, 5)
 
-        return {
-            "id": doc.id,
-            "role": "recipient",
-            "name": data.get("fullName", "Unknown"),
-            "blood_type": data.get("bloodGroup", "O+"),
-            "age": self._calculate_age(data.get("dob")),
-            "location": data.get("hospitalLocation", "Unknown"),
-            "urgency_score": urgency_score,
-            "hla_markers": data.get("hlaResults", "0/6"),
-            "organ_required": data.get("organRequired", "Kidney")
-        }
+        return Recipient(
+            id=doc_id,
+            name=data.get("fullName", "Unknown"),
+            age=self._calculate_age(data.get("dob")),
+            urgency_score=urgency_score,
+            blood_type=data.get("bloodGroup", "O+"),
+            location=data.get("hospitalLocation", "Unknown"),
+            organ_required=data.get("organRequired", "Kidney"),
+            hla_markers=data.get("hlaResults", "0/6"),
+            hla_codes=parse_hla_typing(data.get("hlaTyping") or data.get("hlaResults")),
+            registered_at=data.get("registeredAt"),
+            allocated=not self.is_waiting_recipient(data),
+        )
 
     def _normalize_donor(self, doc):
-        data = doc.to_dict()
-        return {
-            "id": doc.id,
-            "role": "donor",
-            "blood_type": data.get("bloodGroup", "O+"),
-            "age": self._calculate_age(data.get("dob")),
-            "location": data.get("hospitalLocation", "Unknown"),
-            "hla_markers": data.get("hlaTissueTyping", "0/6"),
-            "organs_available": data.get("organsWillingToDonate", [])
-        }
+        return self.normalize_donor(doc.id, doc.to_dict())
+
+    def normalize_donor(self, doc_id, data):
+        return Donor(
+            id=doc_id,
+            age=self._calculate_age(data.get("dob")),
+            blood_type=data.get("bloodGroup", "O+"),
+            location=data.get("hospitalLocation", "Unknown"),
+            organs_available=data.get("organsWillingToDonate", []),
+            hla_markers=data.get("hlaTissueTyping", "0/6"),
+            hla_codes=parse_hla_typing(data.get("hlaTyping") or data.get("hlaTissueTyping")),
+            procured_at=procurement_time(data),
+        )
+
+    def _active_donors(self, docs):
+        rows = ((doc.id, doc.to_dict()) for doc in docs)
+        return [self.normalize_donor(doc_id, data) for doc_id, data in rows if self.is_active_donor(data)]
+
+    def is_active_donor(self, data) -> bool:
+        """Donors without a status count as active."""
+        return str(data.get("status") or "active").lower() in ACTIVE_DONOR_STATUSES
+
+    def is_waiting_recipient(self, data) -> bool:
+        """Recipients without a status are waiting."""
+        return str(data.get("status") or "").lower() not in ALLOCATED_RECIPIENT_STATUSES
 
     def get_by_id(self, profile_id):
         # ID might be a string now (Firestore ID) or numeric. Try both or assume string
         # Our seeded IDs are auto-generated strings
         # Check recipients (was patients)
-        doc = db.collection('recipients').document(str(profile_id)).get()
+        with stage("profile_fetch"):
+            doc = db.collection('recipients').document(str(profile_id)).get()
         if doc.exists:
-            return self._normalize_patient(doc)
+            with stage("profile_normalize"):
+                return self._normalize_patient(doc)
         
         # Check donors
-        doc = db.collection('donors').document(str(profile_id)).get()
+        with stage("profile_fetch"):
+            doc = db.collection('donors').document(str(profile_id)).get()
         if doc.exists:
-            return self._normalize_donor(doc)
+            with stage("profile_normalize"):
+                return self._normalize_donor(doc)
             
         return None
 
+    def get_many(self, profile_ids, role: str):
+        """Donors or recipients by id in one batched read, keyed by id; missing ids are left out."""
+        collection = db.collection('donors' if role == "donor" else 'recipients')
+        refs = [collection.document(str(profile_id)) for profile_id in dict.fromkeys(map(str, profile_ids))]
+        if not refs:
+            return {}
+        with stage("profile_fetch"):
+            docs = [doc for doc in db.get_all(refs) if doc.exists]
+        normalize = self._normalize_donor if role == "donor" else self._normalize_patient
+        with stage("profile_normalize"):
+            return {doc.id: normalize(doc) for doc in docs}
+
     def get_recipients(self):
-        docs = db.collection('recipients').stream()
-        return [self._normalize_patient(doc) for doc in docs]
+        """Waiting recipients."""
+        with stage("profile_fetch"):
+            docs = list(db.collection('recipients').stream())
+        with stage("profile_normalize"):
+            rows = ((doc.id, doc.to_dict()) for doc in docs)
+            return [self.normalize_recipient(doc_id, data) for doc_id, data in rows if self.is_waiting_recipient(data)]
 
     def get_donors(self):
-        docs = db.collection('donors').stream()
-        return [self._normalize_donor(doc) for doc in docs]
+        """Active donors."""
+        with stage("profile_fetch"):
+            docs = list(db.collection('donors').stream())
+        with stage("profile_normalize"):
+            return self._active_donors(docs)
+
+    def get_donors_registered_since(self, stamp: datetime):
+        """Active donors whose registeredAt is at or after `stamp` (the delta on top of a pool snapshot)."""
+        with stage("profile_fetch"):
+            docs = list(db.collection('donors').where('registeredAt', '>=', stamp.isoformat()).stream())
+        with stage("profile_normalize"):
+            return self._active_donors(docs)
 
     def add_recipient(self, data: dict):
         # Generate a new document ref to get an ID or allow ID in data
@@ -81,6 +138,7 @@ class ProfileService:
         # However, we might want to link it to the user's auth ID if available.
         
         # If 'id' is in data, use it as document ID, otherwise let Firestore generate one
+        data.setdefault('registeredAt', datetime.utcnow().isoformat())
         doc_id = data.get('id')
         if doc_id:
             db.collection('recipients').document(str(doc_id)).set(data)
@@ -89,4 +147,50 @@ class ProfileService:
             update_time, doc_ref = db.collection('recipients').add(data)
             return {"id": doc_ref.id, **data}
 
+    def add_donor(self, data: dict):
+        # Snapshot deltas are fetched by registration time
+        data.setdefault('registeredAt', datetime.utcnow().isoformat())
+        doc_id = data.get('id')
+        if doc_id:
+            db.collection('donors').document(str(doc_id)).set(data)
+            return {"id": doc_id, **data}
+        else:
+            update_time, doc_ref = db.collection('donors').add(data)
+            return {"id": doc_ref.id, **data}
+
+    def watch(self, on_recipients, on_donors, donors_unchanged_before: datetime = None):
+        """
+        Subscribes to registry changes in Firestore.
+        Each callback receives a list of (change_type, profile) tuples, where change_type
+        is "ADDED", "MODIFIED" or "REMOVED". The first call replays every existing document.
+        Donors that are not active, and recipients whose allocation was accepted, are
+        relayed as "REMOVED".
+        With `donors_unchanged_before` (a snapshot stamp), replayed donors last written
+        before it are passed as ("UNCHANGED", doc_id) without being normalized.
+        Returns the watch handles; call .unsubscribe() on them to stop.
+        """
+        def relay(normalize, callback, unchanged_before=None, active=None):
+            def on_snapshot(col_snapshot, changes, read_time):
+                batch = []
+                for change in changes:
+                    doc = change.document
+                    if (unchanged_before is not None and change.type.name == "ADDED"
+                            and doc.update_time is not None and doc.update_time < unchanged_before):
+                        batch.append(("UNCHANGED", doc.id))
+                    else:
+                        data = doc.to_dict()
+                        change_type = change.type.name
+                        if active is not None and change_type != "REMOVED" and not active(data):
+                            change_type = "REMOVED"
+                        batch.append((change_type, normalize(doc.id, data)))
+                callback(batch)
+            return on_snapshot
+
+        return [
+            db.collection('recipients').on_snapshot(
+                relay(self.normalize_recipient, on_recipients, active=self.is_waiting_recipient)),
+            db.collection('donors').on_snapshot(
+                relay(self.normalize_donor, on_donors, donors_unchanged_before, self.is_active_donor)),
+        ]
+
 profile_service = ProfileService()
@@ -0,0 +1,91 @@
+"""
+Region-partitioned donor pools and the expanding-ring top-k search over them.
+
+Donors are partitioned by their location ("USA-California", "Europe-UK", ...), the
+unit distances are defined on. A search scores the recipient's home region first,
+then the others nearest first. Only proximity depends on the region, so every donor
+at distance d or more scores at most compatibility_upper_bound(recipient, d). Once
+the k-th best score so far beats the bound of the next ring, no farther donor can
+enter the top-k and the search stops. The result is the exhaustive top-k, ties
+included, while most searches score only the nearest regions' donors.
+"""
+import heapq
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from ..core.metrics import metrics
+from .matching import compatibility_upper_bound, location_distance
+from .organ_index import OrganBloodIndex
+
+metrics.describe("organ_ring_search_regions_total", "Regions scored by expanding-ring searches.")
+metrics.describe("organ_ring_search_donors_total", "Donors scored by expanding-ring searches.")
+
+
+def rings(home: int, regions: Iterable[int]) -> List[Tuple[float, int]]:
+    """(distance km, region) pairs, home first, then nearest first."""
+    return sorted((location_distance(home, region), region) for region in regions)
+
+
+def ring_top_k(recipient, k: int, regions: Iterable[int],
+               score_region: Callable[[int], Iterable[tuple]]) -> List[tuple]:
+    """
+    The k largest entries of score_region(region) over all regions, best first.
+    Entries are tuples starting with the score, and must be unique (e.g. carry the donor id).
+    """
+    heap: List[tuple] = []
+    visited = scored = 0
+    for distance, region in rings(recipient.location_code, regions):
+        if len(heap) >= k and heap[0][0] > compatibility_upper_bound(recipient, distance):
+            break
+        visited += 1
+        for entry in score_region(region):
+            scored += 1
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    metrics.inc("organ_ring_search_regions_total", (), visited)
+    metrics.inc("organ_ring_search_donors_total", (), scored)
+    return sorted(heap, reverse=True)
+
+
+class RegionIndex:
+    """An OrganBloodIndex per region; lookups can be scoped to one region or span them all."""
+
+    def __init__(self):
+        self._regions: Dict[int, OrganBloodIndex] = {}
+        self._region_of: Dict[str, int] = {}
+
+    def add(self, profile_id: str, organs: Iterable[str], blood_type: str, region: int):
+        self.remove(profile_id)
+        self._region_of[profile_id] = region
+        self._regions.setdefault(region, OrganBloodIndex()).add(profile_id, organs, blood_type)
+
+    def remove(self, profile_id: str):
+        region = self._region_of.pop(profile_id, None)
+        if region is None:
+            return
+        index = self._regions[region]
+        index.remove(profile_id)
+        if not len(index):
+            del self._regions[region]
+
+    def regions(self) -> List[int]:
+        return list(self._regions)
+
+    def lookup_in(self, region: int, organs: Iterable[str], blood_types: Iterable[str]) -> Set[str]:
+        index = self._regions.get(region)
+        return index.lookup(organs, blood_types) if index is not None else set()
+
+    def lookup(self, organs: Iterable[str], blood_types: Iterable[str]) -> Set[str]:
+        organs, blood_types = list(organs), list(blood_types)
+        found: Set[str] = set()
+        for index in self._regions.values():
+            found |= index.lookup(organs, blood_types)
+        return found
+
+    def sizes(self) -> Dict[int, int]:
+        """Pooled profiles per region."""
+        return {region: len(index) for region, index in self._regions.items()}
+
+    def __len__(self):
+        return len(self._region_of)
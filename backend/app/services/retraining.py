@@ -0,0 +1,222 @@
+"""
+Background retraining of the success model from recorded match outcomes.
+
+Accepted matches (requests_accepted) are positive examples; requests and allocations
+whose status is rejected or declined are negative ones. Each example is a (donor,
+recipient) pair reduced to the model's features. The training set is streamed from
+Firestore in chunks and appended to a flat float32 file, so memory stays bounded by
+the chunk size. Training and validation run in a separate process. A model that
+passes validation is published with an atomic version swap, and the served model
+switches to it between requests.
+
+    cd backend
+    python -m app.services.retraining --dir ../models/success
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.firebase import db
+from ..core.metrics import metrics
+from .incremental import incremental_matcher
+from .ml_model import FEATURES, ml_service, train_outcome_model
+from .profile_service import profile_service
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("organ_model_retrains_total", "Success model retraining runs by outcome.")
+
+ACCEPTED_COLLECTION = "requests_accepted"
+REJECTED_COLLECTIONS = ("requests", "matches")
+REJECTED_STATUSES = ["rejected", "declined"]
+# Urgency of a recipient without a recorded one ("Moderate")
+DEFAULT_URGENCY = 5
+
+
+def outcome_chunks(chunk_size: int) -> Iterator[np.ndarray]:
+    """Yields float32 arrays of (donor age, recipient urgency, accepted) rows, at most chunk_size docs at a time."""
+    sources = [(1, db.collection(ACCEPTED_COLLECTION).stream())] + [
+        (0, db.collection(name).where("status", "in", REJECTED_STATUSES).stream()) for name in REJECTED_COLLECTIONS
+    ]
+    for label, docs in sources:
+        chunk: List[Dict] = []
+        for doc in docs:
+            chunk.append(doc.to_dict())
+            if len(chunk) >= chunk_size:
+                yield _featurize(chunk, label)
+                chunk = []
+        if chunk:
+            yield _featurize(chunk, label)
+
+
+def _featurize(docs: List[Dict], label: int) -> np.ndarray:
+    donor_ids = {str(d.get("best_match_donor_id") or d.get("donor_id") or "") for d in docs} - {""}
+    ages = _donor_ages(donor_ids)
+    rows = []
+    for doc in docs:
+        age = ages.get(str(doc.get("best_match_donor_id") or doc.get("donor_id") or ""))
+        if age is None:
+            continue
+        urgency = doc.get("urgency_score")
+        if urgency is None:
+            recipient = incremental_matcher.get_recipient(doc.get("patient_id") or doc.get("recipient_id") or "")
+            urgency = recipient.urgency_score if recipient else DEFAULT_URGENCY
+        rows.append((age, urgency, label))
+    return np.asarray(rows, dtype=np.float32).reshape(-1, len(FEATURES) + 1)
+
+
+def _donor_ages(donor_ids) -> Dict[str, int]:
+    """Ages of pooled donors, with the rest read in one batch."""
+    ages, unpooled = {}, []
+    for donor_id in donor_ids:
+        donor = incremental_matcher.get_donor(donor_id)
+        if donor is None:
+            unpooled.append(donor_id)
+        else:
+            ages[donor_id] = donor.age
+    for donor_id, donor in profile_service.get_many(unpooled, "donor").items():
+        ages[donor_id] = donor.age
+    return ages
+
+
+class ModelRetrainer:
+    """
+    Periodically rebuilds the outcome dataset and trains a candidate model in a child
+    process. Only runs in the worker that owns the pool; other workers pick published
+    models up through SUCCESS_MODEL_PATH.
+    """
+
+    def __init__(self, directory: str = "", interval: float = 0.0, chunk_size: int = 5000, min_rows: int = 50,
+                 tolerance: float = 0.01, timeout: float = 600.0):
+        self.directory = directory
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.min_rows = min_rows
+        self.tolerance = tolerance
+        self.timeout = timeout
+        self.last_result: Optional[Dict] = None
+
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # --- Lifecycle ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-retrainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Model retraining failed")
+
+    # --- Runs ---
+
+    def model_dir(self) -> str:
+        if not self.directory:
+            self.directory = settings.SUCCESS_MODEL_PATH or tempfile.mkdtemp(prefix="success-model-")
+        return self.directory
+
+    def build_dataset(self, path: str) -> int:
+        """Writes the outcome rows to `path` chunk by chunk; returns the row count."""
+        rows = 0
+        with open(path, "wb") as f:
+            for chunk in outcome_chunks(self.chunk_size):
+                chunk.tofile(f)
+                rows += len(chunk)
+        return rows
+
+    def run_once(self) -> Dict:
+        with self._run_lock:
+            workdir = tempfile.mkdtemp(prefix="retrain-")
+            try:
+                dataset = os.path.join(workdir, "outcomes.f32")
+                rows = self.build_dataset(dataset)
+                if rows < self.min_rows:
+                    result = {"status": "skipped", "rows": rows, "reason": "not enough outcomes"}
+                else:
+                    result = self._train(dataset)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+            metrics.inc("organ_model_retrains_total", (("status", result["status"]),))
+            if result["status"] == "published":
+                # Requests already scoring keep the forest they read; new ones get this one
+                ml_service.attach(self.model_dir(), poll=settings.SHARED_POOL_POLL_SECONDS)
+            logger.info(f"Model retraining {result['status']}: {result}")
+            self.last_result = result
+            return result
+
+    def _train(self, dataset: str) -> Dict:
+        if self._pool is None:
+            # spawn: the serving process has threads, which fork would copy in odd states
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        future = self._pool.submit(
+            train_outcome_model, dataset, self.model_dir(), self.min_rows, self.tolerance)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Abandon the stuck child; the next run starts a fresh one
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            return {"status": "failed", "reason": f"training exceeded {self.timeout:.0f}s"}
+        except Exception as e:
+            return {"status": "failed", "reason": str(e)}
+
+
+model_retrainer = ModelRetrainer(
+    interval=settings.MODEL_RETRAIN_INTERVAL_SECONDS,
+    chunk_size=settings.MODEL_RETRAIN_CHUNK_SIZE,
+    min_rows=settings.MODEL_RETRAIN_MIN_ROWS,
+    tolerance=settings.MODEL_RETRAIN_TOLERANCE,
+    timeout=settings.MODEL_RETRAIN_TIMEOUT_SECONDS,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.SUCCESS_MODEL_PATH, help="Model directory to publish to")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("--dir is required when SUCCESS_MODEL_PATH is not set")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    model_retrainer.directory = args.dir
+    try:
+        print(model_retrainer.run_once())
+    finally:
+        model_retrainer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import stage
+from ..core.versions import current_version
+from ..models.profiles import Donor, Recipient
+from .hla import hla_scores
+from .matching import basic_compatibility_score, get_blood_compatibility
+from .organ_index import organ_key
+from .regions import ring_top_k
+from .snapshot import DonorSnapshot, load_donor_snapshot, snapshot_stamp, write_donor_snapshot
+from .viability import window_seconds
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SharedDonorPool:
+    """
+    One donor pool per host instead of one per uvicorn worker.
+
+    The first worker to take the directory's lock becomes the owner: it keeps the
+    registry watch and matcher, and publishes the pool as a columnar snapshot (and
+    each allocation round as JSON) whenever they change. The other workers follow:
+    they memory-map the current snapshot read-only, so the page cache holds one copy
+    for all of them, and re-attach when the owner swaps CURRENT to a new version.
+    Followers select candidates with vectorized masks over the shared columns and
+    build records only for those rows.
+    """
+
+    def __init__(self, directory: str, poll: float = 1.0, publish_debounce: float = 2.0):
+        self.directory = directory
+        self.poll = poll
+        self.publish_debounce = publish_debounce
+        self.following = False
+
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._snapshot: Optional[DonorSnapshot] = None
+        self._checked_at = float("-inf")
+        self._allocations: Tuple[Optional[int], Optional[Dict]] = (None, None)
+
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Roles ---
+
+    def acquire(self) -> bool:
+        """Tries to become the owner. Held until the process exits."""
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            return True
+        handle = open(os.path.join(self.directory, "owner.lock"), "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_file = handle
+        return True
+
+    def follow(self):
+        self.following = True
+        self.snapshot()
+
+    def attached(self) -> bool:
+        return self.following and self.snapshot() is not None
+
+    # --- Follower reads ---
+
+    def snapshot(self) -> Optional[DonorSnapshot]:
+        """The current version, re-attached (at most once per poll interval) when the owner swaps it."""
+        now = time.monotonic()
+        if now - self._checked_at < self.poll:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at >= self.poll:
+                self._checked_at = now
+                path = current_version(self.directory)
+                if path and (self._snapshot is None or path != self._snapshot.path):
+                    # Readers holding the old version keep a valid mapping until they drop it
+                    self._snapshot = load_donor_snapshot(self.directory) or self._snapshot
+        return self._snapshot
+
+    @property
+    def version(self) -> Optional[str]:
+        snapshot = self.snapshot()
+        return os.path.basename(snapshot.path) if snapshot else None
+
+    def candidate_rows(self, snapshot: DonorSnapshot, recipient: Recipient, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows (of all, or of `rows`) offering the recipient's organ, still viable, with a compatible blood group."""
+        key = organ_key(recipient.organ_required)
+        organ_ok = np.array([any(organ_key(n) == key for n in names) for names in snapshot.tables["organ_sets"]] or [False])
+        blood_ok = np.array([bool(get_blood_compatibility(b, recipient.blood_type)) for b in snapshot.tables["blood_groups"]])
+        organ_set, blood = snapshot.columns["organ_set"], snapshot.columns["blood"]
+        if rows is None:
+            rows = np.flatnonzero(organ_ok[organ_set] & blood_ok[blood])
+        else:
+            rows = rows[organ_ok[organ_set[rows]] & blood_ok[blood[rows]]]
+        window = window_seconds(recipient.organ_required)
+        if window is not None:
+            # The owner drops organs as they expire; between publishes, mask them here
+            procured = snapshot.columns["procured_at"][rows]
+            rows = rows[~(procured + window <= time.time())]
+        return rows
+
+    def candidates(self, recipient: Recipient) -> List[Donor]:
+        snapshot = self.snapshot()
+        if snapshot is None or not len(snapshot):
+            return []
+        return snapshot.donors(self.candidate_rows(snapshot, recipient))
+
+    def top_candidates(self, recipient: Recipient, limit: int = 10) -> List[Tuple[float, Donor]]:
+        """Best (exact score, donor) pairs, scored on demand like the owner's matcher keeps them."""
+        if settings.MATCH_RING_SEARCH:
+            return self._ring_top_candidates(recipient, limit)
+        with stage("candidate_filter"):
+            candidates = self.candidates(recipient)
+        with stage("compatibility_score"):
+            hla = hla_scores(recipient, candidates)
+            # Ties break on donor id, as in the matcher's heaps
+            scored = [
+                (basic_compatibility_score(recipient, donor, hla_score)[0], str(donor.id), i)
+                for i, (donor, hla_score) in enumerate(zip(candidates, hla))
+            ]
+        with stage("sort"):
+            return [(score, candidates[i]) for score, _, i in heapq.nlargest(limit, scored)]
+
+    def _ring_top_candidates(self, recipient: Recipient, limit: int) -> List[Tuple[float, Donor]]:
+        snapshot = self.snapshot()
+        if snapshot is None or not len(snapshot):
+            return []
+        with stage("candidate_filter"):
+            rows = self.candidate_rows(snapshot, recipient)
+            # Group the candidate rows by region (location code in this process)
+            region = snapshot.codes()[1][snapshot.columns["location"][rows]]
+        scored_donors: List[Donor] = []
+
+        def score_region(code: int):
+            # Records are built only for the regions the search reaches
+            start = len(scored_donors)
+            scored_donors.extend(snapshot.donors(rows[region == code]))
+            in_region = scored_donors[start:]
+            hla = hla_scores(recipient, in_region)
+            return [
+                (basic_compatibility_score(recipient, donor, hla_score)[0], str(donor.id), start + i)
+                for i, (donor, hla_score) in enumerate(zip(in_region, hla))
+            ]
+
+        with stage("ring_search"):
+            top = ring_top_k(recipient, limit, np.unique(region).tolist(), score_region)
+        return [(score, scored_donors[i]) for score, _, i in top]
+
+    def allocation_round(self) -> Optional[Dict]:
+        """The owner's latest published allocation round, re-read only when the file changes."""
+        path = os.path.join(self.directory, "allocations.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if self._allocations[0] != mtime:
+            with open(path) as f:
+                self._allocations = (mtime, json.load(f))
+        return self._allocations[1]
+
+    # --- Owner publishing ---
+
+    def publish(self, donors: List[Donor]):
+        write_donor_snapshot(self.directory, donors, snapshot_stamp())
+
+    def publish_allocations(self, current):
+        """Writes an allocation round for followers; replaced atomically."""
+        staging = os.path.join(self.directory, f".allocations.{uuid.uuid4().hex[:8]}")
+        with open(staging, "w") as f:
+            json.dump({"round": current.round, "computed_at": current.computed_at,
+                       "allocations": current.allocations}, f)
+        os.replace(staging, os.path.join(self.directory, "allocations.json"))
+
+    def start_publishing(self, matcher, allocations=None):
+        """Owner: republishes the pool after changes settle, and each allocation round."""
+        if self._thread is not None:
+            return
+        matcher.add_listener(self._changed.set)
+        if allocations is not None:
+            allocations.add_listener(self._publish_allocations)
+        self._stop.clear()
+        self._changed.set()
+        self._thread = threading.Thread(target=self._loop, args=(matcher,), name="shared-pool-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _publish_allocations(self, current):
+        try:
+            self.publish_allocations(current)
+        except Exception as e:
+            print(f"Warning: could not publish allocations: {e}")
+
+    def _loop(self, matcher):
+        # Republish unchanged pools too before the snapshot would count as stale
+        refresh = settings.DONOR_SNAPSHOT_MAX_AGE_SECONDS / 2
+        while not self._stop.is_set():
+            self._changed.wait(timeout=refresh)
+            if self._stop.wait(self.publish_debounce):
+                return
+            self._changed.clear()
+            try:
+                matcher.ensure_primed()
+                self.publish(matcher.donors())
+            except Exception as e:
+                print(f"Warning: could not publish donor pool: {e}")
+
+
+shared_pool = SharedDonorPool(
+    settings.DONOR_SNAPSHOT_DIR,
+    poll=settings.SHARED_POOL_POLL_SECONDS,
+    publish_debounce=settings.SHARED_POOL_PUBLISH_SECONDS,
+)
@@ -0,0 +1,203 @@
+"""
+Columnar on-disk snapshot of the normalized donor pool.
+
+A snapshot is a directory of .npy columns plus a manifest holding the category
+tables the integer codes refer to and a version stamp: every donor document
+written before the stamp is in the snapshot. Readers memory-map the columns and
+rebuild records without touching Firestore, then apply only what changed after
+the stamp. New versions are published by atomically replacing the CURRENT pointer.
+
+    cd backend
+    python -m app.services.snapshot --dir ../snapshots/donors
+"""
+import argparse
+import gc
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..core.versions import current_version, publish_version
+from ..models.profiles import Donor, _organ_set, blood_groups, locations, organs
+from .hla import LOCI, allele_codes, pack_matrix, unpack_matrix
+
+SNAPSHOT_FORMAT = 2
+# procured_at is epoch seconds, NaN for donors without a viability window
+COLUMNS = ("ids", "age", "blood", "location", "organ_set", "hla", "markers", "procured_at")
+
+# Writers' clocks disagree a little; documents this close to the stamp are re-applied
+_STAMP_MARGIN = timedelta(seconds=5)
+
+
+def snapshot_stamp() -> datetime:
+    """Stamp for a snapshot of a pool that is complete as of now."""
+    return datetime.now(timezone.utc) - _STAMP_MARGIN
+
+
+def _remap(values, categories) -> np.ndarray:
+    """Old code -> this process's code for a saved category table."""
+    return np.array([categories.encode(v) for v in values] or [0], dtype=np.int64)
+
+
+class DonorSnapshot:
+    """A loaded (memory-mapped) snapshot version."""
+
+    def __init__(self, path: str, manifest: Dict, columns: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.columns = columns
+        self.stamp = datetime.fromisoformat(manifest["stamp"])
+        self.tables = manifest["tables"]
+        self._codes = None
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def age_seconds(self) -> float:
+        return (datetime.now(timezone.utc) - self.stamp).total_seconds()
+
+    def hla_packed(self) -> np.ndarray:
+        """Packed typings re-encoded against this process's allele codes (-1 = no typing)."""
+        packed = np.asarray(self.columns["hla"])
+        valid = packed >= 0
+        codes = unpack_matrix(np.where(valid, packed, 0))
+        remapped = False
+        for i, locus in enumerate(LOCI):
+            names = self.tables["alleles"][locus]
+            remap = np.array([0] + [allele_codes.encode(locus, name) for name in names[1:]], dtype=np.int32)
+            if not np.array_equal(remap, np.arange(len(names))):
+                codes[:, 2 * i:2 * i + 2] = remap[codes[:, 2 * i:2 * i + 2]]
+                remapped = True
+        if not remapped:
+            return packed
+        return np.where(valid, pack_matrix(codes), -1)
+
+    def codes(self):
+        """(blood remap, location remap, organ sets, packed HLA) for this process, computed once."""
+        if self._codes is None:
+            self._codes = (
+                _remap(self.tables["blood_groups"], blood_groups),
+                _remap(self.tables["locations"], locations),
+                [_organ_set(names) for names in self.tables["organ_sets"]],
+                self.hla_packed(),
+            )
+        return self._codes
+
+    def donors(self, rows: Optional[np.ndarray] = None) -> List[Donor]:
+        """Rebuilds donor records (all, or just `rows`), re-encoding categorical codes for this process."""
+        blood_remap, location_remap, organ_sets, packed = self.codes()
+        cols = self.columns if rows is None else {c: self.columns[c][rows] for c in COLUMNS}
+        packed = packed if rows is None else packed[rows]
+        blood = blood_remap[cols["blood"]].tolist()
+        location = location_remap[cols["location"]].tolist()
+        markers_table = self.tables["markers"] + [None]
+        markers = np.where(cols["markers"] < 0, len(markers_table) - 1, cols["markers"]).tolist()
+        hla = [h if h >= 0 else None for h in packed.tolist()]
+        procured = [None if p != p else p for p in cols["procured_at"].tolist()]
+        # Allocating a million records would otherwise trigger repeated collections of the
+        # growing young generation, which costs more than building the records themselves
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [
+                Donor.restore(i, a, b, l, organ_sets[o], h, markers_table[m], p)
+                for i, a, b, l, o, h, m, p in zip(
+                    cols["ids"].tolist(), cols["age"].tolist(), blood, location,
+                    cols["organ_set"].tolist(), hla, markers, procured)
+            ]
+        finally:
+            if was_enabled:
+                gc.enable()
+
+
+def write_donor_snapshot(directory: str, donors: List[Donor], stamp: Optional[datetime] = None) -> str:
+    """Writes a new snapshot version and makes it current. Returns its path."""
+    stamp = stamp or snapshot_stamp()
+    count = len(donors)
+
+    organ_index: Dict[tuple, int] = {}
+    marker_index: Dict[str, int] = {}
+    columns = {
+        "ids": np.array([str(d.id) for d in donors]) if count else np.array([], dtype="U1"),
+        "age": np.fromiter((d.age for d in donors), dtype=np.int32, count=count),
+        "blood": np.fromiter((d.blood for d in donors), dtype=np.uint8, count=count),
+        "location": np.fromiter((d.location_code for d in donors), dtype=np.int32, count=count),
+        "organ_set": np.fromiter((organ_index.setdefault(d.organs, len(organ_index)) for d in donors),
+                                 dtype=np.int32, count=count),
+        "hla": np.fromiter((-1 if d.hla is None else d.hla for d in donors), dtype=np.int64, count=count),
+        "markers": np.fromiter((-1 if d._markers is None else marker_index.setdefault(d._markers, len(marker_index))
+                                for d in donors), dtype=np.int32, count=count),
+        "procured_at": np.fromiter((np.nan if d.procured_at is None else d.procured_at for d in donors),
+                                   dtype=np.float64, count=count),
+    }
+    # Tables are copied after the columns: they only ever grow, so every code above resolves
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "count": count,
+        "stamp": stamp.isoformat(),
+        "written_at": datetime.now(timezone.utc).isoformat(),
+        "tables": {
+            "blood_groups": list(blood_groups.values),
+            "locations": list(locations.values),
+            "organ_sets": [[organs.values[c] for c in combo] for combo in organ_index],
+            "markers": list(marker_index),
+            "alleles": {locus: allele_codes.names(locus) for locus in LOCI},
+        },
+    }
+
+    def write(path):
+        for column in COLUMNS:
+            np.save(os.path.join(path, f"{column}.npy"), columns[column])
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+    return publish_version(directory, write, stamp)
+
+
+def load_donor_snapshot(directory: str, max_age: Optional[float] = None) -> Optional[DonorSnapshot]:
+    """Maps the current snapshot version; None when there is none, it's unreadable or older than max_age seconds."""
+    path = current_version(directory)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable donor snapshot in {directory}: {e}")
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    try:
+        columns = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in COLUMNS}
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable donor snapshot in {directory}: {e}")
+        return None
+    snapshot = DonorSnapshot(path, manifest, columns)
+    if max_age is not None and snapshot.age_seconds() > max_age:
+        return None
+    return snapshot
+
+
+def main(argv=None):
+    from ..core.config import settings
+    from .profile_service import profile_service
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.DONOR_SNAPSHOT_DIR, help="Snapshot directory")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("--dir is required when DONOR_SNAPSHOT_DIR is not set")
+
+    stamp = snapshot_stamp()
+    donors = profile_service.get_donors()
+    path = write_donor_snapshot(args.dir, donors, stamp)
+    print(f"Wrote {len(donors)} donors to {path} (stamp {stamp.isoformat()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Organ viability windows and the timing wheel that expires them.
+
+A donor's organs stay transplantable for a per-organ window after procurement
+(VIABILITY_WINDOW_HOURS, e.g. about 4h for a heart, 36h for a kidney). Donors with no
+recorded procurement time, including living donors, have no window. The matcher schedules each
+pooled organ's expiry on a TimingWheel and drops it once the window closes. Scheduling
+and cancelling are O(1), and advancing visits only the ticks that elapsed, so expiry
+costs O(1) amortized per organ rather than a periodic scan of the pool.
+"""
+import math
+from datetime import datetime, timezone
+from typing import Dict, Hashable, List, Optional, Set
+
+from ..core.config import settings
+from .organ_index import organ_key
+
+
+def window_seconds(organ) -> Optional[float]:
+    """How long the organ stays viable after procurement; None when it does not expire."""
+    hours = settings.VIABILITY_WINDOW_HOURS.get(organ_key(organ), settings.VIABILITY_DEFAULT_HOURS)
+    return hours * 3600.0 if hours and hours > 0 else None
+
+
+def expires_at(procured_at: Optional[float], organ) -> Optional[float]:
+    if procured_at is None:
+        return None
+    window = window_seconds(organ)
+    return procured_at + window if window is not None else None
+
+
+def live_organs(donor, now: float) -> List[str]:
+    """The donor's organs whose viability window is still open at `now`."""
+    if donor.procured_at is None:
+        return donor.organs_available
+    return [organ for organ in donor.organs_available
+            if (expiry := expires_at(donor.procured_at, organ)) is None or expiry > now]
+
+
+def procurement_time(data: Dict) -> Optional[float]:
+    """
+    Epoch seconds the donor's organs were procured (procuredAt); None when not recorded.
+    With VIABILITY_REGISTRATION_AS_PROCUREMENT, deceased donors without one count from
+    their registration.
+    """
+    stamp = data.get("procuredAt")
+    if (not stamp and settings.VIABILITY_REGISTRATION_AS_PROCUREMENT
+            and str(data.get("donorType", "")).lower() == "deceased"):
+        stamp = data.get("registeredAt")
+    if not stamp:
+        return None
+    try:
+        when = datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        # Registry timestamps are written with utcnow()
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel with one slot per `tick` seconds of absolute time. An entry
+    fires on the first advance at or after its deadline, at most one tick late, and
+    never early.
+    """
+
+    def __init__(self, tick: float = 1.0, now: float = 0.0):
+        self.tick = tick
+        self._slots: Dict[int, Set[Hashable]] = {}
+        self._slot_of: Dict[Hashable, int] = {}
+        # Next slot to fire
+        self._cursor = math.floor(now / tick)
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, key) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Fires `key` once `deadline` has passed; replaces any earlier schedule for it."""
+        self.cancel(key)
+        slot = max(math.ceil(deadline / self.tick), self._cursor)
+        self._slots.setdefault(slot, set()).add(key)
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        entries = self._slots[slot]
+        entries.discard(key)
+        if not entries:
+            del self._slots[slot]
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Removes and returns every key whose deadline is at or before `now`."""
+        target = math.floor(now / self.tick)
+        if target < self._cursor:
+            return []
+        if target - self._cursor > len(self._slots):
+            # Long gap: visiting the occupied slots is cheaper than every elapsed tick
+            slots = sorted(s for s in self._slots if s <= target)
+        else:
+            slots = [s for s in range(self._cursor, target + 1) if s in self._slots]
+        self._cursor = target + 1
+        fired: List[Hashable] = []
+        for slot in slots:
+            for key in self._slots.pop(slot):
+                del self._slot_of[key]
+                fired.append(key)
+        return fired
@@ -0,0 +1,155 @@
+"""
+Live recipient waitlist ordered by urgency, then registration time.
+
+Each organ has its own indexed binary heap (a heap plus an id -> slot map), so a
+registration, an urgency change or a removal costs O(log n) instead of a re-sort of
+the whole registry. Top-N reads walk the heaps best-first without popping anything:
+O(N log N) for N results, whatever the waitlist size.
+"""
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.profiles import Recipient
+from .organ_index import organ_key
+
+# Sorts recipients without a recorded registration time after every dated one
+_UNDATED = "\uffff"
+
+Key = Tuple[int, str, str]
+
+
+def priority(recipient: Recipient) -> Key:
+    """Heap key: most urgent first, then earliest registered, then id for a stable order."""
+    return (-recipient.urgency_score, recipient.registered_at or _UNDATED, str(recipient.id))
+
+
+class IndexedHeap:
+    """Min-heap of (key, id) entries that can update or remove any id in O(log n)."""
+
+    def __init__(self):
+        self._entries: List[Tuple[Key, str]] = []
+        self._slots: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._slots
+
+    def push(self, item_id: str, key: Key):
+        """Inserts an id, or moves it to its new key if already present."""
+        slot = self._slots.get(item_id)
+        if slot is not None:
+            old = self._entries[slot][0]
+            self._entries[slot] = (key, item_id)
+            if key < old:
+                self._sift_up(slot)
+            elif key > old:
+                self._sift_down(slot)
+            return
+        self._entries.append((key, item_id))
+        self._slots[item_id] = len(self._entries) - 1
+        self._sift_up(len(self._entries) - 1)
+
+    def remove(self, item_id: str) -> bool:
+        slot = self._slots.pop(item_id, None)
+        if slot is None:
+            return False
+        last = self._entries.pop()
+        if slot < len(self._entries):
+            # Fill the hole with the last entry and restore the heap around it
+            self._entries[slot] = last
+            self._slots[last[1]] = slot
+            self._sift_up(slot)
+            self._sift_down(self._slots[last[1]])
+        return True
+
+    def peek(self) -> Optional[Tuple[Key, str]]:
+        return self._entries[0] if self._entries else None
+
+    def _move(self, slot: int, entry: Tuple[Key, str]):
+        self._entries[slot] = entry
+        self._slots[entry[1]] = slot
+
+    def _sift_up(self, slot: int):
+        entry = self._entries[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if self._entries[parent][0] <= entry[0]:
+                break
+            self._move(slot, self._entries[parent])
+            slot = parent
+        self._move(slot, entry)
+
+    def _sift_down(self, slot: int):
+        entries = self._entries
+        size = len(entries)
+        entry = entries[slot]
+        while True:
+            child = 2 * slot + 1
+            if child >= size:
+                break
+            if child + 1 < size and entries[child + 1][0] < entries[child][0]:
+                child += 1
+            if entry[0] <= entries[child][0]:
+                break
+            self._move(slot, entries[child])
+            slot = child
+        self._move(slot, entry)
+
+
+def best_first(heaps: Iterable[IndexedHeap], n: int) -> List[str]:
+    """The n smallest ids across heaps, in order, without modifying them."""
+    frontier = []
+    for h, heap in enumerate(heaps):
+        if len(heap):
+            frontier.append((heap._entries[0][0], h, 0, heap))
+    heapq.heapify(frontier)
+    out: List[str] = []
+    while frontier and len(out) < n:
+        _, h, slot, heap = heapq.heappop(frontier)
+        entries = heap._entries
+        out.append(entries[slot][1])
+        for child in (2 * slot + 1, 2 * slot + 2):
+            if child < len(entries):
+                heapq.heappush(frontier, (entries[child][0], h, child, heap))
+    return out
+
+
+class Waitlist:
+    """Per-organ indexed heaps of recipient ids. Not locked: the matcher calls it under its own lock."""
+
+    def __init__(self):
+        self._queues: Dict[str, IndexedHeap] = {}
+        self._organ_of: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self._organ_of)
+
+    def __contains__(self, recipient_id) -> bool:
+        return str(recipient_id) in self._organ_of
+
+    def upsert(self, recipient: Recipient):
+        """Adds a recipient or re-prioritizes it after an urgency or organ change."""
+        recipient_id = str(recipient.id)
+        organ = organ_key(recipient.organ_required)
+        previous = self._organ_of.get(recipient_id)
+        if previous is not None and previous != organ:
+            self._queues[previous].remove(recipient_id)
+        self._organ_of[recipient_id] = organ
+        self._queues.setdefault(organ, IndexedHeap()).push(recipient_id, priority(recipient))
+
+    def remove(self, recipient_id) -> bool:
+        organ = self._organ_of.pop(str(recipient_id), None)
+        return organ is not None and self._queues[organ].remove(str(recipient_id))
+
+    def top(self, n: int, organ: Optional[str] = None) -> List[str]:
+        """Ids of the n highest-priority recipients, optionally for one organ."""
+        if organ is not None:
+            queue = self._queues.get(organ_key(organ))
+            return best_first([queue], n) if queue is not None else []
+        return best_first(self._queues.values(), n)
+
+    def organs(self) -> Dict[str, int]:
+        """Waiting recipients per organ."""
+        return {organ: len(queue) for organ, queue in self._queues.items() if len(queue)}
@@ -0,0 +1,79 @@
+"""
+Seeding throughput: one document write per record (as appp.py does) vs the bulk importer.
+
+Both run against the in-memory datastore with a simulated round-trip latency. The
+one-at-a-time rate is measured on a sample and scaled; the bulk importer streams
+the whole generated JSONL file.
+
+    cd backend
+    python -m benchmarks.bulk_import --count 200000 --latency-ms 20
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import synthetic_donor  # noqa: E402
+
+
+def run(count: int, latency_ms: float, batch_size: int = 500, concurrency: int = 8,
+        sample: int = 200, seed: int = 0):
+    from app.core.memory_store import MemoryFirestore
+    from app.services.bulk_import import BulkImporter
+
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "donors.jsonl")
+        with open(path, "w") as f:
+            for i in range(count):
+                f.write(json.dumps({"id": f"d{i:09d}", **synthetic_donor(rng)}) + "\n")
+
+        store = MemoryFirestore(latency=latency_ms / 1000.0)
+        start = time.perf_counter()
+        with open(path) as f:
+            for _, line in zip(range(min(sample, count)), f):
+                record = json.loads(line)
+                store.collection("donors").document(record["id"]).set(record)
+        single_rate = min(sample, count) / (time.perf_counter() - start)
+
+        store = MemoryFirestore(latency=latency_ms / 1000.0)
+        stats = BulkImporter(store, "donors", batch_size=batch_size, concurrency=concurrency,
+                             progress_seconds=float("inf")).run(path)
+        assert stats.written == count
+    finally:
+        shutil.rmtree(directory)
+
+    return {
+        "count": count,
+        "single_rows_per_s": single_rate,
+        "single_est_s": count / single_rate,
+        "bulk_rows_per_s": stats.rows_per_second,
+        "bulk_s": stats.elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    row = run(args.count, args.latency_ms, args.batch_size, args.concurrency, seed=args.seed)
+    print(f"donors:                  {row['count']}")
+    print(f"one write per record:    {row['single_rows_per_s']:,.0f} rows/s (est. {row['single_est_s']:.0f}s)")
+    print(f"bulk import:             {row['bulk_rows_per_s']:,.0f} rows/s ({row['bulk_s']:.1f}s)")
+    return row
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Donor pool cold start: normalizing every Firestore document vs loading the columnar snapshot.
+
+The full-scan cost is measured on a sample of documents (normalization dominates,
+not the transfer) and scaled to the pool size; the snapshot side writes and loads
+the whole pool.
+
+    cd backend
+    python -m benchmarks.cold_start --count 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import synthetic_donor  # noqa: E402
+
+
+def run(count: int, scan_sample: int = 2000, seed: int = 0):
+    from app.models.profiles import Donor
+    from app.services.profile_service import profile_service
+    from app.services.snapshot import load_donor_snapshot, write_donor_snapshot
+
+    rng = random.Random(seed)
+    documents = [synthetic_donor(rng) for _ in range(min(scan_sample, count))]
+
+    start = time.perf_counter()
+    sample = [profile_service.normalize_donor(f"d{i:019d}", doc) for i, doc in enumerate(documents)]
+    scan_per_doc = (time.perf_counter() - start) / len(sample)
+
+    # Fill the pool by cloning the normalized sample under fresh ids
+    pool = [
+        Donor.restore(f"d{i:019d}", d.age, d.blood, d.location_code, d.organs, d.hla, d._markers)
+        for i, d in ((i, sample[i % len(sample)]) for i in range(count))
+    ]
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        write_donor_snapshot(directory, pool)
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot = load_donor_snapshot(directory)
+        map_s = time.perf_counter() - start
+        donors = snapshot.donors()
+        load_s = time.perf_counter() - start
+        assert len(donors) == count
+    finally:
+        shutil.rmtree(directory)
+
+    return {
+        "count": count,
+        "full_scan_s": scan_per_doc * count,
+        "snapshot_write_s": write_s,
+        "snapshot_map_s": map_s,
+        "snapshot_load_s": load_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--scan-sample", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    row = run(args.count, args.scan_sample, args.seed)
+    print(f"donors:                     {row['count']}")
+    print(f"full scan + normalize (est): {row['full_scan_s']:.2f}s")
+    print(f"snapshot write:              {row['snapshot_write_s']:.2f}s")
+    print(f"snapshot mmap:               {row['snapshot_map_s'] * 1000:.1f}ms")
+    print(f"snapshot load to records:    {row['snapshot_load_s']:.2f}s")
+    return row
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Success-model inference latency: sklearn's predict_proba vs the compiled flat forest.
+
+For each candidate-set size it times the previous per-candidate calls (one sklearn
+predict_proba on a one-row DataFrame per donor), one batched sklearn call, and one
+predict_batch over the compiled forest.
+
+    cd backend
+    python -m benchmarks.forest_inference --sizes 1,10,50,200,1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(sizes, repeat: int = 20):
+    import numpy as np
+    import pandas as pd
+    from app.core.config import settings
+    from app.services.ml_model import SuccessModel
+
+    with open(settings.DATA_FILE) as f:
+        profiles = json.load(f)
+    model = SuccessModel()
+    model.train(profiles)
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for n in sizes:
+        ages = rng.integers(18, 80, n).tolist()
+        per_call = _best(lambda: [
+            model.model.predict_proba(pd.DataFrame([{"age": a, "urgency_score": 7}]))[0][1] for a in ages
+        ], max(1, repeat // max(1, n // 10)))
+        batched = _best(lambda: model.model.predict_proba(pd.DataFrame({"age": ages, "urgency_score": 7}))[:, 1],
+                        repeat)
+        compiled = _best(lambda: model.predict_batch(ages, 7), repeat)
+        rows.append({"n": n, "sklearn_per_call_ms": per_call * 1000, "sklearn_batch_ms": batched * 1000,
+                     "compiled_ms": compiled * 1000})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,50,200,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rows = run([int(s) for s in args.sizes.split(",")], args.repeat)
+    print(f"{'candidates':>10} {'sklearn/call':>14} {'sklearn batch':>14} {'compiled':>10}")
+    for row in rows:
+        print(f"{row['n']:>10} {row['sklearn_per_call_ms']:>12.2f}ms {row['sklearn_batch_ms']:>12.2f}ms "
+              f"{row['compiled_ms']:>8.2f}ms")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
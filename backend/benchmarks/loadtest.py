@@ -0,0 +1,276 @@
+"""
+Open-loop load generator for the matching API.
+
+Runs the FastAPI app in-process against the in-memory Firestore stand-in (or against a
+live server with --url) and reports throughput, latency percentiles and error rates per
+endpoint. Arrivals follow a Poisson process at --rate regardless of how fast responses
+come back, and latency is measured from each request's scheduled start, so queueing
+delay at saturation shows up in the numbers instead of being hidden.
+
+    cd backend
+    python -m benchmarks.loadtest --rate 200 --duration 30 --donors 5000 --recipients 2000 \\
+        --latency-ms 5 --mix match=40,global=20,allocations=20,waitlist=5,inventory=5,register=5,analytics=5
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BLOOD_GROUPS = ["O+", "A+", "B+", "AB+", "O-", "A-", "B-", "AB-"]
+BLOOD_WEIGHTS = [37.4, 35.7, 8.5, 3.4, 6.6, 6.3, 1.5, 0.6]
+LOCATIONS = ["USA-California", "USA-New York", "Europe-UK", "Asia-India", "Africa-South Africa"]
+ORGANS = ["Kidney", "Liver", "Heart", "Lungs"]
+URGENCY = ["Stable", "Moderate", "Urgent (Hospitalized)", "Critical (ICU)"]
+
+ENDPOINTS = ["match", "global", "allocations", "waitlist", "inventory", "register", "analytics"]
+DEFAULT_MIX = "match=40,global=20,allocations=20,waitlist=5,inventory=5,register=5,analytics=5"
+
+
+def _hla(rng: random.Random) -> str:
+    return " ".join(f"{locus}{rng.randint(1, 30)}" for locus in ("A", "A", "B", "B", "DR", "DR"))
+
+
+def synthetic_donor(rng: random.Random) -> Dict:
+    return {
+        "bloodGroup": rng.choices(BLOOD_GROUPS, BLOOD_WEIGHTS)[0],
+        "dob": f"{rng.randint(1950, 2004)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "hospitalLocation": rng.choice(LOCATIONS),
+        "hlaTissueTyping": _hla(rng),
+        "organsWillingToDonate": [rng.choice(ORGANS).lower()],
+        "donorType": rng.choice(["living", "deceased"]),
+        "status": "active",
+    }
+
+
+def synthetic_recipient(rng: random.Random, n: int) -> Dict:
+    return {
+        "fullName": f"Recipient_{n}",
+        "bloodGroup": rng.choices(BLOOD_GROUPS, BLOOD_WEIGHTS)[0],
+        "dob": f"{rng.randint(1950, 2010)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "hospitalLocation": rng.choice(LOCATIONS),
+        "hlaResults": _hla(rng),
+        "organRequired": rng.choice(ORGANS),
+        "urgencyStatus": rng.choice(URGENCY),
+        "status": "active",
+    }
+
+
+def seed_store(db, donors: int, recipients: int, seed: int) -> List[str]:
+    """Fills the in-memory store directly and returns the recipient ids (numeric, as /match/{id} expects)."""
+    rng = random.Random(seed)
+    batch = db.batch()
+    for i in range(donors):
+        batch.set(db.collection("donors").document(f"{500000 + i}"), synthetic_donor(rng))
+    recipient_ids = [f"{100000 + i}" for i in range(recipients)]
+    for i, recipient_id in enumerate(recipient_ids):
+        batch.set(db.collection("recipients").document(recipient_id), synthetic_recipient(rng, i))
+    # One commit, and without the simulated latency, so seeding stays fast
+    latency, db.latency = db.latency, 0.0
+    batch.commit()
+    db.latency = latency
+    return recipient_ids
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _request_for(kind: str, rng: random.Random, recipient_ids: List[str]):
+    recipient_id = rng.choice(recipient_ids) if recipient_ids else "0"
+    if kind == "match":
+        return "GET", f"/match/{recipient_id}", None
+    if kind == "global":
+        return "POST", "/match", {"recipient_id": recipient_id}
+    if kind == "allocations":
+        return "GET", "/match/allocations", None
+    if kind == "waitlist":
+        return "GET", "/registry/waitlist", None
+    if kind == "inventory":
+        return "GET", "/registry/inventory", None
+    if kind == "register":
+        return "POST", "/registry/donor", synthetic_donor(rng)
+    if kind == "analytics":
+        return "GET", "/analytics/dashboard", None
+    raise ValueError(kind)
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, kind: str, latency: float, status: Optional[int]):
+        self.latencies[kind].append(latency)
+        if status is None or status >= 400:
+            self.errors[kind] += 1
+        self.statuses[kind][status or 0] += 1
+
+    def summary(self) -> Dict[str, Dict]:
+        elapsed = max(self.finished - self.started, 1e-9)
+        rows = {}
+        for kind in sorted(self.latencies):
+            lat = sorted(self.latencies[kind])
+            rows[kind] = {
+                "requests": len(lat),
+                "throughput_rps": len(lat) / elapsed,
+                "error_rate": self.errors[kind] / len(lat),
+                "p50_ms": percentile(lat, 50) * 1000,
+                "p95_ms": percentile(lat, 95) * 1000,
+                "p99_ms": percentile(lat, 99) * 1000,
+                "max_ms": lat[-1] * 1000,
+                "statuses": dict(self.statuses[kind]),
+            }
+        everything = sorted(l for lat in self.latencies.values() for l in lat)
+        if everything:
+            rows["TOTAL"] = {
+                "requests": len(everything),
+                "throughput_rps": len(everything) / elapsed,
+                "error_rate": sum(self.errors.values()) / len(everything),
+                "p50_ms": percentile(everything, 50) * 1000,
+                "p95_ms": percentile(everything, 95) * 1000,
+                "p99_ms": percentile(everything, 99) * 1000,
+                "max_ms": everything[-1] * 1000,
+                "statuses": {},
+            }
+        return rows
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_load(client, rate: float, duration: float, mix: Dict[str, float], recipient_ids: List[str],
+                   seed: int = 0, max_in_flight: int = 10000, timeout: float = 30.0) -> Results:
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    results = Results()
+    in_flight = set()
+    loop = asyncio.get_running_loop()
+
+    async def fire(kind, scheduled, method, path, body):
+        try:
+            response = await asyncio.wait_for(client.request(method, path, json=body), timeout)
+            status = response.status_code
+        except Exception:
+            status = None
+        results.record(kind, loop.time() - scheduled, status)
+
+    results.started = time.perf_counter()
+    start = loop.time()
+    next_at = start
+    while next_at - start < duration:
+        next_at += rng.expovariate(rate)
+        delay = next_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        if len(in_flight) >= max_in_flight:
+            # The system is hopelessly behind; count the arrival as a client-side drop
+            results.record(kind, 0.0, None)
+            continue
+        method, path, body = _request_for(kind, rng, recipient_ids)
+        task = asyncio.ensure_future(fire(kind, next_at, method, path, body))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    results.finished = time.perf_counter()
+    return results
+
+
+def print_report(rows: Dict[str, Dict]):
+    header = f"{'endpoint':<12} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'maxms':>9}"
+    print(header)
+    print("-" * len(header))
+    for kind, row in rows.items():
+        print(f"{kind:<12} {row['requests']:>7} {row['throughput_rps']:>8.1f} {row['error_rate'] * 100:>6.2f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+
+
+def build_in_process_client(args):
+    # Must be set before the app (and its settings) are imported
+    os.environ["DATASTORE"] = "memory"
+    os.environ.setdefault("WATCH_REGISTRY", "false")
+    import httpx
+    from app.main import app
+    from app.core.firebase import db
+    from app.core.security import get_current_user
+    from app.services.privacy import privacy_accountant
+
+    # Each run starts with fresh budgets and never writes the repo's ledger. The budget is
+    # set explicitly: spent budgets would turn requests into cheap empty answers
+    privacy_accountant.reset(ledger_path=None)
+    privacy_accountant.budget = args.epsilon_budget
+    app.dependency_overrides[get_current_user] = lambda: {"uid": "loadtest"}
+    jitter = args.latency_jitter_ms / 1000.0
+    base = args.latency_ms / 1000.0
+    db.latency = (lambda: max(0.0, random.gauss(base, jitter))) if jitter else base
+    db.error_rate = args.error_rate
+    recipient_ids = seed_store(db, args.donors, args.recipients, args.seed)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+    return client, recipient_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50.0, help="Arrival rate, requests/second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of arrivals")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted endpoint mix, e.g. match=3,global=1")
+    parser.add_argument("--donors", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated datastore RPC latency")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected datastore failure probability")
+    parser.add_argument("--max-in-flight", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--epsilon-budget", type=float, default=1000.0,
+                        help="Per-recipient privacy budget of the in-process app (the default is sized for production)")
+    parser.add_argument("--no-warmup", action="store_true", help="Don't prime the matcher before measuring")
+    parser.add_argument("--url", help="Drive a live server instead of the in-process app")
+    parser.add_argument("--recipient-ids", help="Comma-separated recipient ids to use with --url")
+    args = parser.parse_args(argv)
+
+    async def run():
+        if args.url:
+            import httpx
+            client = httpx.AsyncClient(base_url=args.url)
+            recipient_ids = (args.recipient_ids or "").split(",") if args.recipient_ids else []
+        else:
+            client, recipient_ids = build_in_process_client(args)
+        async with client:
+            if not args.no_warmup:
+                # The first allocations read primes the incremental matcher
+                await client.get("/match/allocations", timeout=600)
+            return await run_load(client, args.rate, args.duration, parse_mix(args.mix), recipient_ids,
+                                  seed=args.seed, max_in_flight=args.max_in_flight)
+
+    results = asyncio.run(run())
+    print_report(results.summary())
+    return results
+
+
+if __name__ == "__main__":
+    main()
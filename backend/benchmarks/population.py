@@ -0,0 +1,86 @@
+"""
+Synthetic population generation: per-record random/uuid/datetime calls (as appp2.py
+does) vs the vectorized generator, both writing JSON Lines.
+
+    cd backend
+    python -m benchmarks.population --count 500000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _legacy_donor():
+    def past_date():
+        return (datetime.utcnow() - timedelta(days=random.randint(1, 30))).strftime("%Y-%m-%d")
+
+    organ = random.choice(["lungs", "kidney", "liver", "heart"])
+    start = datetime(1960, 1, 1)
+    doc = {
+        "abhaId": str(random.randint(10000000000000, 99999999999999)),
+        "bloodGroup": random.choice(["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]),
+        "dob": (start + timedelta(days=random.randint(0, 16437))).strftime("%Y-%m-%d"),
+        "donorType": random.choice(["living", "deceased"]),
+        "email": f"user{random.randint(1000, 9999)}@example.com",
+        "fullName": f"Donor_{uuid.uuid4().hex[:6]}",
+        "gender": random.choice(["Male", "Female"]),
+        "hospitalId": f"H-{random.randint(100, 999)}",
+        "nextOfKin": random.choice(["Mother", "Father", "Brother", "Sister", "Spouse", "Aunty"]),
+        "organsWillingToDonate": [organ],
+        "phone": str(random.randint(6000000000, 9999999999)),
+        "registeredAt": datetime.utcnow().isoformat(),
+        "status": "active",
+        "submissionType": "backend-api",
+    }
+    for test in ("ct", "echo", "pftsTest", "xray"):
+        doc[f"test_{organ}_{test}"] = str(random.randint(1, 10))
+        doc[f"test_{organ}_{test}_date"] = past_date()
+    return doc
+
+
+def run(count: int, legacy_sample: int = 50000, seed: int = 0, workers: int = 1):
+    from app.services.population import write_population
+
+    directory = tempfile.mkdtemp()
+    try:
+        sample = min(legacy_sample, count)
+        start = time.perf_counter()
+        with open(os.path.join(directory, "legacy.jsonl"), "w") as f:
+            for _ in range(sample):
+                f.write(json.dumps(_legacy_donor()) + "\n")
+        legacy_rate = sample / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        write_population(os.path.join(directory, "donors.jsonl"), "donors", count, seed=seed, workers=workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+    return {"count": count, "legacy_rows_per_s": legacy_rate, "vectorized_rows_per_s": count / elapsed,
+            "vectorized_s": elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    row = run(args.count, seed=args.seed, workers=args.workers)
+    print(f"donors:                 {row['count']}")
+    print(f"per-record generation:  {row['legacy_rows_per_s']:,.0f} rows/s (est. {row['count'] / row['legacy_rows_per_s']:.1f}s)")
+    print(f"vectorized generator:   {row['vectorized_rows_per_s']:,.0f} rows/s ({row['vectorized_s']:.1f}s)")
+    return row
+
+
+if __name__ == "__main__":
+    main()
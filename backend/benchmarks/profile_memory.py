@@ -0,0 +1,90 @@
+"""
+Resident memory per cached profile: plain normalized dicts vs the slotted records.
+
+Each profile is decoded from its own JSON document, the way Firestore hands every
+document fresh string objects, and only the normalized form is kept.
+
+    cd backend
+    python -m benchmarks.profile_memory --count 100000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import synthetic_donor, synthetic_recipient  # noqa: E402
+from app.services.hla import _parse_typing_str  # noqa: E402
+
+
+def dict_recipient(service, doc_id, data):
+    """The normalized dict shape profiles had before the slotted records."""
+    return service.normalize_recipient(doc_id, data).to_dict() | {
+        # Fresh per-document strings, as in the dict representation
+        "blood_type": data.get("bloodGroup", "O+"),
+        "location": data.get("hospitalLocation", "Unknown"),
+        "organ_required": data.get("organRequired", "Kidney"),
+        "hla_markers": data.get("hlaResults", "0/6"),
+    }
+
+
+def dict_donor(service, doc_id, data):
+    return service.normalize_donor(doc_id, data).to_dict() | {
+        "blood_type": data.get("bloodGroup", "O+"),
+        "location": data.get("hospitalLocation", "Unknown"),
+        "organs_available": data.get("organsWillingToDonate", []),
+        "hla_markers": data.get("hlaTissueTyping", "0/6"),
+    }
+
+
+def bytes_per_profile(build, documents) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(f"doc{i:017d}", json.loads(raw)) for i, raw in enumerate(documents)]
+    # The HLA parse cache is bounded; count only what the profiles themselves hold
+    _parse_typing_str.cache_clear()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / max(len(kept), 1)
+
+
+def run(count: int, seed: int = 0):
+    from app.services.profile_service import profile_service
+
+    rng = random.Random(seed)
+    recipients = [json.dumps(synthetic_recipient(rng, i)) for i in range(count)]
+    donors = [json.dumps(synthetic_donor(rng)) for _ in range(count)]
+    # Warm the category tables so both sides start from the same state
+    bytes_per_profile(profile_service.normalize_recipient, recipients[:100])
+    bytes_per_profile(profile_service.normalize_donor, donors[:100])
+
+    rows = {}
+    for kind, docs, as_dict, compact in (
+        ("recipient", recipients, dict_recipient, profile_service.normalize_recipient),
+        ("donor", donors, dict_donor, profile_service.normalize_donor),
+    ):
+        before = bytes_per_profile(lambda i, d: as_dict(profile_service, i, d), docs)
+        after = bytes_per_profile(compact, docs)
+        rows[kind] = {"dict_bytes": before, "compact_bytes": after, "ratio": before / after}
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = run(args.count, args.seed)
+    print(f"{'profile':<10} {'dict B':>9} {'compact B':>10} {'ratio':>7}")
+    for kind, row in rows.items():
+        print(f"{kind:<10} {row['dict_bytes']:>9.0f} {row['compact_bytes']:>10.0f} {row['ratio']:>6.1f}x")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
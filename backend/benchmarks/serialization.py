@@ -0,0 +1,92 @@
+"""
+Response serialization cost: pydantic models through FastAPI's default path vs plain
+dicts through the orjson-backed FastJSONResponse.
+
+The "model" path is what a route returning MatchResponse objects paid: building the
+models, re-validating them against response_model, jsonable_encoder, then json.dumps.
+
+    cd backend
+    python -m benchmarks.serialization --sizes 10 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.responses import FastJSONResponse, orjson  # noqa: E402
+from app.models.schemas import MatchResponse, MatchResult  # noqa: E402
+
+
+def match_rows(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        compat = rng.random()
+        rows.append({
+            "donor_id": f"donor-{i:06d}",
+            "score": round(compat * 100, 1),
+            "blood_type": rng.choice(["O-", "O+", "A+", "B+", "AB+"]),
+            "donor_organs": ["Kidney", "Liver"],
+            "location": rng.choice(["New York", "Chicago", "Houston"]),
+            "match_reason": f"Combined Score {compat:.2f} (Blood/HLA/Loc)",
+            "privacy_note": "DP Applied: Age ±1, Score ±0.02",
+            "raw_score": compat,
+            "distance_km": round(rng.uniform(0, 4000), 1),
+            "score_breakdown": {"blood": 1.0, "hla": rng.random(), "proximity": rng.random(), "urgency": 0.5},
+            "success_probability": round(rng.random() * 100, 1),
+        })
+    return rows
+
+
+def model_path(recipient, rows) -> bytes:
+    response = MatchResponse(recipient=recipient, matches=[MatchResult(**row) for row in rows])
+    validated = MatchResponse.model_validate(response, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def dict_path(recipient, rows) -> bytes:
+    return FastJSONResponse({"recipient": recipient, "matches": rows}).body
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat: int = 5):
+    recipient = {"id": "recipient-1", "blood_type": "O+", "urgency": 7}
+    results = {}
+    for size in sizes:
+        rows = match_rows(size)
+        model_s = best_of(lambda: model_path(recipient, rows), repeat)
+        dict_s = best_of(lambda: dict_path(recipient, rows), repeat)
+        results[size] = {"model_ms": model_s * 1000, "dict_ms": dict_s * 1000, "speedup": model_s / dict_s}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    results = run(args.sizes, args.repeat)
+    print(f"{'matches':>8} {'model ms':>10} {'dict ms':>9} {'speedup':>8}")
+    for size, row in results.items():
+        print(f"{size:>8} {row['model_ms']:>10.2f} {row['dict_ms']:>9.2f} {row['speedup']:>7.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# The test suite runs against the in-process datastore, never the real Firestore project
+os.environ.setdefault("DATASTORE", "memory")
+os.environ.setdefault("WATCH_REGISTRY", "false")
+# Epsilon spent by one run must not carry over into the next through the repo's ledger
+os.environ.setdefault("PRIVACY_LEDGER_FILE", os.path.join(tempfile.mkdtemp(prefix="privacy-ledger-"), "ledger.json"))
@@ -0,0 +1,82 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.firebase import db
+from app.services.events import event_log
+
+client = TestClient(app)
+
+def accepted_for(request_id):
+    return [doc for doc in db.collection("requests_accepted").stream()
+            if doc.to_dict().get("original_request_id") == request_id]
+
+def test_single_round_trip_and_replay():
+    print("Testing transactional, idempotent accepts...")
+    db.collection("requests").document("acc-r1").set({"status": "pending", "donor_id": "d1"})
+    db.collection("matches").document("REQ-ACC1").set({"status": "Match Found", "patient_id": "p1"})
+    events = event_log.head
+
+    before = db.rpc_count
+    res = client.post("/match/accept", json={"request_id": "acc-r1", "request_data": {"id": "acc-r1", "donor_id": "d1"}})
+    assert res.status_code == 200, res.text
+    assert db.rpc_count - before == 1, f"Accept should be one round trip, took {db.rpc_count - before}"
+    body = res.json()
+    assert body["success"] and not body["replayed"]
+    assert db.collection("requests").document("acc-r1").get().to_dict()["status"] == "accepted"
+    accepted = db.collection("requests_accepted").document(body["id"]).get().to_dict()
+    assert accepted["original_collection"] == "requests" and "id" not in accepted
+
+    # A retried call is a no-op that returns the original acceptance
+    retry = client.post("/match/accept", json={"request_id": "acc-r1", "request_data": {"donor_id": "d1"}})
+    assert retry.status_code == 200 and retry.json()["replayed"] and retry.json()["id"] == body["id"]
+    assert len(accepted_for("acc-r1")) == 1
+    assert event_log.head == events + 1, "Replays must not publish again"
+
+    # Allocations are routed by id, and explicit keys come from the body or the header
+    res = client.post("/match/accept", json={"request_id": "REQ-ACC1", "request_data": {}},
+                      headers={"Idempotency-Key": "coord-42"})
+    assert res.status_code == 200 and res.json()["id"] == "coord-42", res.text
+    assert db.collection("matches").document("REQ-ACC1").get().to_dict()["status"] == "accepted"
+    assert client.post("/match/accept", json={"request_id": "REQ-NONE", "request_data": {}}).status_code == 404
+    assert client.post("/match/accept", json={"request_id": "acc-missing", "request_data": {}}).status_code == 404
+    assert not accepted_for("REQ-NONE") and not accepted_for("acc-missing"), "Failed accepts must not write"
+    print("Single accept tests passed.")
+
+def test_bulk_accept():
+    print("Testing bulk accepts...")
+    for i in range(600):
+        db.collection("requests").document(f"bulk-{i}").set({"status": "pending"})
+    items = [{"request_id": f"bulk-{i}", "request_data": {"n": i}} for i in range(600)]
+
+    before = db.rpc_count
+    res = client.post("/match/accept/bulk", json={"acceptances": items})
+    assert res.status_code == 200, res.text
+    assert res.json()["counts"] == {"accepted": 600}
+    assert db.rpc_count - before == 3, f"600 accepts should take 3 batches, took {db.rpc_count - before}"
+
+    # A chunk with a replayed and a missing item falls back to per-item results
+    db.collection("requests").document("bulk-new").set({"status": "pending"})
+    mixed = [{"request_id": "bulk-0", "request_data": {}}, {"request_id": "bulk-new", "request_data": {}},
+             {"request_id": "bulk-missing", "request_data": {}}]
+    body = client.post("/match/accept/bulk", json={"acceptances": mixed}).json()
+    assert [r["status"] for r in body["results"]] == ["already_accepted", "accepted", "not_found"], body
+    assert body["success"] and len(accepted_for("bulk-0")) == 1
+
+    too_many = [{"request_id": f"x{i}", "request_data": {}} for i in range(1001)]
+    assert client.post("/match/accept/bulk", json={"acceptances": too_many}).status_code == 413
+    print("Bulk accept tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_single_round_trip_and_replay()
+        test_bulk_accept()
+        print("\nALL ACCEPT TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
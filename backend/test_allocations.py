@@ -0,0 +1,100 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.firebase import db
+from app.services.allocations import AllocationScheduler
+from app.services.incremental import incremental_matcher
+from app.services.profile_service import profile_service
+
+def seed():
+    data = {"fullName": "Scheduler Test", "bloodGroup": "O+", "hospitalLocation": "Europe-UK",
+            "organRequired": "Kidney", "urgencyStatus": "Critical (ICU)"}
+    db.collection("recipients").document("9001").set(data)
+    incremental_matcher.ensure_primed()
+    incremental_matcher.on_recipient_added(profile_service.normalize_recipient("9001", data))
+
+def add_donor(i):
+    incremental_matcher.on_donor_added(profile_service.normalize_donor(f"sched-{i}", {
+        "bloodGroup": "O+", "hospitalLocation": "Europe-UK", "organsWillingToDonate": ["kidney"],
+        "hlaTissueTyping": f"{i % 7}/6"}))
+
+def test_reads_do_not_recompute():
+    print("Testing that reads serve the latest round...")
+    seed()
+    scheduler = AllocationScheduler(interval=60, debounce=0.05)
+    first = scheduler.current()
+    rpcs = db.rpc_count
+    assert scheduler.current() is first, "A read with no pool change must not start a round"
+    assert db.rpc_count == rpcs, "A read must not touch the datastore"
+    assert any(row["id"] == "REQ-9001" for row in first.allocations)
+
+    # Same outcome again: the round runs but nothing is rewritten
+    again = scheduler.run_round(force=True)
+    assert again.round == first.round + 1
+    assert db.rpc_count == rpcs, "Unchanged allocations should not be persisted again"
+    print("Read path tests passed.")
+
+def test_changes_are_debounced():
+    print("Testing debounced rounds after pool changes...")
+    seed()
+    scheduler = AllocationScheduler(interval=60, debounce=0.1)
+    base = scheduler.current().round
+    scheduler.start()
+    try:
+        for i in range(6):
+            add_donor(i)
+            time.sleep(0.01)
+        deadline = time.time() + 3
+        while (scheduler.latest.pool_version != incremental_matcher.version) and time.time() < deadline:
+            time.sleep(0.02)
+        latest = scheduler.latest
+        assert latest.pool_version == incremental_matcher.version, "Scheduler never caught up with the pool"
+        assert latest.round == base + 1, f"A burst of changes should give one round, got {latest.round - base}"
+    finally:
+        scheduler.stop()
+    assert not scheduler.running
+    print("Debounce tests passed.")
+
+def test_one_write_per_round():
+    print("Testing a single batched read and write per round...")
+    seed()
+    scheduler = AllocationScheduler(interval=60, debounce=0.05, size=3)
+    scheduler.current()
+    for i in range(100, 103):
+        data = {"fullName": f"Batch {i}", "bloodGroup": "A+", "organRequired": "Liver", "urgencyStatus": "Critical (ICU)"}
+        incremental_matcher.on_recipient_added(profile_service.normalize_recipient(f"{i}0", data))
+    rpcs = db.rpc_count
+    scheduler.current()
+    assert db.rpc_count - rpcs == 2, f"Expected one status read and one batch commit, saw {db.rpc_count - rpcs} RPCs"
+    print("Batch write tests passed.")
+
+def test_decided_allocations_are_kept():
+    print("Testing that rounds don't overwrite accepted allocations...")
+    seed()
+    scheduler = AllocationScheduler(interval=60, debounce=0.05, size=1)
+    record = scheduler.current().allocations[0]
+    doc = db.collection("matches").document(record["id"])
+    doc.update({"status": "accepted", "accepted_at": "2026-01-01T00:00:00"})
+
+    add_donor(900)
+    scheduler.run_round(force=True)
+    scheduler._persisted.clear()
+    assert scheduler.save([{**doc.get().to_dict(), "status": "Waiting"}]) == 0, "Accepted allocations aren't re-announced"
+    stored = doc.get().to_dict()
+    assert stored["status"] == "accepted" and stored["accepted_at"] == "2026-01-01T00:00:00"
+    print("Decided allocation tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_reads_do_not_recompute()
+        test_changes_are_debounced()
+        test_one_write_per_round()
+        test_decided_allocations_are_kept()
+        print("\nALL ALLOCATION SCHEDULER TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
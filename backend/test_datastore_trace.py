@@ -0,0 +1,95 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.datastore_trace import DatastoreTraceMiddleware, TracedClient, document_size, route_summary
+from app.core.memory_store import MemoryFirestore
+from app.core.metrics import metrics
+
+store = MemoryFirestore()
+traced = TracedClient(store)
+toy = FastAPI()
+toy.add_middleware(DatastoreTraceMiddleware)
+
+@toy.get("/loop/{n}")
+def loop(n: int):
+    # One get per donor: the N+1 shape the tracer should flag
+    return [traced.collection("donors").document(f"d{i}").get().exists for i in range(n)]
+
+@toy.get("/many/{n}")
+def many(n: int):
+    refs = [traced.collection("donors").document(f"d{i}") for i in range(n)]
+    return [snapshot.exists for snapshot in traced.get_all(refs)]
+
+@toy.get("/scan")
+def scan():
+    batch = traced.batch()
+    batch.set(traced.collection("audit").document("a1"), {"rows": 1})
+    batch.set(traced.collection("audit").document("a2"), {"rows": 2})
+    batch.commit()
+    return len(list(traced.collection("donors").where("age", ">=", 0).stream()))
+
+def test_request_accounting():
+    print("Testing per-request datastore accounting...")
+    for i in range(10):
+        store.collection("donors").document(f"d{i}").set({"age": 30 + i, "name": "x" * i})
+    client = TestClient(toy)
+
+    res = client.get("/scan", headers={"X-Debug-Datastore": "1"})
+    stats = dict(part.split("=") for part in res.headers["x-datastore-stats"].split("; "))
+    assert res.json() == 10
+    assert stats["reads"] == "1" and stats["writes"] == "1" and stats["docs_read"] == "10", stats
+    assert stats["docs_written"] == "2" and "n_plus_one" not in stats
+    expected = sum(32 + 3 + document_size({"age": 30 + i, "name": "x" * i}) for i in range(10))
+    assert int(stats["bytes_read"]) == expected, (stats, expected)
+    assert "x-datastore-stats" not in client.get("/scan").headers, "The header is opt-in"
+
+    res = client.get("/loop/8", headers={"X-Debug-Datastore": "1"})
+    assert "n_plus_one=donors.getx8" in res.headers["x-datastore-stats"], res.headers
+    client.get("/loop/2")
+
+    loop_row = next(r for r in route_summary() if r["route"] == "/loop/{n}")
+    assert loop_row["requests"] == 2 and loop_row["reads"] == 10 and loop_row["n_plus_one"] == {"donors.get": 8}
+
+    # The same lookups as one batched read
+    res = client.get("/many/12", headers={"X-Debug-Datastore": "1"})
+    stats = dict(part.split("=") for part in res.headers["x-datastore-stats"].split("; "))
+    assert res.json() == [True] * 10 + [False] * 2
+    assert stats["reads"] == "1" and stats["docs_read"] == "10" and "n_plus_one" not in stats, stats
+    rendered = metrics.render()
+    assert 'organ_datastore_n_plus_one_total{collection="donors",op="get",route="/loop/{n}"} 1.0' in rendered
+    assert 'organ_datastore_documents_total{collection="donors",op="stream",route="/scan"} 20.0' in rendered
+    print("Request accounting tests passed.")
+
+def test_passthrough():
+    print("Testing the traced client is a drop-in wrapper...")
+    from app.core.firebase import db
+    from app.main import app
+
+    assert isinstance(db, TracedClient)
+    before = db.rpc_count
+    db.latency, latency = 0.0, db.latency
+    db.latency = latency
+    db.collection("requests").document("dt-1").set({"status": "pending"})
+    assert db.rpc_count == before + 1
+
+    res = TestClient(app).post("/match/accept", json={"request_id": "dt-1", "request_data": {}},
+                               headers={"X-Debug-Datastore": "1"})
+    assert res.status_code == 200, res.text
+    assert "writes=1; docs_read=0; docs_written=2" in res.headers["x-datastore-stats"], res.headers
+    assert any(r["route"] == "/accept" for r in TestClient(app).get("/metrics/datastore").json())
+    print("Passthrough tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_request_accounting()
+        test_passthrough()
+        print("\nALL DATASTORE TRACE TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,106 @@
+import sys
+import os
+import asyncio
+import threading
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.events import EventLog
+
+async def take(stream, n, timeout=2.0):
+    out = []
+    while len(out) < n:
+        event = await asyncio.wait_for(stream.__anext__(), timeout)
+        if event is not None:
+            out.append(event)
+    return out
+
+def test_resume_from_offset():
+    print("Testing resume-from-offset...")
+    log = EventLog(capacity=10)
+    for i in range(5):
+        log.publish("allocation", {"n": i})
+
+    async def run():
+        stream = log.stream(after=2)
+        events = await take(stream, 3)
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(run())
+    assert [e.offset for e in events] == [3, 4, 5], f"Expected offsets 3-5, got {[e.offset for e in events]}"
+    assert log.subscribers == 0, "Closed streams must unregister"
+    print("Resume tests passed.")
+
+def test_publish_from_worker_thread():
+    print("Testing cross-thread wakeup...")
+    log = EventLog(capacity=10)
+
+    async def run():
+        stream = log.stream(after=log.head)
+        pending = asyncio.ensure_future(take(stream, 2))
+        await asyncio.sleep(0.05)
+        # Sync route handlers publish from the threadpool
+        threading.Thread(target=lambda: [log.publish("match_request", {"n": i}) for i in range(2)]).start()
+        events = await pending
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(run())
+    assert [e.type for e in events] == ["match_request", "match_request"]
+    print("Wakeup tests passed.")
+
+def test_slow_client_gets_reset():
+    print("Testing lagging subscriber reset...")
+    log = EventLog(capacity=3)
+    for i in range(10):
+        log.publish("allocation", {"n": i})
+
+    async def run():
+        stream = log.stream(after=1)
+        events = await take(stream, 1)
+        await stream.aclose()
+        return events
+
+    (reset,) = asyncio.run(run())
+    assert reset.type == "reset" and reset.data["offset"] == 10, "Evicted offsets should produce a reset to head"
+    print("Reset tests passed.")
+
+def test_shared_between_workers():
+    print("Testing events shared between workers...")
+    path = os.path.join(tempfile.mkdtemp(), "events.sqlite")
+    owner, follower = EventLog(capacity=3), EventLog(capacity=3)
+    owner.share(path, poll=0)
+    follower.share(path, poll=0)
+    owner.publish("allocation", {"n": 1})
+    follower.publish("match_request", {"n": 2})
+    assert follower.pull() == 0, "A worker should see its own event without polling"
+    assert owner.pull() == 1, "The other worker's event should be relayed on the next poll"
+    for log in (owner, follower):
+        events, evicted = log.read(after=0)
+        assert [(e.offset, e.type) for e in events] == [(1, "allocation"), (2, "match_request")], \
+            f"Both workers should see the same offsets, got {[(e.offset, e.type) for e in events]}"
+        assert not evicted
+
+    # A worker that falls behind the shared capacity starts over instead of leaving a gap
+    for i in range(5):
+        owner.publish("allocation", {"n": i})
+    follower.pull()
+    assert follower.read(after=2) == ([], True), "Trimmed offsets should produce a reset"
+    events, evicted = follower.read(after=4)
+    assert [e.offset for e in events] == [5, 6, 7], f"Expected the retained rows, got {[e.offset for e in events]}"
+    owner.stop()
+    follower.stop()
+    print("Shared event tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_resume_from_offset()
+        test_publish_from_worker_thread()
+        test_slow_client_gets_reset()
+        test_shared_between_workers()
+        print("\nALL EVENT TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
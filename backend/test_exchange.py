@@ -0,0 +1,177 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.config import settings
+from app.models.profiles import Donor, Recipient
+from app.services.exchange import (CompatibilityGraph, PairedExchange, enumerate_cycles, pack_greedy,
+                                   pack_optimal)
+from app.services.matching import basic_compatibility_score, get_blood_compatibility
+from benchmarks.exchange import synthetic_pool
+
+def donor(did, blood, location="Europe-UK"):
+    return Donor.from_dict({"id": did, "age": 40, "blood_type": blood, "location": location,
+                            "organs_available": ["Kidney"], "hla_markers": "A2 A24 B7 B8 DR15 DR4"})
+
+def recipient(rid, blood, location="Europe-UK"):
+    return Recipient.from_dict({"id": rid, "name": rid, "age": 40, "urgency_score": 5, "blood_type": blood,
+                                "location": location, "organ_required": "Kidneys", "hla_markers": "A2 A24 B7 B8 DR15 DR4"})
+
+def best_packing(graph, cycles, max_chain):
+    """Exhaustive maximum-weight packing for tiny graphs: every cycle and every chain, tried vertex by vertex."""
+    structures = [(c.vertices, c.weight) for c in cycles]
+    def grow(u, path, weight):
+        if len(path) > 1:
+            structures.append((tuple(path), weight))
+        if len(path) <= max_chain:
+            for v, score in graph.out[u]:
+                if v not in path:
+                    grow(v, path + [v], weight + score)
+    for a in range(graph.n_pairs, graph.n_pairs + graph.n_altruists):
+        grow(a, [a], 0.0)
+
+    def best(vertex, used):
+        if vertex == graph.n_pairs + graph.n_altruists:
+            return 0.0
+        if vertex in used:
+            return best(vertex + 1, used)
+        value = best(vertex + 1, used)
+        for vertices, weight in structures:
+            if min(vertices) == vertex and used.isdisjoint(vertices):
+                value = max(value, weight + best(vertex + 1, used | set(vertices)))
+        return value
+    return best(0, frozenset())
+
+def check_feasible(result, pool, altruists):
+    donors = {str(d.id): d for _, d, _ in pool} | {str(d.id): d for d in altruists}
+    recipients = {str(r.id): r for _, _, r in pool}
+    received = [t["recipient_id"] for s in result["cycles"] + result["chains"] for t in s["transplants"]]
+    assert len(received) == len(set(received)), "A recipient got two kidneys"
+    for structure in result["cycles"] + result["chains"]:
+        for t in structure["transplants"]:
+            assert get_blood_compatibility(donors[t["donor_id"]].blood_type, recipients[t["recipient_id"]].blood_type)
+    pair_of_donor = {str(d.id): pair_id for pair_id, d, _ in pool}
+    for cycle in result["cycles"]:
+        givers = {pair_of_donor[t["donor_id"]] for t in cycle["transplants"]}
+        takers = {t["pair_id"] for t in cycle["transplants"]}
+        assert givers == takers == set(cycle["pair_ids"]), "Every pair in a cycle gives and receives"
+    for chain in result["chains"]:
+        steps = chain["transplants"]
+        assert steps[0]["donor_id"] == chain["altruistic_donor_id"]
+        for prev, nxt in zip(steps, steps[1:]):
+            assert pair_of_donor[nxt["donor_id"]] == prev["pair_id"], "A chain passes on from the pair it reached"
+
+def test_cycle_and_chain():
+    print("Testing a 2-cycle, a chain and skipped pairs...")
+    pool = [("p1", donor("x-d1", "A+"), recipient("x-r1", "B+")),
+            ("p2", donor("x-d2", "B+"), recipient("x-r2", "A+")),
+            ("p3", donor("x-d3", "AB+"), recipient("x-r3", "O+")),
+            ("p4", donor("x-d4", "O-"), recipient("x-r4", "A+"))]
+    result = PairedExchange().run(pool, [donor("x-alt", "O-")])
+    assert result["solver"] == "milp" and result["status"] == "optimal", result
+    assert [c["pair_ids"] for c in result["cycles"]] == [["p1", "p2"]]
+    assert [[t["pair_id"] for t in c["transplants"]] for c in result["chains"]] == [["p3"]]
+    assert result["transplants"] == 3
+    assert result["skipped"] == [{"pair_id": "p4", "reason": "directly compatible"}]
+    check_feasible(result, pool, [donor("x-alt", "O-")])
+
+    no_chains = PairedExchange().run(pool, [donor("x-alt", "O-")], max_chain=0)
+    assert no_chains["chains"] == [] and no_chains["transplants"] == 2
+    print("Cycle and chain tests passed.")
+
+def test_people_are_used_once():
+    print("Testing that a donor or recipient listed twice is used once...")
+    # r1 listed with two donors: only its first pair is a vertex
+    pool = [("p1", donor("u-da", "A+"), recipient("u-r1", "B+")),
+            ("p2", donor("u-db", "A+"), recipient("u-r1", "B+")),
+            ("p3", donor("u-dc", "B+"), recipient("u-r3", "A+")),
+            ("p4", donor("u-dd", "B+"), recipient("u-r4", "A+"))]
+    result = PairedExchange().run(pool, [donor("u-da", "O-"), donor("u-alt", "O-")])
+    check_feasible(result, pool, [donor("u-alt", "O-")])
+    received = [t["recipient_id"] for s in result["cycles"] + result["chains"] for t in s["transplants"]]
+    given = [t["donor_id"] for s in result["cycles"] + result["chains"] for t in s["transplants"]]
+    assert received.count("u-r1") == 1 and len(given) == len(set(given)), result
+    assert {"pair_id": "p2", "reason": "recipient already in a pair"} in result["skipped"]
+    # u-da is p1's donor, so it can't also start a chain
+    assert {"donor_id": "u-da", "reason": "donor already in a pair"} in result["skipped"]
+    assert all(c["altruistic_donor_id"] == "u-alt" for c in result["chains"])
+    print("Duplicate tests passed.")
+
+def test_optimal_on_small_pools():
+    print("Testing the MILP against exhaustive search...")
+    for seed in range(4):
+        pool, altruists = synthetic_pool(10, 2, seed=seed)
+        graph = CompatibilityGraph.build(pool, altruists, 0.0, 25)
+        donors = [d for _, d, _ in pool] + altruists
+        for u, edges in enumerate(graph.weights):
+            for v, weight in edges.items():
+                assert weight == basic_compatibility_score(pool[v][2], donors[u])[0], "Vectorized edge weights match"
+        cycles = enumerate_cycles(graph, 3)
+        chosen, status = pack_optimal(graph, cycles, 3, 10.0, chain_out_edges=100)
+        assert status == "optimal"
+        weight = sum(s.weight for s in chosen)
+        assert abs(weight - best_packing(graph, cycles, 3)) < 1e-6, seed
+        assert weight >= sum(s.weight for s in pack_greedy(graph, cycles, 3)) - 1e-9
+    print("Optimality tests passed.")
+
+def test_larger_pool_and_fallback():
+    print("Testing a larger pool within the time budget, and the greedy fallback...")
+    pool, altruists = synthetic_pool(400, 20, seed=7)
+    exchange = PairedExchange(min_edge_score=settings.EXCHANGE_MIN_EDGE_SCORE, time_budget=10.0)
+    result = exchange.run(pool, altruists)
+    assert result["solver"] == "milp" and result["transplants"] > 100, {k: result[k] for k in ("solver", "status", "transplants")}
+    check_feasible(result, pool, altruists)
+
+    greedy = exchange.run(pool, altruists, exact=False)
+    assert greedy["solver"] == "greedy" and greedy["status"] == "heuristic"
+    check_feasible(greedy, pool, altruists)
+    assert greedy["total_weight"] <= result["total_weight"]
+    print(f"  milp {result['transplants']} transplants ({result['total_weight']}), "
+          f"greedy {greedy['transplants']} ({greedy['total_weight']})")
+    print("Larger pool tests passed.")
+
+def test_exchange_endpoint():
+    print("Testing /match/exchange...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.firebase import db
+
+    for did, blood in (("kpd-d1", "A+"), ("kpd-d2", "B+")):
+        db.collection("donors").document(did).set({"bloodGroup": blood, "hospitalLocation": "Europe-UK", "dob": "1980-01-01",
+                                                   "organsWillingToDonate": ["kidney"], "donorType": "living"})
+    for rid, blood in (("kpd-r1", "B+"), ("kpd-r2", "A+")):
+        db.collection("recipients").document(rid).set({"bloodGroup": blood, "hospitalLocation": "Europe-UK", "dob": "1980-01-01",
+                                                       "organRequired": "Kidney", "urgencyStatus": "Moderate"})
+    client = TestClient(app)
+    res = client.post("/match/exchange", json={"pairs": [
+        {"pair_id": "A", "donor_id": "kpd-d1", "recipient_id": "kpd-r1"},
+        {"pair_id": "B", "donor_id": "kpd-d2", "recipient_id": "kpd-r2"},
+        {"donor_id": "kpd-d1", "recipient_id": "missing"},
+    ]})
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert [c["pair_ids"] for c in body["cycles"]] == [["A", "B"]], body
+    # Only privacy releases of the scores leave the service, never exact scores or their sums
+    from app.services.privacy import privacy_accountant
+    assert "total_weight" not in body and "weight" not in body["cycles"][0]
+    for t in body["cycles"][0]["transplants"]:
+        assert t["score"] == round(privacy_accountant._releases[(t["recipient_id"], t["donor_id"], "score")][1], 3)
+    assert body["skipped"] == [{"pair_id": "kpd-d1:missing", "reason": "profile not found"}]
+
+    too_many = [{"donor_id": "kpd-d1", "recipient_id": "kpd-r1"}] * (settings.EXCHANGE_MAX_PAIRS + 1)
+    assert client.post("/match/exchange", json={"pairs": too_many}).status_code == 413
+    print("Endpoint tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_cycle_and_chain()
+        test_people_are_used_once()
+        test_optimal_on_small_pools()
+        test_larger_pool_and_fallback()
+        test_exchange_endpoint()
+        print("\nALL EXCHANGE TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
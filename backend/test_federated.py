@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.models.profiles import Donor, Recipient
+from app.services.federated import FederatedMatcher, HospitalNode
+from app.services.matching import basic_compatibility_score
+
+LOCATIONS = ["USA-California", "USA-New York", "Europe-UK", "Asia-India"]
+
+RECIPIENT = Recipient.from_dict({"id": "fed-r", "name": "Federated", "blood_type": "AB+", "age": 45, "urgency_score": 9,
+                                 "location": "Europe-UK", "organ_required": "kidney", "hla_markers": "A2 A24 B7 B8 DR15 DR4"})
+
+def make_donors():
+    donors = []
+    for i in range(80):
+        donors.append(Donor.from_dict({
+            "id": f"fed-{i}", "blood_type": ["O-", "A+", "B-", "AB+"][i % 4], "age": 20 + i % 40,
+            "location": LOCATIONS[i % 4], "organs_available": ["Kidney"] if i % 5 else ["Heart"],
+            "hla_markers": f"A{i % 11 + 1} A24 B{i % 7 + 5} B8 DR{i % 13 + 1} DR4"}))
+    return donors
+
+def nodes_for(donors, latency=None):
+    latency = latency or {}
+    return [HospitalNode(loc, [d for d in donors if d.location == loc], latency.get(loc, 0.0)) for loc in LOCATIONS]
+
+def test_merge_matches_brute_force():
+    print("Testing that merged local top-k lists give the global top-k...")
+    donors = make_donors()
+    nodes = nodes_for(donors)
+    matcher = FederatedMatcher(local_k=5, timeout=5, nodes=lambda: nodes)
+    top, shards = matcher.match(RECIPIENT, k=5)
+
+    expected = sorted(
+        ((basic_compatibility_score(RECIPIENT, d)[0], str(d.id)) for d in donors if "Kidney" in d.organs_available),
+        reverse=True)[:5]
+    assert [(s, d) for s, d, _ in top] == expected, (top, expected)
+    assert all(s.status == "ok" for s in shards) and len(shards) == 4
+    assert all(len(s.matches) <= 5 for s in shards), "Shards only share their local top-k"
+    print("Merge tests passed.")
+
+def test_slow_and_failing_shards():
+    print("Testing per-shard deadlines and failures...")
+    donors = make_donors()
+    nodes = nodes_for(donors, latency={"Asia-India": 1.5})
+
+    class Broken(HospitalNode):
+        def top_k(self, recipient, k):
+            raise RuntimeError("hospital offline")
+    nodes[0] = Broken("USA-California", [])
+
+    matcher = FederatedMatcher(local_k=5, timeout=0.3, nodes=lambda: nodes)
+    start = time.perf_counter()
+    top, shards = matcher.match(RECIPIENT, k=3)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 1.0, f"A slow shard stalled the answer ({elapsed:.2f}s)"
+    status = {s.location: s.status for s in shards}
+    assert status == {"USA-California": "error", "USA-New York": "ok", "Europe-UK": "ok", "Asia-India": "timeout"}, status
+    assert top and all(loc in ("USA-New York", "Europe-UK") for _, _, loc in top)
+    print("Deadline tests passed.")
+
+def test_shards_run_concurrently():
+    print("Testing concurrent shard queries...")
+    nodes = nodes_for(make_donors(), latency={loc: 0.25 for loc in LOCATIONS})
+    matcher = FederatedMatcher(local_k=3, timeout=5, max_workers=4, nodes=lambda: nodes)
+    start = time.perf_counter()
+    _, shards = matcher.match(RECIPIENT, k=3)
+    elapsed = time.perf_counter() - start
+    assert all(s.status == "ok" for s in shards)
+    assert elapsed < 0.8, f"Shards appear to run serially ({elapsed:.2f}s for 4 x 0.25s)"
+    print("Concurrency tests passed.")
+
+def test_endpoint():
+    print("Testing the federated endpoint...")
+    from fastapi.testclient import TestClient
+    from app.core.firebase import db
+    from app.main import app
+    from app.services.incremental import incremental_matcher
+
+    incremental_matcher.ensure_primed()
+    for donor in make_donors():
+        incremental_matcher.on_donor_added(donor)
+    db.collection("recipients").document("fed-r").set({
+        "fullName": "Federated", "bloodGroup": "AB+", "hospitalLocation": "Europe-UK", "organRequired": "Kidney"})
+
+    res = TestClient(app).post("/match/federated", json={"recipient_id": "fed-r", "k": 4})
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert 0 < len(body["matches"]) <= 4 and body["partial"] is False
+    assert {s["location"] for s in body["shards"]} >= set(LOCATIONS)
+    assert all(set(m) == {"donor_id", "score", "location"} for m in body["matches"]), "Only scores are shared"
+    print("Endpoint tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_merge_matches_brute_force()
+        test_slow_and_failing_shards()
+        test_shards_run_concurrently()
+        test_endpoint()
+        print("\nALL FEDERATED MATCHING TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,62 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from app.core.config import settings
+from app.services.forest import FlatForest
+from app.services.ml_model import SuccessModel
+
+def test_batch_matches_sklearn():
+    print("Testing vectorized forest inference against sklearn...")
+    rng = np.random.default_rng(5)
+    X = rng.integers(0, 90, (3000, 3)).astype(float)
+    y = (X[:, 0] + rng.normal(0, 15, len(X)) > 45).astype(int) + (X[:, 1] > 70)
+    model = RandomForestClassifier(n_estimators=30, random_state=1).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+
+    thresholds = forest.threshold[forest.left >= 0]
+    for n in (1, 2, 17, 500):
+        Q = rng.uniform(-10, 100, (n, 3))
+        # Values exactly on split thresholds must go the same way as in sklearn
+        Q[: n // 2, 0] = rng.choice(thresholds, n // 2)
+        assert np.array_equal(forest.predict_proba_batch(Q), model.predict_proba(Q)), n
+    assert np.array_equal(forest.predict_proba(Q[0]), model.predict_proba(Q[:1])[0])
+    try:
+        forest.predict_proba_batch(np.zeros((2, 2)))
+        assert False, "Wrong feature count must be rejected"
+    except ValueError:
+        pass
+    print("Forest tests passed.")
+
+def test_success_model_batch():
+    print("Testing SuccessModel.predict_batch...")
+    untrained = SuccessModel()
+    assert untrained.predict_batch([30, 40], 5).tolist() == [0.5, 0.5]
+
+    with open(settings.DATA_FILE) as f:
+        profiles = json.load(f)
+    model = SuccessModel()
+    model.train(profiles)
+    ages = list(range(0, 95, 3))
+    expected = model.model.predict_proba(pd.DataFrame({"age": ages, "urgency_score": [7] * len(ages)}))[:, 1]
+    assert np.array_equal(model.predict_batch(ages, 7), expected)
+    assert model.predict_batch(ages, [7] * len(ages)).tolist() == expected.tolist()
+    assert model.predict_probability(42, 7) == model.predict_batch([42], 7)[0]
+    assert len(model.predict_batch([], 7)) == 0
+    print("SuccessModel tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_batch_matches_sklearn()
+        test_success_model_batch()
+        print("\nALL FOREST TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
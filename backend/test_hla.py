@@ -0,0 +1,74 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app.services.hla import parse_hla_typing, mismatch_counts, hla_score, hla_scores, legacy_match_fraction
+from app.services.matching import basic_compatibility_score
+
+def test_parse_typing():
+    print("Testing parse_hla_typing...")
+    serological = parse_hla_typing("A2 A24 B7 B8 DR15 DR4")
+    molecular = parse_hla_typing("HLA-A*02:01, A*24:02, B*07:02, B*08:01, DRB1*15:01, DRB1*04:01")
+    structured = parse_hla_typing({"A": ["2", "24"], "B": ["7", "8"], "DR": ["15", "4"]})
+    assert serological == molecular == structured, "Equivalent typings should encode identically"
+
+    # Legacy free text and partial typings fall back to the "X/6" path
+    assert parse_hla_typing("4/6 HLA match potential") is None
+    assert parse_hla_typing("A2 B7") is None
+    assert parse_hla_typing(None) is None
+    print("Typing parser tests passed.")
+
+def test_legacy_fraction():
+    print("Testing legacy_match_fraction...")
+    assert legacy_match_fraction("6/6") == 1.0
+    assert legacy_match_fraction("3/6 HLA match potential") == 0.5
+    assert legacy_match_fraction("5/4 HLA match potential") == 5 / 6.0
+    assert legacy_match_fraction("N/A") == 0.0, "Malformed strings should score 0, not crash"
+    print("Legacy fraction tests passed.")
+
+def test_mismatch_counts():
+    print("Testing vectorized mismatch_counts...")
+    recipient = parse_hla_typing("A2 A24 B7 B8 DR15 DR4")
+    donors = np.array([
+        parse_hla_typing("A2 A24 B7 B8 DR15 DR4"),   # identical
+        parse_hla_typing("A2 A1 B7 B44 DR15 DR4"),   # 2 mismatches
+        parse_hla_typing("A1 A3 B44 B35 DR1 DR7"),   # full mismatch
+        parse_hla_typing("A2 A2 B7 B7 DR4 DR4"),     # homozygous, all shared
+    ])
+    counts = mismatch_counts(recipient, donors)
+    assert list(counts) == [0, 2, 6, 0], f"Unexpected mismatch counts {list(counts)}"
+    print("Mismatch count tests passed.")
+
+def test_pool_scores():
+    print("Testing hla_scores against pairwise hla_score...")
+    recipient = {"hla_markers": "A2 A24 B7 B8 DR15 DR4"}
+    donors = [
+        {"hla_markers": "A2 A1 B7 B44 DR15 DR4"},
+        {"hla_markers": "4/6 HLA match potential"},
+        {"hla_markers": "garbage"},
+    ]
+    pool = hla_scores(recipient, donors)
+    pairwise = [hla_score(recipient, d) for d in donors]
+    assert np.allclose(pool, pairwise), f"Vectorized {pool} != pairwise {pairwise}"
+    assert abs(pool[0] - 4 / 6.0) < 1e-9
+
+    # basic_compatibility_score no longer raises on malformed HLA text
+    score, breakdown, _ = basic_compatibility_score(
+        {"blood_type": "A+", "urgency_score": 5, "location": "USA-New York"},
+        {"blood_type": "A+", "hla_markers": "unknown", "location": "USA-New York"},
+    )
+    assert breakdown["hla"] == 0.0
+    print("Pool score tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_parse_typing()
+        test_legacy_fraction()
+        test_mismatch_counts()
+        test_pool_scores()
+        print("\nALL HLA TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
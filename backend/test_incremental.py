@@ -0,0 +1,88 @@
+import sys
+import os
+import random
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.incremental import IncrementalMatcher
+from app.services.matching import BLOOD_GROUPS, basic_compatibility_score, get_blood_compatibility
+from app.models.profiles import Donor, Recipient
+
+LOCATIONS = ["USA-California", "USA-New York", "Europe-UK", "Asia-India"]
+ORGANS = ["Kidney", "Liver", "Heart", "Lungs"]
+
+def make_donor(i, rng):
+    return Donor.from_dict({"id": f"d{i}", "blood_type": rng.choice(BLOOD_GROUPS), "age": rng.randint(18, 70),
+                            "location": rng.choice(LOCATIONS), "hla_markers": f"{rng.randint(0, 6)}/6",
+                            "organs_available": [rng.choice(ORGANS).lower()]})
+
+def make_recipient(i, rng):
+    return Recipient.from_dict({"id": f"r{i}", "blood_type": rng.choice(BLOOD_GROUPS), "age": rng.randint(18, 70),
+                                "location": rng.choice(LOCATIONS), "hla_markers": "0/6",
+                                "urgency_score": rng.randint(1, 10), "organ_required": rng.choice(ORGANS)})
+
+def brute_force_top(recipient, donors, k):
+    scored = []
+    for donor in donors:
+        organs = [o.lower() for o in donor.organs_available]
+        if recipient.organ_required.lower() not in organs:
+            continue
+        if not get_blood_compatibility(donor.blood_type, recipient.blood_type):
+            continue
+        scored.append((basic_compatibility_score(recipient, donor)[0], donor.id))
+    return sorted(scored, reverse=True)[:k]
+
+def assert_consistent(matcher, donors, recipients):
+    for recipient in recipients:
+        expected = brute_force_top(recipient, donors, matcher.k)
+        actual = [(score, donor.id) for score, donor in matcher.top_candidates(recipient.id)]
+        assert actual == expected, f"Top-k for {recipient.id} diverged: {actual} != {expected}"
+
+def test_incremental_matches_full_rescore():
+    print("Testing incremental updates against a full rescore...")
+    rng = random.Random(7)
+    donors = [make_donor(i, rng) for i in range(60)]
+    recipients = [make_recipient(i, rng) for i in range(30)]
+
+    matcher = IncrementalMatcher(k=3)
+    matcher.prime(donors[:30], recipients[:15])
+    for donor in donors[30:]:
+        matcher.on_donor_added(donor)
+    for recipient in recipients[15:]:
+        matcher.on_recipient_added(recipient)
+    assert_consistent(matcher, donors, recipients)
+
+    # Removing donors refills only the recipients that held them
+    for donor in donors[:10]:
+        matcher.on_donor_removed(donor.id)
+    assert_consistent(matcher, donors[10:], recipients)
+    print("Incremental consistency tests passed.")
+
+def test_organ_filtering():
+    print("Testing organ-aware candidate filtering...")
+    matcher = IncrementalMatcher(k=5)
+    recipient = Recipient.from_dict({"id": "r1", "blood_type": "A+", "age": 40, "location": "USA-New York",
+                                     "hla_markers": "0/6", "urgency_score": 8, "organ_required": "Lungs"})
+    matcher.prime([], [recipient])
+    version = matcher.version
+
+    matcher.on_donor_added(Donor.from_dict({"id": "heart", "blood_type": "O-", "age": 30, "location": "USA-New York",
+                                            "hla_markers": "6/6", "organs_available": ["heart"]}))
+    matcher.on_donor_added(Donor.from_dict({"id": "lungs", "blood_type": "O-", "age": 30, "location": "USA-New York",
+                                            "hla_markers": "3/6", "organs_available": ["lungs"]}))
+    matcher.on_donor_added(Donor.from_dict({"id": "b-lungs", "blood_type": "B+", "age": 30, "location": "USA-New York",
+                                            "hla_markers": "6/6", "organs_available": ["lungs"]}))
+
+    ids = [donor.id for _, donor in matcher.top_candidates("r1")]
+    assert ids == ["lungs"], f"Only the blood-compatible lung donor should be a candidate, got {ids}"
+    assert matcher.version == version + 3, "Every change should bump the pool version"
+    print("Organ filtering tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_matches_full_rescore()
+        test_organ_filtering()
+        print("\nALL INCREMENTAL MATCHING TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
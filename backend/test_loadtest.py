@@ -0,0 +1,57 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from benchmarks.loadtest import build_in_process_client, parse_mix, percentile, run_load
+
+class Args:
+    donors = 60
+    recipients = 20
+    latency_ms = 0.5
+    latency_jitter_ms = 0.2
+    error_rate = 0.0
+    seed = 3
+    epsilon_budget = 1000.0
+
+def test_load_harness_smoke():
+    print("Running a short in-process load test...")
+    mix = parse_mix("match=3,global=1,allocations=1,waitlist=1,inventory=1,register=1,analytics=1")
+
+    async def run():
+        client, recipient_ids = build_in_process_client(Args)
+        async with client:
+            await client.get("/match/allocations")
+            return await run_load(client, rate=40, duration=1.0, mix=mix, recipient_ids=recipient_ids, seed=1)
+
+    from app.main import app
+    from app.services.privacy import privacy_accountant
+    budget = privacy_accountant.budget
+    try:
+        rows = asyncio.run(run()).summary()
+        assert privacy_accountant.budget == Args.epsilon_budget
+    finally:
+        # The harness bypasses auth and raises the privacy budget; don't leak either into other tests
+        app.dependency_overrides.clear()
+        privacy_accountant.budget = budget
+    assert rows["TOTAL"]["requests"] > 10, f"Too few requests issued: {rows['TOTAL']['requests']}"
+    assert rows["TOTAL"]["error_rate"] == 0.0, f"Unexpected errors: {rows}"
+    assert rows["TOTAL"]["p50_ms"] <= rows["TOTAL"]["p99_ms"] <= rows["TOTAL"]["max_ms"]
+    print(f"Load harness smoke test passed ({rows['TOTAL']['requests']} requests).")
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+
+if __name__ == "__main__":
+    try:
+        test_percentile()
+        test_load_harness_smoke()
+        print("\nALL LOAD HARNESS TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
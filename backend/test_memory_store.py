@@ -0,0 +1,82 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from app.core.memory_store import MemoryFirestore
+
+def test_documents_and_queries():
+    print("Testing document reads, writes and queries...")
+    db = MemoryFirestore()
+    _, ref = db.collection("donors").add({"bloodGroup": "O+", "age": 40})
+    db.collection("donors").document("d2").set({"bloodGroup": "A+", "age": 30})
+    db.collection("donors").document("d2").update({"age": 31})
+
+    assert db.collection("donors").document(ref.id).get().to_dict()["bloodGroup"] == "O+"
+    assert db.collection("donors").document("d2").get().to_dict() == {"bloodGroup": "A+", "age": 31}
+    assert not db.collection("donors").document("missing").get().exists
+
+    young = [d.id for d in db.collection("donors").where("age", "<", 35).stream()]
+    assert young == ["d2"], f"Unexpected query result {young}"
+    ordered = [d.to_dict()["age"] for d in db.collection("donors").order_by("age", direction="DESCENDING").stream()]
+    assert ordered == [40, 31]
+
+    # Snapshots are isolated from later mutation by the caller
+    snap = db.collection("donors").document("d2").get().to_dict()
+    snap["age"] = 99
+    assert db.collection("donors").document("d2").get().to_dict()["age"] == 31
+    print("Document tests passed.")
+
+def test_batch_is_atomic():
+    print("Testing atomic batches...")
+    db = MemoryFirestore()
+    db.collection("requests").document("r1").set({"status": "pending"})
+
+    batch = db.batch()
+    batch.update(db.collection("requests").document("r1"), {"status": "accepted"})
+    batch.update(db.collection("requests").document("missing"), {"status": "accepted"})
+    try:
+        batch.commit()
+        assert False, "Expected NotFound"
+    except NotFound:
+        pass
+    assert db.collection("requests").document("r1").get().to_dict()["status"] == "pending", "Failed batch must not apply"
+
+    db.collection("accepted").document("k1").create({"ok": True})
+    try:
+        db.collection("accepted").document("k1").create({"ok": True})
+        assert False, "Expected AlreadyExists"
+    except AlreadyExists:
+        pass
+    print("Batch tests passed.")
+
+def test_watch_and_latency():
+    print("Testing snapshot listeners and injected latency...")
+    db = MemoryFirestore()
+    db.collection("donors").document("d1").set({"age": 40})
+    seen = []
+    watch = db.collection("donors").on_snapshot(lambda docs, changes, ts: seen.extend(
+        (c.type.name, c.document.id) for c in changes))
+    db.collection("donors").document("d2").set({"age": 30})
+    db.collection("donors").document("d1").delete()
+    watch.unsubscribe()
+    db.collection("donors").document("d3").set({"age": 20})
+    assert seen == [("ADDED", "d1"), ("ADDED", "d2"), ("REMOVED", "d1")], f"Unexpected changes {seen}"
+
+    import time
+    db.latency = 0.02
+    start = time.perf_counter()
+    db.collection("donors").document("d2").get()
+    assert time.perf_counter() - start >= 0.02, "Every RPC should pay the injected latency"
+    print("Watch and latency tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_documents_and_queries()
+        test_batch_is_atomic()
+        test_watch_and_latency()
+        print("\nALL MEMORY STORE TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
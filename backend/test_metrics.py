@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, metrics, recent_traces, stage, traces
+
+def test_histogram_rendering():
+    print("Testing Prometheus rendering...")
+    registry = MetricsRegistry()
+    registry.observe("latency_seconds", 0.003, (("stage", "scoring"),))
+    registry.observe("latency_seconds", 0.2, (("stage", "scoring"),))
+    registry.inc("requests_total", (("status", "200"),))
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{stage="scoring",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{stage="scoring",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{stage="scoring"} 2' in text
+    assert 'requests_total{status="200"} 1.0' in text
+    print("Rendering tests passed.")
+
+def test_stage_accounting_per_route():
+    print("Testing per-route stage accounting through the middleware...")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/score/{item_id}")
+    def score(item_id: int):
+        # Sync endpoints run in the threadpool; stages must still reach the request
+        for _ in range(3):
+            with stage("unit_test_stage"):
+                pass
+        return {"id": item_id}
+
+    client = TestClient(app)
+    r = client.get("/score/1", headers={"X-Trace": "1"})
+    assert r.status_code == 200
+    trace_id = r.headers.get("x-trace-id")
+    assert trace_id, "Forced traces should return their id"
+
+    text = metrics.render()
+    assert 'organ_stage_duration_seconds_count{route="/score/{item_id}",stage="unit_test_stage"} 1' in text, \
+        "Stage time should be flushed once per request under the route template"
+    assert 'organ_http_requests_total{method="GET",route="/score/{item_id}",status="200"}' in text
+
+    trace = next(t for t in traces if t["trace_id"] == trace_id)
+    assert [s["stage"] for s in trace["spans"]] == ["unit_test_stage"] * 3
+    assert recent_traces(1) == [traces[-1]] and recent_traces(1)[0]["trace_id"] == trace_id, "Newest trace first"
+    print("Stage accounting tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_histogram_rendering()
+        test_stage_accounting_per_route()
+        print("\nALL METRICS TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.services.organ_index import OrganBloodIndex, organ_key
+
+def test_organ_key():
+    print("Testing organ name normalization...")
+    assert organ_key("lungs") == organ_key("Lungs") == organ_key(" LUNG ") == "lung"
+    assert organ_key("Kidney") == organ_key("kidneys") == "kidney"
+    assert organ_key("Bone  Marrow") == "bone marrow"
+    assert organ_key("Pancreas") == "pancreas", "Only known plurals are folded"
+    assert organ_key(None) == ""
+    print("Normalization tests passed.")
+
+def test_lookup_intersects_organ_and_blood():
+    print("Testing organ/blood intersection...")
+    index = OrganBloodIndex()
+    index.add("d1", ["Kidney", "Liver"], "O+")
+    index.add("d2", ["heart"], "O+")
+    index.add("d3", ["kidney"], "AB+")
+    index.add("d4", ["Lungs"], "O-")
+    index.add("d5", ["lungs"], "A+")
+
+    assert index.lookup(["kidney"], ["O+", "O-"]) == {"d1"}
+    assert index.lookup(["KIDNEY"], ["O+", "AB+"]) == {"d1", "d3"}
+    assert index.lookup(["lung"], ["O-", "A+"]) == {"d4", "d5"}, "lungs/Lungs/lung must share a posting"
+    assert index.lookup(["heart"], ["A+"]) == set()
+    assert index.lookup(["cornea"], ["O+"]) == set()
+
+    # Re-adding replaces the old postings; removal clears them
+    index.add("d2", ["Kidney"], "O+")
+    assert index.lookup(["heart"], ["O+"]) == set()
+    assert index.lookup(["kidney"], ["O+"]) == {"d1", "d2"}
+    index.remove("d1")
+    index.remove("missing")
+    assert index.lookup(["liver", "kidney"], ["O+"]) == {"d2"}
+    assert len(index) == 4
+
+    # Both intersection strategies agree
+    big = OrganBloodIndex()
+    for i in range(200):
+        big.add(f"b{i}", ["kidney"] if i % 10 else ["heart"], "O+" if i % 3 else "B-")
+    assert big.lookup(["heart"], ["O+", "B-"]) == {f"b{i}" for i in range(0, 200, 10)}
+    assert big.lookup(["kidney"], ["B-"]) == {f"b{i}" for i in range(0, 200, 3) if i % 10}
+    print("Intersection tests passed.")
+
+def test_global_match_scores_only_organ_donors():
+    print("Testing organ-aware filtering in the global match route...")
+    from app.core.firebase import db
+    from app.models.schemas import GlobalMatchRequest
+    from app.routers import matches
+    from app.services.incremental import incremental_matcher
+    from app.services.profile_service import profile_service
+
+    recipient = {"fullName": "Organ Test", "bloodGroup": "O+", "hospitalLocation": "Europe-UK", "organRequired": "lungs"}
+    db.collection("recipients").document("8101").set(recipient)
+    incremental_matcher.ensure_primed()
+    incremental_matcher.on_recipient_added(profile_service.normalize_recipient("8101", recipient))
+    for donor_id, organs in (("org-lung", ["Lungs"]), ("org-heart", ["Heart"]), ("org-both", ["heart", "lung"])):
+        incremental_matcher.on_donor_added(profile_service.normalize_donor(donor_id, {
+            "bloodGroup": "O-", "hospitalLocation": "Europe-UK", "organsWillingToDonate": organs}))
+
+    candidates = {d.id for d in incremental_matcher.candidates(incremental_matcher.get_recipient("8101"))}
+    assert {"org-lung", "org-both"} <= candidates and "org-heart" not in candidates, candidates
+
+    body = json.loads(matches.find_matches_global(GlobalMatchRequest(recipient_id="8101")).body)
+    ids = {m["donor_id"] for m in body["matches"]}
+    assert "org-heart" not in ids, "Heart-only donors must not be matched to a lung recipient"
+    assert all(any(organ_key(o) == "lung" for o in m["donor_organs"]) for m in body["matches"])
+    print("Route filtering tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_organ_key()
+        test_lookup_intersects_organ_and_blood()
+        test_global_match_scores_only_organ_donors()
+        print("\nALL ORGAN INDEX TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
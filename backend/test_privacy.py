@@ -0,0 +1,146 @@
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.services.privacy import PrivacyAccountant, PrivacyBudgetExceeded
+from app.services.matching import noisy_score
+
+def test_release_is_memoized():
+    print("Testing memoized releases...")
+    accountant = PrivacyAccountant(budget=10.0)
+    first = accountant.release("r1", "d1", "score", 0.8, noisy_score, 0.5)
+    for _ in range(50):
+        assert accountant.release("r1", "d1", "score", 0.8, noisy_score, 0.5) == first, "Polling must not re-randomise"
+    assert accountant.spent("r1") == 0.5, f"Only the first release should be charged, spent {accountant.spent('r1')}"
+    assert accountant.hits == 50 and accountant.misses == 1
+
+    # A new data version is a fresh release
+    accountant.release("r1", "d1", "score", 0.6, noisy_score, 0.5)
+    assert accountant.spent("r1") == 1.0
+    print("Memoization tests passed.")
+
+def test_budget_exhaustion():
+    print("Testing budget exhaustion...")
+    accountant = PrivacyAccountant(budget=1.0)
+    accountant.release("r1", "d1", "score", 0.8, noisy_score, 0.5)
+    stale = accountant.release("r1", "d2", "score", 0.4, noisy_score, 0.5)
+
+    # Budget spent: changed data reuses the last release, unseen pairs are refused
+    assert accountant.release("r1", "d2", "score", 0.9, noisy_score, 0.5) == stale
+    try:
+        accountant.release("r1", "d3", "score", 0.7, noisy_score, 0.5)
+        assert False, "Expected PrivacyBudgetExceeded"
+    except PrivacyBudgetExceeded:
+        pass
+
+    # Budgets are per recipient
+    accountant.release("r2", "d3", "score", 0.7, noisy_score, 0.5)
+    print("Budget tests passed.")
+
+def test_ledger_persistence():
+    print("Testing ledger persistence...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.json")
+        accountant = PrivacyAccountant(budget=5.0, ledger_path=path, flush_interval=3600)
+        accountant.release("r1", "d1", "score", 0.8, noisy_score, 0.5)
+        assert not os.path.exists(path), "Ledger should only be written periodically"
+        accountant.flush()
+
+        restored = PrivacyAccountant(budget=5.0, ledger_path=path)
+        assert restored.spent("r1") == 0.5, "Spent epsilon must survive a restart"
+
+        # Harnesses start from a clean slate and stop writing the ledger
+        restored.reset(ledger_path=None)
+        restored.release("r1", "d2", "score", 0.8, noisy_score, 0.5)
+        restored.flush()
+        assert restored.spent("r1") == 0.5 and PrivacyAccountant(budget=5.0, ledger_path=path).spent("r1") == 0.5
+    print("Persistence tests passed.")
+
+def test_shared_ledger():
+    print("Testing a ledger shared between workers...")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "ledger.json")
+        seeded = PrivacyAccountant(budget=2.0, ledger_path=legacy)
+        seeded.release("r1", "d0", "score", 0.8, noisy_score, 0.5)
+        seeded.flush()
+        # Two workers' accountants over the same file
+        path = os.path.join(tmp, "privacy_ledger.sqlite")
+        a = PrivacyAccountant(budget=2.0, ledger_path=legacy)
+        b = PrivacyAccountant(budget=2.0, ledger_path=legacy)
+        a.share(path)
+        b.share(path)
+        assert a.spent("r1") == b.spent("r1") == 0.5, "Spent budget carries over from the JSON ledger"
+
+        first = a.release("r1", "d1", "score", 0.8, noisy_score, 0.5)
+        assert b.release("r1", "d1", "score", 0.8, noisy_score, 0.5) == first, "Repeat views elsewhere reuse the noise"
+        assert a.spent("r1") == b.spent("r1") == 1.0
+        b.release("r1", "d2", "score", 0.8, noisy_score, 0.5)
+        a.release("r1", "d3", "score", 0.8, noisy_score, 0.5)
+        for accountant in (a, b):
+            try:
+                accountant.release("r1", "d4", "score", 0.8, noisy_score, 0.5)
+                assert False, "The budget is spent across workers, not per worker"
+            except PrivacyBudgetExceeded:
+                pass
+        assert b.release("r1", "d1", "score", 0.7, noisy_score, 0.5) == first, "Exhausted: the last release is reused"
+        a.reset()
+        b.reset()
+    print("Shared ledger tests passed.")
+
+def test_default_budget_goes_to_best_candidates():
+    print("Testing the default budget on the global match map...")
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+    from app.services.incremental import incremental_matcher
+    from app.services.matching import basic_compatibility_score
+    from app.services.privacy import privacy_accountant
+
+    assert 1.0 <= settings.DP_RECIPIENT_EPSILON_BUDGET < 10.0, "The default budget must be a meaningful one"
+    saved = privacy_accountant.budget
+    privacy_accountant.budget = settings.DP_RECIPIENT_EPSILON_BUDGET
+    try:
+        client = TestClient(app)
+        locations = ["Europe-UK", "USA-New York", "Asia-India", "USA-California", "Africa-South Africa"]
+        for i in range(20):
+            assert client.post("/registry/donor", json={
+                "id": f"dp-d{i}", "bloodGroup": "O-", "dob": f"{1950 + i}-01-01", "hospitalLocation": locations[i % 5],
+                "organsWillingToDonate": ["spleen"]}).status_code == 200
+        assert client.post("/registry/recipient", json={
+            "id": "dp-r1", "bloodGroup": "AB+", "hospitalLocation": "Europe-UK", "organRequired": "Spleen"}).status_code == 200
+
+        response = client.post("/match", json={"recipient_id": "dp-r1"})
+        assert response.status_code == 200
+        # 0.5 per score release: the budget covers 16 of the 20 candidates, the best ones
+        assert privacy_accountant.spent("dp-r1") == settings.DP_RECIPIENT_EPSILON_BUDGET
+        recipient = incremental_matcher.get_recipient("dp-r1")
+        exact = {f"dp-d{i}": basic_compatibility_score(recipient, incremental_matcher.get_donor(f"dp-d{i}"))[0]
+                 for i in range(20)}
+        released = {donor_id for r, donor_id, _ in privacy_accountant._releases if r == "dp-r1"}
+        assert len(released) == 16
+        assert min(exact[d] for d in released) >= max(exact[d] for d in set(exact) - released)
+        # The rest are counted, not silently dropped
+        assert response.json()["withheld"] == 4 and response.headers["X-Privacy-Withheld"] == "4"
+
+        # With the budget gone, federated matches still list the unreleased candidates, without scores
+        body = client.post("/match/federated", json={"recipient_id": "dp-r1", "k": 20}).json()
+        assert len(body["matches"]) == 20 and body["withheld"] == 4
+        assert {m["donor_id"] for m in body["matches"] if m["score"] is None} == set(exact) - released
+    finally:
+        privacy_accountant.budget = saved
+    print("Default budget tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_release_is_memoized()
+        test_budget_exhaustion()
+        test_ledger_persistence()
+        test_shared_ledger()
+        test_default_budget_goes_to_best_candidates()
+        print("\nALL PRIVACY TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
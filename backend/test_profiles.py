@@ -0,0 +1,73 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app.models.profiles import Donor, Recipient
+from app.services.hla import hla_scores, pack_codes, parse_hla_typing, unpack_codes
+from app.services.matching import basic_compatibility_score
+from app.services.profile_service import profile_service
+
+def test_round_trip():
+    print("Testing compact profile round trips...")
+    recipient = profile_service.normalize_recipient("r1", {
+        "fullName": "Jane Doe", "bloodGroup": "AB-", "hospitalLocation": "Europe-UK",
+        "urgencyStatus": "Critical (ICU)", "organRequired": "Liver", "hlaResults": "A2 A24 B7 B8 DR15 DR4",
+    })
+    as_dict = recipient.to_dict()
+    assert as_dict["blood_type"] == "AB-" and as_dict["location"] == "Europe-UK"
+    assert as_dict["organ_required"] == "Liver" and as_dict["urgency_score"] == 10
+    assert as_dict["hla_markers"] == "A2 A24 B7 B8 DR15 DR4"
+    assert Recipient.from_dict(as_dict).to_dict() == as_dict, "to_dict/from_dict should round trip"
+
+    donor = profile_service.normalize_donor("d1", {
+        "bloodGroup": "O-", "organsWillingToDonate": ["kidney", "liver"], "hlaTissueTyping": "A*02:01, A*02:01, B7 B8 DR15 DR4",
+    })
+    # Non-canonical typing text is kept verbatim, canonical text is rebuilt from the codes
+    assert donor.to_dict()["hla_markers"] == "A*02:01, A*02:01, B7 B8 DR15 DR4"
+    assert donor.organs_available == ["kidney", "liver"]
+    assert Donor.from_dict(donor.to_dict()).to_dict() == donor.to_dict()
+    print("Round trip tests passed.")
+
+def test_packed_codes():
+    print("Testing packed HLA codes...")
+    codes = parse_hla_typing("A2 A24 B7 B8 DR15 DR4")
+    assert unpack_codes(pack_codes(codes)) == codes
+    assert unpack_codes(pack_codes((1000, 0, 999, 1, 0, 1000))) == (1000, 0, 999, 1, 0, 1000)
+    print("Packed code tests passed.")
+
+def test_records_score_like_dicts():
+    print("Testing that records and dicts score identically...")
+    recipient = {"id": "r", "blood_type": "A+", "urgency_score": 7, "location": "USA-New York",
+                 "hla_markers": "A2 A24 B7 B8 DR15 DR4"}
+    donors = [
+        {"id": "a", "blood_type": "O+", "location": "USA-California", "hla_markers": "A2 A1 B7 B44 DR15 DR4"},
+        {"id": "b", "blood_type": "A+", "location": "Asia-India", "hla_markers": "4/6 HLA match potential"},
+        {"id": "c", "blood_type": "AB+", "location": "Unknown", "hla_markers": "garbage"},
+    ]
+    records = [Donor.from_dict(d) for d in donors]
+    assert np.allclose(hla_scores(recipient, donors), hla_scores(Recipient.from_dict(recipient), records))
+    for donor, record in zip(donors, records):
+        assert basic_compatibility_score(recipient, donor) == basic_compatibility_score(Recipient.from_dict(recipient), record)
+    print("Scoring parity tests passed.")
+
+def test_memory_reduction():
+    print("Testing memory per cached profile...")
+    from benchmarks.profile_memory import run
+    rows = run(1000)
+    print(f"  recipients {rows['recipient']['ratio']:.1f}x, donors {rows['donor']['ratio']:.1f}x smaller")
+    assert rows["recipient"]["ratio"] > 1.8, rows
+    assert rows["donor"]["ratio"] > 2.0, rows
+    print("Memory tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_round_trip()
+        test_packed_codes()
+        test_records_score_like_dicts()
+        test_memory_reduction()
+        print("\nALL PROFILE TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,125 @@
+import sys
+import os
+import random
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.profiles import Donor, Recipient
+from app.services.incremental import IncrementalMatcher
+from app.services.matching import basic_compatibility_score, compatibility_upper_bound, location_distance
+from app.services.regions import RegionIndex, rings
+from app.services.shared_pool import SharedDonorPool
+
+LOCATIONS = ["USA-California", "USA-New York", "Europe-UK", "Asia-India", "Africa-South Africa"]
+BLOODS = ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"]
+ORGANS = ["Kidney", "Liver", "Heart", "Lungs"]
+ALLELES = ["A1", "A2", "A3", "A24", "B7", "B8", "B35", "B44", "DR1", "DR4", "DR7", "DR15"]
+
+def pool(seed=11, n_donors=1500, n_recipients=40):
+    rng = random.Random(seed)
+    markers = lambda: " ".join(rng.sample(ALLELES, 6))
+    donors = [Donor.from_dict({"id": f"rg-d{i}", "age": rng.randrange(18, 70), "blood_type": rng.choice(BLOODS),
+                               "location": rng.choice(LOCATIONS), "hla_markers": markers(),
+                               "organs_available": rng.sample(ORGANS, rng.randrange(1, 3))})
+              for i in range(n_donors)]
+    recipients = [Recipient.from_dict({"id": f"rg-r{i}", "name": f"R{i}", "age": 40, "urgency_score": rng.randrange(1, 11),
+                                       "blood_type": rng.choice(BLOODS), "location": rng.choice(LOCATIONS),
+                                       "organ_required": rng.choice(ORGANS), "hla_markers": markers()})
+                  for i in range(n_recipients)]
+    return donors, recipients
+
+def donors_scored():
+    return metrics._counters.get("organ_ring_search_donors_total", {}).get((), 0.0)
+
+def primed(donors, recipients, ring):
+    saved = settings.MATCH_RING_SEARCH
+    settings.MATCH_RING_SEARCH = ring
+    try:
+        matcher = IncrementalMatcher(k=5)
+        matcher.prime(donors, recipients)
+        return matcher
+    finally:
+        settings.MATCH_RING_SEARCH = saved
+
+def test_region_index():
+    print("Testing the region-partitioned index...")
+    index = RegionIndex()
+    index.add("a", ["kidney"], "O+", 1)
+    index.add("b", ["Kidneys", "liver"], "A+", 2)
+    index.add("c", ["heart"], "O+", 2)
+    assert index.lookup_in(2, ["kidney"], ["O+", "A+"]) == {"b"}
+    assert index.lookup(["kidney"], ["O+", "A+"]) == {"a", "b"}
+    index.add("a", ["kidney"], "O+", 2)
+    assert index.sizes() == {2: 3}, "Moving a donor empties and drops its old region"
+    index.remove("b")
+    assert index.lookup(["kidney", "heart"], ["O+"]) == {"a", "c"} and len(index) == 2
+    print("Region index tests passed.")
+
+def test_ring_order_and_bound():
+    print("Testing ring order and the score bound...")
+    donors, recipients = pool(n_donors=300)
+    recipient = recipients[0]
+    order = rings(recipient.location_code, {d.location_code for d in donors})
+    assert order[0] == (0.0, recipient.location_code), "The home region comes first"
+    assert [d for d, _ in order] == sorted(d for d, _ in order)
+    for recipient in recipients:
+        for donor in donors:
+            distance = location_distance(recipient.location_code, donor.location_code)
+            assert basic_compatibility_score(recipient, donor)[0] <= compatibility_upper_bound(recipient, distance)
+    print("Ring order tests passed.")
+
+def test_ring_search_matches_exhaustive():
+    print("Testing that ring search returns the exhaustive top-k...")
+    donors, recipients = pool()
+    exhaustive = primed(donors, recipients, ring=False)
+    before = donors_scored()
+    ring = primed(donors, recipients, ring=True)
+    scored = donors_scored() - before
+    for recipient in recipients:
+        expected = [(s, d.id) for s, d in exhaustive.top_candidates(recipient.id)]
+        assert [(s, d.id) for s, d in ring.top_candidates(recipient.id)] == expected, recipient.id
+    candidates = sum(len(exhaustive.candidates(r)) for r in recipients)
+    print(f"  scored {int(scored)} of {candidates} candidate pairs")
+    # The fraction shrinks as regions fill up (about a quarter at 20k donors)
+    assert scored < 0.6 * candidates, "Searches should stop before the farthest regions"
+
+    # Removing a top donor refills from the regions without it
+    top_donor = ring.top_candidates(recipients[0].id)[0][1].id
+    exhaustive.on_donor_removed(top_donor)
+    ring.on_donor_removed(top_donor)
+    assert [d.id for _, d in ring.top_candidates(recipients[0].id)] == \
+        [d.id for _, d in exhaustive.top_candidates(recipients[0].id)]
+    print("Ring search tests passed.")
+
+def test_follower_ring_search():
+    print("Testing ring search over a shared snapshot...")
+    donors, recipients = pool(seed=5, n_donors=600, n_recipients=10)
+    directory = tempfile.mkdtemp()
+    try:
+        owner, follower = SharedDonorPool(directory, poll=0), SharedDonorPool(directory, poll=0)
+        owner.publish(donors)
+        follower.follow()
+        matcher = primed(donors, recipients, ring=False)
+        for recipient in recipients:
+            expected = [(s, d.id) for s, d in matcher.top_candidates(recipient.id)]
+            actual = [(s, d.id) for s, d in follower.top_candidates(recipient, 5)]
+            assert actual == expected, (recipient.id, actual, expected)
+    finally:
+        shutil.rmtree(directory)
+    print("Follower ring search tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_region_index()
+        test_ring_order_and_bound()
+        test_ring_search_matches_exhaustive()
+        test_follower_ring_search()
+        print("\nALL REGION TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,74 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.core.responses import FastJSONResponse, dumps
+from app.models.schemas import MatchResponse
+from benchmarks.serialization import match_rows
+
+def test_matches_pydantic_output():
+    print("Testing that the fast path serializes like the pydantic path...")
+    recipient = {"id": "r1", "blood_type": "O+", "urgency": 7}
+    rows = match_rows(50)
+    expected = jsonable_encoder(MatchResponse(recipient=recipient, matches=rows, withheld=0))
+    actual = json.loads(dumps({"recipient": recipient, "matches": rows, "withheld": 0}))
+    assert actual == expected, "Fast path output differs from the response_model output"
+    print("Equivalence tests passed.")
+
+def test_numpy_values():
+    print("Testing numpy scalars and arrays...")
+    content = {"score": np.float64(0.5), "count": np.int64(3), "codes": np.arange(3, dtype=np.int32), 1: "non-str key"}
+    assert json.loads(dumps(content)) == {"score": 0.5, "count": 3, "codes": [0, 1, 2], "1": "non-str key"}
+    response = FastJSONResponse([np.float32(1.5)])
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == [1.5]
+    print("Numpy tests passed.")
+
+def test_endpoints_use_fast_path():
+    print("Testing match and registry endpoints...")
+    from app.core.firebase import db
+    from app.main import app
+    from app.services.incremental import incremental_matcher
+    from app.services.profile_service import profile_service
+
+    recipient = {"fullName": "Response Test", "bloodGroup": "A+", "hospitalLocation": "Europe-UK",
+                 "organRequired": "Liver", "hlaResults": "4/6"}
+    donor = {"bloodGroup": "O-", "hospitalLocation": "Europe-UK", "organsWillingToDonate": ["liver"],
+             "hlaTissueTyping": "4/6"}
+    db.collection("recipients").document("9101").set(recipient)
+    db.collection("donors").document("resp-d1").set(donor)
+    incremental_matcher.ensure_primed()
+    incremental_matcher.on_recipient_added(profile_service.normalize_recipient("9101", recipient))
+    incremental_matcher.on_donor_added(profile_service.normalize_donor("resp-d1", donor))
+
+    client = TestClient(app)
+    res = client.get("/match/9101")
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/json"
+    body = MatchResponse.model_validate(res.json())
+    assert body.recipient["id"] == "9101"
+    assert any(m.donor_id == "resp-d1" for m in body.matches), "Seeded donor should match"
+    scores = [m.raw_score for m in body.matches]
+    assert scores == sorted(scores, reverse=True), "Matches should be sorted by raw score"
+
+    waitlist = client.get("/registry/waitlist")
+    assert waitlist.headers["content-type"] == "application/json"
+    assert any(r["id"] == "9101" and r["hla_markers"] == "4/6" for r in waitlist.json())
+    print("Endpoint tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_matches_pydantic_output()
+        test_numpy_values()
+        test_endpoints_use_fast_path()
+        print("\nALL RESPONSE SERIALIZATION TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,124 @@
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+import numpy as np
+
+from app.core.firebase import db
+from app.services.ml_model import ml_service, train_outcome_model
+from app.services.retraining import ModelRetrainer, _donor_ages, outcome_chunks
+
+def seed_outcomes(n=120):
+    """Young donors' matches get accepted, older donors' get rejected."""
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        age = int(rng.integers(20, 70))
+        db.collection("donors").document(f"rt-d{i}").set({
+            "fullName": f"Donor {i}", "bloodGroup": "O+", "dob": f"{2026 - age}-01-01",
+            "organsWillingToDonate": ["kidney"], "hospitalLocation": "Europe-UK"})
+        urgency = int(rng.integers(1, 11))
+        if age < 45:
+            db.collection("requests_accepted").document(f"rt-a{i}").set({
+                "best_match_donor_id": f"rt-d{i}", "urgency_score": urgency, "status": "accepted"})
+        else:
+            db.collection("requests").document(f"rt-r{i}").set({
+                "donor_id": f"rt-d{i}", "status": "pending", "urgency_score": urgency})
+
+def test_outcome_dataset():
+    print("Testing the chunked outcome dataset...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    seed_outcomes()
+    client = TestClient(app)
+    pending = [doc.id for doc in db.collection("requests").stream() if doc.id.startswith("rt-r")]
+    for request_id in pending:
+        res = client.post("/match/reject", json={"request_id": request_id, "reason": "crossmatch positive"})
+        assert res.status_code == 200, res.text
+    assert client.post("/match/reject", json={"request_id": "missing"}).status_code == 404
+    before = db.rpc_count
+    assert client.post("/match/reject", json={"request_id": "REQ-MISSING"}).status_code == 404
+    assert db.rpc_count - before == 1, "A rejection is a single write, routed by id"
+    assert db.collection("requests").document(pending[0]).get().to_dict()["status"] == "rejected"
+
+    # Donors outside the pool are read in one batch
+    before = db.rpc_count
+    ages = _donor_ages([f"rt-d{i}" for i in range(10)] + ["rt-missing"])
+    assert len(ages) == 10 and db.rpc_count - before <= 1
+
+    chunks = list(outcome_chunks(chunk_size=7))
+    assert all(len(c) <= 7 and c.dtype == np.float32 for c in chunks)
+    rows = np.concatenate(chunks)
+    labels = rows[:, 2]
+    assert len(rows) >= 120 and set(labels.tolist()) == {0.0, 1.0}
+    assert rows[labels == 1, 0].max() < 46 and rows[labels == 0, 0].min() >= 44
+    print("Dataset tests passed.")
+
+def test_background_retrain_and_swap():
+    print("Testing out-of-process retraining and hot swap...")
+    directory = tempfile.mkdtemp()
+    saved = ml_service.forest, ml_service._forest_dir
+    retrainer = ModelRetrainer(directory=directory, min_rows=20, timeout=120)
+    try:
+        result = retrainer.run_once()
+        assert result["status"] == "published", result
+        first = ml_service.forest
+        assert first is not None and first.path == result["path"]
+        young, old = ml_service.predict_batch([25, 65], 5)
+        assert young > old, (young, old)
+
+        # A second model is swapped in; the forest a request already holds keeps working
+        result = retrainer.run_once()
+        assert result["status"] in ("published", "rejected"), result
+        if result["status"] == "published":
+            assert ml_service.forest.path != first.path
+        assert first.predict_proba_batch([[25, 5]]).shape == (1, 2)
+    finally:
+        retrainer.stop()
+        ml_service.forest, ml_service._forest_dir = saved
+        shutil.rmtree(directory)
+    print("Retrain tests passed.")
+
+def test_validation_gate():
+    print("Testing candidate validation...")
+    directory = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(1)
+        ages = rng.integers(20, 70, 2000)
+        good = np.column_stack([ages, rng.integers(1, 11, 2000), ages < 45]).astype(np.float32)
+        path = os.path.join(directory, "outcomes.f32")
+        model_dir = os.path.join(directory, "model")
+
+        good.tofile(path)
+        first = train_outcome_model(path, model_dir)
+        assert first["status"] == "published" and first["accuracy"] > 0.9, first
+
+        # A small, noisily labelled batch: the candidate validates worse than the served model
+        noisy = good[:300].copy()
+        flip = rng.random(300) < 0.1
+        noisy[flip, 2] = 1 - noisy[flip, 2]
+        noisy.tofile(path)
+        second = train_outcome_model(path, model_dir, tolerance=0.0)
+        assert second["status"] == "rejected" and second["brier"] > second["served_brier"], second
+        assert train_outcome_model(path, model_dir, tolerance=0.1)["status"] == "published"
+
+        good[:, 2] = 1
+        good.tofile(path)
+        assert train_outcome_model(path, model_dir)["status"] == "skipped"
+    finally:
+        shutil.rmtree(directory)
+    print("Validation tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_outcome_dataset()
+        test_background_retrain_and_swap()
+        test_validation_gate()
+        print("\nALL RETRAINING TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,157 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+import numpy as np
+import pandas as pd
+
+from app.models.profiles import Donor, Recipient
+from app.services.incremental import IncrementalMatcher
+from app.services.shared_pool import SharedDonorPool
+
+def donor(i, blood="O+", organs=("kidney",)):
+    return Donor.from_dict({"id": f"sp-{i}", "blood_type": blood, "age": 20 + i % 50, "location": "Europe-UK",
+                            "organs_available": list(organs), "hla_markers": f"A{i % 9 + 1} A24 B7 B8 DR15 DR4"})
+
+RECIPIENT = Recipient.from_dict({"id": "sp-r", "name": "Shared", "blood_type": "A+", "age": 40, "urgency_score": 8,
+                                 "location": "Europe-UK", "organ_required": "Kidneys", "hla_markers": "A2 A24 B7 B8 DR15 DR4"})
+
+def pool_donors():
+    bloods = ["O-", "O+", "A+", "B+", "AB+"]
+    organs = [("Kidney",), ("heart",), ("kidney", "liver"), ("Lungs",)]
+    return [donor(i, bloods[i % 5], organs[i % 4]) for i in range(60)]
+
+def test_owner_and_followers():
+    print("Testing owner election and read-only followers...")
+    directory = tempfile.mkdtemp()
+    try:
+        owner, follower = SharedDonorPool(directory, poll=0), SharedDonorPool(directory, poll=0)
+        assert owner.acquire(), "First worker should own the pool"
+        assert not follower.acquire(), "Second worker must follow"
+
+        donors = pool_donors()
+        owner.publish(donors)
+        follower.follow()
+        assert follower.attached()
+        snapshot = follower.snapshot()
+        assert not snapshot.columns["organ_set"].flags.writeable, "Followers map the pool read-only"
+
+        # Same candidates and top-k as a worker holding its own matcher
+        matcher = IncrementalMatcher(k=10)
+        matcher.prime(donors, [RECIPIENT])
+        assert {d.id for d in follower.candidates(RECIPIENT)} == {d.id for d in matcher.candidates(RECIPIENT)}
+        expected = [(round(s, 9), d.id) for s, d in matcher.top_candidates("sp-r")]
+        actual = [(round(s, 9), d.id) for s, d in follower.top_candidates(RECIPIENT, 10)]
+        assert sorted(actual) == sorted(expected), (actual, expected)
+
+        # Atomic swap: followers pick up the new version, old mappings stay readable
+        old = snapshot
+        owner.publish(donors[:5])
+        assert len(follower.snapshot()) == 5 and follower.version != os.path.basename(old.path)
+        assert len(old.donors()) == 60
+    finally:
+        shutil.rmtree(directory)
+    print("Owner/follower tests passed.")
+
+def test_allocation_rounds_published():
+    print("Testing allocation round publishing...")
+    from app.services.allocations import AllocationRound
+    directory = tempfile.mkdtemp()
+    try:
+        owner, follower = SharedDonorPool(directory), SharedDonorPool(directory)
+        assert follower.allocation_round() is None
+        owner.publish_allocations(AllocationRound(3, 7, "2026-01-01T00:00:00", [{"id": "REQ-1"}]))
+        published = follower.allocation_round()
+        assert published["round"] == 3 and published["allocations"] == [{"id": "REQ-1"}]
+    finally:
+        shutil.rmtree(directory)
+    print("Allocation publishing tests passed.")
+
+def test_shared_model():
+    print("Testing the memory-mapped model...")
+    from app.core.config import settings
+    from app.services.forest import FlatForest
+    from app.services.ml_model import SuccessModel
+
+    directory = tempfile.mkdtemp()
+    try:
+        with open(settings.DATA_FILE) as f:
+            profiles = json.load(f)
+        trainer = SuccessModel()
+        trainer.train(profiles)
+        trainer.export(directory)
+
+        worker = SuccessModel()
+        worker.attach(directory, poll=0)
+        assert isinstance(worker.forest.threshold, np.memmap)
+        rows = [(age, urgency) for age in range(0, 90, 7) for urgency in range(0, 11, 2)]
+        expected = trainer.model.predict_proba(pd.DataFrame(rows, columns=["age", "urgency_score"]))[:, 1]
+        actual = [worker.predict_probability(age, urgency) for age, urgency in rows]
+        assert np.allclose(actual, expected, rtol=0, atol=1e-12), "Flat forest must match sklearn"
+
+        # Polls that find the same version keep the mapped forest instead of loading it again
+        mapped = worker.forest
+        worker.predict_probability(40, 5)
+        assert worker.forest is mapped
+
+        # A retrained model swapped in by the owner is picked up
+        first = worker.forest.path
+        trainer.model.set_params(n_estimators=5)
+        trainer.train(profiles)
+        trainer.export(directory)
+        worker.predict_probability(40, 5)
+        assert worker.forest.path != first and len(worker.forest.roots) == 5
+        assert FlatForest.load(os.path.join(directory, "missing")) is None
+    finally:
+        shutil.rmtree(directory)
+    print("Shared model tests passed.")
+
+def test_follower_routes():
+    print("Testing match routes in a follower worker...")
+    from app.core.firebase import db
+    from app.models.schemas import GlobalMatchRequest
+    from app.routers import matches
+    from app.services.incremental import incremental_matcher
+    from app.services.shared_pool import shared_pool
+
+    directory = tempfile.mkdtemp()
+    saved = shared_pool.directory, shared_pool.following, shared_pool.poll
+    original_primed = incremental_matcher.ensure_primed
+    try:
+        shared_pool.directory, shared_pool.poll = directory, 0
+        shared_pool.publish(pool_donors())
+        shared_pool.follow()
+        db.collection("recipients").document("6101").set({
+            "fullName": "Follower", "bloodGroup": "A+", "hospitalLocation": "Europe-UK", "organRequired": "kidney"})
+
+        def not_in_followers():
+            raise AssertionError("Followers must not load their own donor pool")
+        incremental_matcher.ensure_primed = not_in_followers
+
+        body = json.loads(matches.find_matches(6101).body)
+        assert body["matches"] and all(m["donor_id"].startswith("sp-") for m in body["matches"])
+        body = json.loads(matches.find_matches_global(GlobalMatchRequest(recipient_id="6101")).body)
+        assert body["matches"] and all("Kidney" in m["donor_organs"] or "kidney" in m["donor_organs"]
+                                       for m in body["matches"])
+    finally:
+        incremental_matcher.ensure_primed = original_primed
+        shared_pool.directory, shared_pool.following, shared_pool.poll = saved
+        shared_pool._snapshot = None
+        shutil.rmtree(directory)
+    print("Follower route tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_owner_and_followers()
+        test_allocation_rounds_published()
+        test_shared_model()
+        test_follower_routes()
+        print("\nALL SHARED POOL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
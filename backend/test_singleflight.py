@@ -0,0 +1,115 @@
+import sys
+import os
+import json
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.singleflight import SingleFlight
+
+def run_concurrently(n, fn):
+    barrier = threading.Barrier(n)
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+def test_coalesces_concurrent_calls():
+    print("Testing that concurrent identical calls run once...")
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["shared"]
+
+    results, errors = run_concurrently(8, lambda i: flight.do(("r1", 1), slow))
+    assert errors == [None] * 8, errors
+    assert len(calls) == 1, f"Expected one execution, got {len(calls)}"
+    assert all(r is results[0] for r in results), "Callers should share the same result"
+    assert flight.in_flight() == 0
+
+    # Completed calls aren't cached
+    flight.do(("r1", 1), slow)
+    assert len(calls) == 2
+    print("Coalescing tests passed.")
+
+def test_keys_and_errors():
+    print("Testing key separation and error propagation...")
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow(key):
+        calls.append(key)
+        time.sleep(0.1)
+        return key
+
+    results, _ = run_concurrently(6, lambda i: flight.do(i % 2, lambda: slow(i % 2)))
+    assert sorted(calls) == [0, 1], f"Expected one execution per key, got {calls}"
+    assert results == [0, 1, 0, 1, 0, 1]
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    _, errors = run_concurrently(4, lambda i: flight.do("bad", failing))
+    assert all(isinstance(e, ValueError) for e in errors), errors
+    assert flight.in_flight() == 0
+    print("Key and error tests passed.")
+
+def test_match_router_coalesces():
+    print("Testing coalescing in the global match route...")
+    from app.core.firebase import db
+    from app.models.schemas import GlobalMatchRequest
+    from app.routers import matches
+
+    db.collection("recipients").document("7001").set({
+        "fullName": "Coalesce Test", "bloodGroup": "O+", "hospitalLocation": "Europe-UK", "organRequired": "Kidney"})
+    for i in range(5):
+        db.collection("donors").document(f"c{i}").set({
+            "bloodGroup": "O+", "hospitalLocation": "Europe-UK", "organsWillingToDonate": ["kidney"]})
+
+    original = matches._exact_global
+    calls = []
+
+    def counted(recipient_id):
+        calls.append(recipient_id)
+        time.sleep(0.2)
+        return original(recipient_id)
+
+    matches._exact_global = counted
+    try:
+        results, errors = run_concurrently(
+            6, lambda i: matches.find_matches_global(GlobalMatchRequest(recipient_id="7001")))
+    finally:
+        matches._exact_global = original
+
+    assert errors == [None] * 6, errors
+    assert len(calls) == 1, f"Expected one scoring pass, got {len(calls)}"
+    bodies = [json.loads(r.body) for r in results]
+    assert all(len(b["matches"]) == len(bodies[0]["matches"]) > 0 for b in bodies)
+    print("Router coalescing tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_coalesces_concurrent_calls()
+        test_keys_and_errors()
+        test_match_router_coalesces()
+        print("\nALL SINGLE-FLIGHT TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,143 @@
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+import numpy as np
+
+from app.models.profiles import Donor, locations
+from app.services.hla import allele_codes
+from app.services.snapshot import load_donor_snapshot, write_donor_snapshot
+
+DONORS = [
+    {"id": "s1", "blood_type": "O-", "age": 41, "location": "Snapshot-Oslo", "organs_available": ["Kidney", "Liver"],
+     "hla_markers": "A2 A24 B7 B8 DR15 DR4"},
+    {"id": "s2", "blood_type": "AB+", "age": 29, "location": "Snapshot-Lima", "organs_available": ["lungs"],
+     "hla_markers": "4/6"},
+    {"id": "s3-longer-document-id", "blood_type": "B+", "age": 63, "location": "Snapshot-Oslo",
+     "organs_available": [], "hla_markers": "A*03:01 A*11:01 B*35:01 B*44:02 DRB1*01:01 DRB1*07:01"},
+]
+
+def test_round_trip():
+    print("Testing snapshot write/load round trip...")
+    directory = tempfile.mkdtemp()
+    try:
+        donors = [Donor.from_dict(d) for d in DONORS]
+        write_donor_snapshot(directory, donors)
+        snapshot = load_donor_snapshot(directory)
+        assert len(snapshot) == 3
+        assert isinstance(snapshot.columns["age"], np.memmap), "Columns should be memory-mapped"
+        assert [d.to_dict() for d in snapshot.donors()] == [d.to_dict() for d in donors]
+
+        # A new version replaces CURRENT atomically; old versions are pruned
+        for _ in range(3):
+            write_donor_snapshot(directory, donors[:1])
+        assert len(load_donor_snapshot(directory)) == 1
+        assert len([e for e in os.listdir(directory) if e.startswith("v-")]) == 2
+
+        assert load_donor_snapshot(directory, max_age=-1) is None, "Expired snapshots must be ignored"
+        assert load_donor_snapshot(os.path.join(directory, "missing")) is None
+    finally:
+        shutil.rmtree(directory)
+    print("Round trip tests passed.")
+
+def test_loads_in_fresh_process():
+    print("Testing that codes are re-encoded in another process...")
+    directory = tempfile.mkdtemp()
+    try:
+        # Shift this process's tables so its codes differ from a fresh interpreter's
+        for i in range(5):
+            locations.encode(f"Snapshot-Filler-{i}")
+            allele_codes.encode("A", str(900 + i))
+        donors = [Donor.from_dict(d) for d in DONORS]
+        write_donor_snapshot(directory, donors)
+        code = (
+            "import json, sys; from app.services.snapshot import load_donor_snapshot; "
+            f"print(json.dumps([d.to_dict() for d in load_donor_snapshot({directory!r}).donors()]))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        loaded = json.loads(out.strip().splitlines()[-1])
+        expected = [d.to_dict() for d in donors]
+        strip = lambda rows: [{k: v for k, v in r.items() if k != "hla_codes"} for r in rows]
+        assert strip(loaded) == strip(expected), "Records must decode identically in another process"
+    finally:
+        shutil.rmtree(directory)
+    print("Fresh process tests passed.")
+
+def test_matcher_applies_only_changes():
+    print("Testing cold start from snapshot plus changes...")
+    from app.core.config import settings
+    from app.core.firebase import db
+    from app.services.incremental import IncrementalMatcher
+    from app.services.profile_service import profile_service
+
+    directory = tempfile.mkdtemp()
+    previous = settings.DONOR_SNAPSHOT_DIR
+    settings.DONOR_SNAPSHOT_DIR = directory
+    original_get_donors, original_normalize = profile_service.get_donors, profile_service.normalize_donor
+    try:
+        for i in range(20):
+            profile_service.add_donor({"id": f"snap-{i}", "bloodGroup": "O+", "hospitalLocation": "Europe-UK",
+                                       "organsWillingToDonate": ["kidney"], "hlaTissueTyping": f"{i % 7}/6"})
+
+        # First start: full scan, which writes the snapshot
+        first = IncrementalMatcher()
+        first.ensure_primed()
+        assert load_donor_snapshot(directory) is not None, "A full scan should write a snapshot"
+        first._save_snapshot(first.donors(), datetime.now(timezone.utc))
+        time.sleep(0.01)
+
+        # Changes while "down": one new registration, one edit, one deletion
+        profile_service.add_donor({"id": "snap-new", "bloodGroup": "A+", "hospitalLocation": "Europe-UK",
+                                   "organsWillingToDonate": ["liver"]})
+        db.collection("donors").document("snap-1").set({"bloodGroup": "B+", "hospitalLocation": "Europe-UK",
+                                                        "organsWillingToDonate": ["heart"], "registeredAt": "2000-01-01"})
+        db.collection("donors").document("snap-2").delete()
+
+        # Second start without a watch: snapshot + registeredAt delta, no full scan
+        def no_full_scan():
+            raise AssertionError("Cold start must not scan the whole donor collection")
+        profile_service.get_donors = no_full_scan
+        second = IncrementalMatcher()
+        second.ensure_primed()
+        pooled = {str(d.id) for d in second.donors()}
+        assert "snap-new" in pooled and "snap-0" in pooled
+        profile_service.get_donors = original_get_donors
+
+        # Third start with a watch: only documents written after the stamp are normalized
+        normalized = []
+        profile_service.normalize_donor = lambda doc_id, data: normalized.append(doc_id) or original_normalize(doc_id, data)
+        third = IncrementalMatcher()
+        third.start_watch()
+        try:
+            donors = {str(d.id): d for d in third.donors()}
+            assert set(normalized) == {"snap-new", "snap-1"}, f"Unexpected re-normalized donors: {normalized}"
+            assert "snap-2" not in donors, "Donors deleted since the snapshot must be dropped"
+            assert donors["snap-1"].blood_type == "B+", "Donors edited since the snapshot must be reloaded"
+            assert set(donors) == {doc.id for doc in db.collection("donors").stream()}
+        finally:
+            third.stop_watch()
+        assert load_donor_snapshot(directory).stamp > datetime.now(timezone.utc).replace(year=2000)
+    finally:
+        profile_service.get_donors, profile_service.normalize_donor = original_get_donors, original_normalize
+        settings.DONOR_SNAPSHOT_DIR = previous
+        shutil.rmtree(directory)
+    print("Cold start tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_round_trip()
+        test_loads_in_fresh_process()
+        test_matcher_applies_only_changes()
+        print("\nALL SNAPSHOT TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.tokens import FakeTokenIssuer, InvalidToken
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+def expect_invalid(verifier, token, reason):
+    try:
+        verifier.verify(token)
+        assert False, f"Expected rejection: {reason}"
+    except InvalidToken:
+        pass
+
+def test_verifies_and_caches():
+    print("Testing local verification and the decoded-token cache...")
+    issuer = FakeTokenIssuer()
+    verifier = issuer.verifier()
+    token = issuer.issue("user-1", email="a@example.com")
+
+    claims = verifier.verify(token)
+    assert claims["uid"] == "user-1" and claims["email"] == "a@example.com"
+    assert verifier.verify(token) is claims, "Repeat tokens should be served from the cache"
+    assert verifier.certs.fetches == 1
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        verifier.verify(token)
+    per_call = (time.perf_counter() - start) / 1000
+    print(f"  cached verification: {per_call * 1e6:.1f} us")
+    assert per_call < 0.001, f"Cached verification too slow: {per_call * 1e6:.0f} us"
+    print("Verification tests passed.")
+
+def test_rejections():
+    print("Testing rejected tokens...")
+    issuer = FakeTokenIssuer()
+    verifier = issuer.verifier()
+    expect_invalid(verifier, "not-a-jwt", "malformed")
+    expect_invalid(verifier, issuer.issue("u", expires_in=-10), "expired")
+    expect_invalid(verifier, issuer.issue("u", aud="other-project"), "wrong audience")
+    expect_invalid(verifier, issuer.issue("u", iss="https://evil.example.com"), "wrong issuer")
+    expect_invalid(verifier, issuer.issue(""), "empty subject")
+    expect_invalid(verifier, FakeTokenIssuer().issue("u"), "signed by an unknown key")
+    token = issuer.issue("u")
+    expect_invalid(verifier, token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB"), "bad signature")
+    print("Rejection tests passed.")
+
+def test_expiry_and_cert_refresh():
+    print("Testing cache expiry and certificate refresh...")
+    clock = Clock()
+    issuer = FakeTokenIssuer(max_age=600, clock=clock)
+    verifier = issuer.verifier(cache_size=2)
+    token = issuer.issue("u", expires_in=300)
+    verifier.verify(token)
+
+    clock.now += 301
+    expect_invalid(verifier, token, "cached token past exp")
+    assert verifier.cached() == 0
+
+    # Certificates are refetched only after their max-age
+    fresh = issuer.issue("u2")
+    verifier.verify(fresh)
+    assert verifier.certs.fetches == 1
+    clock.now += 600
+    verifier.verify(issuer.issue("u3"))
+    assert verifier.certs.fetches == 2
+
+    # Bounded LRU
+    for i in range(5):
+        verifier.verify(issuer.issue(f"user-{i}"))
+    assert verifier.cached() == 2
+    print("Expiry and refresh tests passed.")
+
+def test_dependency_uses_verifier():
+    print("Testing get_current_user with the fake issuer...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core import security
+
+    issuer = FakeTokenIssuer()
+    original = security.token_verifier
+    security.token_verifier = issuer.verifier()
+    try:
+        client = TestClient(app)
+        ok = client.get("/analytics/dashboard", headers={"Authorization": f"Bearer {issuer.issue('coordinator')}"})
+        assert ok.status_code == 200, ok.text
+        bad = client.get("/analytics/dashboard", headers={"Authorization": "Bearer nope"})
+        assert bad.status_code == 401
+    finally:
+        security.token_verifier = original
+    print("Dependency tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_verifies_and_caches()
+        test_rejections()
+        test_expiry_and_cert_refresh()
+        test_dependency_uses_verifier()
+        print("\nALL TOKEN TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,156 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.core.config import settings
+from app.services.incremental import IncrementalMatcher
+from app.services.profile_service import profile_service
+from app.services.shared_pool import shared_pool
+from app.services.snapshot import load_donor_snapshot, write_donor_snapshot
+from app.services.viability import TimingWheel, procurement_time
+
+def ago(hours):
+    return (datetime.utcnow() - timedelta(hours=hours)).isoformat()
+
+def donor(donor_id, organs, procured=None, **extra):
+    data = {"bloodGroup": "O-", "hospitalLocation": "Europe-UK", "organsWillingToDonate": organs, **extra}
+    if procured is not None:
+        data["procuredAt"] = procured
+    return profile_service.normalize_donor(donor_id, data)
+
+def recipient(recipient_id, organ):
+    return profile_service.normalize_recipient(recipient_id, {
+        "bloodGroup": "O+", "hospitalLocation": "Europe-UK", "organRequired": organ, "urgencyStatus": "Moderate"})
+
+def test_timing_wheel():
+    print("Testing the timing wheel...")
+    wheel = TimingWheel(tick=1.0, now=100.0)
+    wheel.schedule("a", 100.5)
+    wheel.schedule("b", 102.0)
+    wheel.schedule("c", 5000.0)
+    wheel.schedule("d", 103.2)
+    assert wheel.advance(100.9) == [], "Nothing fires before its deadline"
+    assert wheel.advance(101.0) == ["a"]
+    assert wheel.cancel("b") and not wheel.cancel("b")
+    wheel.schedule("d", 104.5)
+    assert wheel.advance(104.0) == [] and wheel.advance(105.0) == ["d"], "Rescheduling replaces the deadline"
+    # A long idle gap visits occupied slots only
+    assert wheel.advance(10 ** 9) == ["c"] and len(wheel) == 0
+    wheel.schedule("late", 0.0)
+    assert wheel.advance(10 ** 9 + 1) == ["late"], "Past deadlines fire on the next advance"
+    print("Timing wheel tests passed.")
+
+def test_procurement_time():
+    print("Testing procurement times...")
+    assert procurement_time({"donorType": "living", "registeredAt": ago(1)}) is None
+    deceased = {"donorType": "Deceased", "registeredAt": "2026-01-01T00:00:00"}
+    assert procurement_time(deceased) is None, "Registration alone doesn't start the window"
+    settings.VIABILITY_REGISTRATION_AS_PROCUREMENT = True
+    try:
+        # Naive registry timestamps are UTC
+        assert procurement_time(deceased) == datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+        assert procurement_time({"donorType": "living", "registeredAt": ago(1)}) is None
+    finally:
+        settings.VIABILITY_REGISTRATION_AS_PROCUREMENT = False
+    assert procurement_time({"procuredAt": "2026-01-01T00:00:00Z"}) == procurement_time({"procuredAt": "2026-01-01T00:00:00+00:00"})
+    assert procurement_time({"procuredAt": "not a date"}) is None
+    print("Procurement time tests passed.")
+
+def test_matcher_expires_organs():
+    print("Testing that the matcher drops organs as windows close...")
+    matcher = IncrementalMatcher(k=5)
+    matcher.prime([], [recipient("vr-heart", "Heart"), recipient("vr-kidney", "Kidney")])
+    matcher.on_donor_added(donor("vd-living", ["heart", "kidney"]))
+    # Heart (4h) already closed, kidney (36h) still open
+    matcher.on_donor_added(donor("vd-mixed", ["heart", "kidney"], procured=ago(5)))
+    matcher.on_donor_added(donor("vd-fresh", ["heart"], procured=ago(1)))
+    matcher.on_donor_added(donor("vd-stale", ["kidney"], procured=ago(40)))
+
+    heart = {d.id for _, d in matcher.top_candidates("vr-heart")}
+    kidney = {d.id for _, d in matcher.top_candidates("vr-kidney")}
+    assert heart == {"vd-living", "vd-fresh"}, heart
+    assert kidney == {"vd-living", "vd-mixed"}, kidney
+    assert "vd-stale" not in {str(d.id) for d in matcher.donors()}
+
+    version = matcher.version
+    assert matcher.expire_due(time.time()) == 0 and matcher.version == version
+    # Three hours on, the fresh heart closes
+    assert matcher.expire_due(time.time() + 3 * 3600 + 2) == 1
+    assert {d.id for _, d in matcher.top_candidates("vr-heart")} == {"vd-living"}
+    assert matcher.version == version + 1
+    assert "vd-fresh" not in {str(d.id) for d in matcher.donors()}
+
+    # Removing a donor cancels its pending expiries
+    matcher.on_donor_removed("vd-mixed")
+    assert matcher.expire_due(time.time() + 40 * 3600) == 0
+    print("Matcher expiry tests passed.")
+
+def test_seeded_registry_still_matches():
+    print("Testing that the seeded registry stays in the pool...")
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dummy_donors.json")) as f:
+        docs = json.load(f)
+    donors = [profile_service.normalize_donor(doc.get("id") or f"seed-{i}", doc) for i, doc in enumerate(docs)]
+    deceased = {str(d.id) for d, doc in zip(donors, docs) if str(doc.get("donorType", "")).lower() == "deceased"}
+    assert deceased, "The seed has deceased donors without procuredAt"
+
+    matcher = IncrementalMatcher(k=len(donors))
+    matcher.prime(donors, [])
+    assert {str(d.id) for d in matcher.donors()} == {str(d.id) for d in donors}
+    assert matcher.expire_due(time.time()) == 0
+    matcher.on_recipient_added(profile_service.normalize_recipient("vr-seed", {
+        "bloodGroup": "AB+", "hospitalLocation": "Europe-UK", "organRequired": "Kidney", "urgencyStatus": "Moderate"}))
+    matched = {str(d.id) for _, d in matcher.top_candidates("vr-seed")}
+    assert matched & deceased, "Seeded deceased donors still match"
+    print("Seeded registry tests passed.")
+
+def test_inactive_donors_leave_the_pool():
+    print("Testing that inactive donors are not pooled...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.incremental import incremental_matcher
+
+    client = TestClient(app)
+    base = {"bloodGroup": "O-", "hospitalLocation": "Europe-UK", "organsWillingToDonate": ["kidney"]}
+    assert client.post("/registry/donor", json={"id": "vd-status", **base}).status_code == 200
+    assert incremental_matcher.get_donor("vd-status") is not None
+    assert client.post("/registry/donor", json={"id": "vd-status", "status": "inactive", **base}).status_code == 200
+    assert incremental_matcher.get_donor("vd-status") is None
+    assert "vd-status" not in {str(d.id) for d in profile_service.get_donors()}
+    print("Status tests passed.")
+
+def test_followers_mask_expired_rows():
+    print("Testing viability masks over shared snapshots...")
+    directory = tempfile.mkdtemp()
+    try:
+        donors = [donor("fs-live", ["heart"]), donor("fs-fresh", ["heart"], procured=ago(1)),
+                  donor("fs-old", ["heart", "kidney"], procured=ago(6))]
+        write_donor_snapshot(directory, donors)
+        snapshot = load_donor_snapshot(directory)
+        assert [d.procured_at for d in snapshot.donors()] == [d.procured_at for d in donors]
+        assert snapshot.donors()[0].procured_at is None
+        heart = [str(d.id) for d in snapshot.donors(shared_pool.candidate_rows(snapshot, recipient("r", "Heart")))]
+        kidney = [str(d.id) for d in snapshot.donors(shared_pool.candidate_rows(snapshot, recipient("r", "Kidney")))]
+        assert heart == ["fs-live", "fs-fresh"] and kidney == ["fs-old"], (heart, kidney)
+    finally:
+        shutil.rmtree(directory)
+    print("Follower tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_timing_wheel()
+        test_procurement_time()
+        test_matcher_expires_organs()
+        test_seeded_registry_still_matches()
+        test_inactive_donors_leave_the_pool()
+        test_followers_mask_expired_rows()
+        print("\nALL VIABILITY TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
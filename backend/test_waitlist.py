@@ -0,0 +1,115 @@
+import sys
+import os
+import random
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATASTORE", "memory")
+
+from app.services.waitlist import IndexedHeap, Waitlist, best_first
+from app.services.profile_service import profile_service
+
+def recipient(rid, urgency, organ="Kidney", registered="2026-01-01T00:00:00"):
+    status = {10: "Critical (ICU)", 8: "Urgent (Hospitalized)", 5: "Moderate", 3: "Stable"}[urgency]
+    return profile_service.normalize_recipient(rid, {"fullName": rid, "urgencyStatus": status,
+                                                     "organRequired": organ, "registeredAt": registered})
+
+def test_indexed_heap():
+    print("Testing the indexed heap against a sorted reference...")
+    rng = random.Random(3)
+    heap, reference = IndexedHeap(), {}
+    for step in range(5000):
+        item = f"i{rng.randrange(300)}"
+        if rng.random() < 0.3:
+            assert heap.remove(item) == (reference.pop(item, None) is not None)
+        else:
+            key = (rng.randrange(10), str(rng.randrange(50)), item)
+            heap.push(item, key)
+            reference[item] = key
+        if step % 250 == 0:
+            expected = [item for _, item in sorted((k, i) for i, k in reference.items())]
+            assert best_first([heap], 20) == expected[:20], step
+            assert len(heap) == len(reference)
+            assert all(heap._slots[i] == s for s, (_, i) in enumerate(heap._entries))
+    print("Indexed heap tests passed.")
+
+def test_waitlist_order_and_updates():
+    print("Testing waitlist priority, re-prioritization and organ queues...")
+    waitlist = Waitlist()
+    waitlist.upsert(recipient("a", 5, registered="2026-01-03"))
+    waitlist.upsert(recipient("b", 5, registered="2026-01-01"))
+    waitlist.upsert(recipient("c", 8, organ="Liver"))
+    waitlist.upsert(recipient("d", 3, registered=None))
+    waitlist.upsert(recipient("e", 3, registered="2026-05-01"))
+    # Urgency first, earlier registration breaks ties, undated last
+    assert waitlist.top(10) == ["c", "b", "a", "e", "d"]
+    assert waitlist.top(2, organ="kidney") == ["b", "a"]
+    assert waitlist.top(5, organ="heart") == []
+
+    waitlist.upsert(recipient("d", 10))
+    assert waitlist.top(2) == ["d", "c"], "An urgency change re-orders in place"
+    waitlist.upsert(recipient("c", 8, organ="Kidney"))
+    assert waitlist.organs() == {"kidney": 5}
+    waitlist.upsert(recipient("f", 3, organ="Lungs"))
+    waitlist.upsert(recipient("g", 5, organ=" lung"))
+    assert waitlist.top(5, organ="lung") == waitlist.top(5, organ="LUNGS") == ["g", "f"], "Plurals share a queue"
+    assert waitlist.remove("f") and waitlist.remove("g")
+    assert waitlist.remove("d") and not waitlist.remove("d")
+    assert waitlist.top(3) == ["c", "b", "a"] and len(waitlist) == 4
+    print("Waitlist tests passed.")
+
+def test_allocations_endpoint():
+    print("Testing /match/allocations with n and organ...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.firebase import db
+    from app.services.incremental import incremental_matcher
+
+    incremental_matcher.ensure_primed()
+    for i, (urgency, organ) in enumerate([(10, "Thymus"), (10, "Kidney"), (8, "Thymus"), (3, "Thymus")]):
+        profile = recipient(f"wl{i}", urgency, organ=organ, registered=f"1999-01-0{i + 1}")
+        incremental_matcher.on_recipient_added(profile)
+
+    client = TestClient(app)
+    rows = client.get("/match/allocations", params={"n": 3, "organ": "thymus"}).json()
+    assert [r["id"] for r in rows] == ["REQ-WL0", "REQ-WL2", "REQ-WL3"], rows
+    assert len(client.get("/match/allocations", params={"n": 1}).json()) == 1
+    assert client.get("/match/allocations", params={"n": 0}).status_code == 422
+
+    # Accepting a patient's allocation takes them off the waitlist and persists their status
+    db.collection("recipients").document("wl0").set({"fullName": "wl0", "urgencyStatus": "Critical (ICU)",
+                                                     "organRequired": "Thymus", "registeredAt": "1999-01-01"})
+    db.collection("matches").document("REQ-WL0").set({"patient_id": "wl0", "status": "Match Found"})
+    res = client.post("/match/accept", json={"request_id": "REQ-WL0", "request_data": {"patient_id": "wl0"}})
+    assert res.status_code == 200, res.text
+    rows = client.get("/match/allocations", params={"n": 3, "organ": "Thymus"}).json()
+    assert [r["id"] for r in rows] == ["REQ-WL2", "REQ-WL3"], rows
+    assert db.collection("recipients").document("wl0").get().to_dict()["status"] == "allocated"
+
+    # Other workers and restarts see the status: the watch relays the patient as removed,
+    # reloads skip them, and a re-read profile is never re-queued
+    db.collection("recipients").document("wl0").update({"urgencyStatus": "Stable"})
+    relayed = []
+    handles = profile_service.watch(relayed.extend, lambda changes: None)
+    for handle in handles:
+        handle.unsubscribe()
+    assert ("REMOVED", "wl0") in [(kind, p.id) for kind, p in relayed]
+    assert "wl0" not in [str(r.id) for r in profile_service.get_recipients()]
+    doc = db.collection("recipients").document("wl0").get()
+    incremental_matcher.on_recipient_added(profile_service.normalize_recipient("wl0", doc.to_dict()))
+    assert "wl0" not in [p.id for p in incremental_matcher.waitlist(10, "thymus")], "Updates must not re-queue"
+
+    # Allocations for a patient missing from the registry are not accepted
+    db.collection("matches").document("REQ-WLX").set({"patient_id": "wl-gone", "status": "Match Found"})
+    res = client.post("/match/accept", json={"request_id": "REQ-WLX", "request_data": {"patient_id": "wl-gone"}})
+    assert res.status_code == 404 and db.collection("matches").document("REQ-WLX").get().to_dict()["status"] == "Match Found"
+    print("Endpoint tests passed.")
+
+if __name__ == "__main__":
+    try:
+        test_indexed_heap()
+        test_waitlist_order_and_updates()
+        test_allocations_endpoint()
+        print("\nALL WAITLIST TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -238,6 +238,20 @@ export default function Dashboard() {
     fetchDonorCount();
     fetchAllocations();
     fetchMatches();
+
+    // Live allocation updates pushed by the backend instead of re-fetching on every visit.
+    // EventSource reconnects on its own and resumes from the last event id it saw.
+    const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+    const events = new EventSource(`${apiUrl}/events/stream`);
+    events.addEventListener("allocation", (e) => {
+      const row = JSON.parse((e as MessageEvent).data);
+      setActiveAllocationRows((rows) => {
+        const exists = rows.some((r) => r.id === row.id);
+        return exists ? rows.map((r) => (r.id === row.id ? row : r)) : [row, ...rows];
+      });
+    });
+    events.addEventListener("reset", () => fetchAllocations());
+    return () => events.close();
   }, []);
 
   // Recipient registration: step 1 = identity/clinical, step 2 = organ-specific tests